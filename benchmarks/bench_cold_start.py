@@ -0,0 +1,66 @@
+"""
+Benchmark the cold start of the server: the time from starting a new
+Python process that imports main.py, like Render does, to its first
+response on ``/healthz``, to ``/readyz`` answering 200, and to the
+first response of the home page. The seconds of each startup phase are
+read from ``/readyz``.
+
+Run from the repository root with ``python -m benchmarks.bench_cold_start``.
+Environment variables that aren't set are filled in with a seeded local
+SQLite database and placeholders, see benchmarks.fixtures.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import (
+    free_port, get, seed, server_env, start_server, wait_for
+    )
+
+
+def cold_start(env: dict[str, str]) -> dict[str, float]:
+    """Start the server once, returns the seconds to each milestone."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = start_server(env, port)
+    try:
+        healthz, _ = wait_for(f"{base}/healthz", 200, started)
+        readyz, body = wait_for(f"{base}/readyz", 200, started)
+        home_started = time.perf_counter()
+        status, _ = get(f"{base}/")
+        assert status == 200, f"the home page answered {status}"
+        home = time.perf_counter() - home_started
+    finally:
+        process.terminate()
+        process.wait()
+    timings = {"healthz": healthz, "readyz": readyz, "first home": home}
+    for name, seconds in json.loads(body)["timings"].items():
+        timings[f"  {name}"] = seconds
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        env = server_env(str(Path(temp) / "site.db"))
+        seed(env["SQL_DB_URI"])
+        runs = [cold_start(env) for _ in range(args.repeat)]
+
+    print(f"{'seconds':>14} | {'median':>8} | {'min':>8} | {'max':>8}")
+    for name in runs[0]:
+        values = [run[name] for run in runs if name in run]
+        print(
+            f"{name:>14} | {statistics.median(values):>8.3f} | "
+            f"{min(values):>8.3f} | {max(values):>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark the throughput of the morse code encoding engine against the
+previous character by character implementation of Converter.convert().
+
+Run from the repository root with ``python -m benchmarks.bench_morse_encoder``.
+The previous implementation grows quadratically, so it's skipped for
+inputs larger than ``--legacy-limit`` bytes.
+"""
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from demo_morse_code_converter.converter import INCLUDE_WORDS, Converter
+
+SIZES = {"1 KB": 1024, "100 KB": 100 * 1024, "10 MB": 10 * 1024 * 1024}
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,?!"
+
+
+def legacy_convert(converter: Converter, user_input: str) -> str:
+    """Converter.convert() before the encoding engine, kept for reference."""
+    output = ''
+    for letter in user_input:
+        if letter == '\r':
+            continue
+        if letter == '\n':
+            output += '\n'
+        elif letter == ' ':
+            output = output.rstrip(converter.letter_space)
+            output += converter.word_space
+        elif letter in INCLUDE_WORDS:
+            code = list(converter.codes[letter.upper()])
+            code_space = converter.code_space.join(code)
+            output = output + code_space + converter.letter_space
+        else:
+            output += f'(invalid_letter:{letter})'
+    return output.rstrip(converter.letter_space)
+
+
+def make_text(size: int, seed: int = 0) -> str:
+    """Random words of 1 to 8 letters, with a line break now and then."""
+    rng = random.Random(seed)
+    words: list[str] = []
+    length = 0
+    while length < size:
+        word = "".join(rng.choices(ALPHABET, k=rng.randint(1, 8)))
+        words.append(word + ("\n" if rng.random() < 0.05 else " "))
+        length += len(words[-1])
+    return "".join(words)[:size]
+
+
+def measure(func: Callable[[str], str], text: str, repeat: int) -> float:
+    """Returns the best throughput of `repeat` runs, in MB/s."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return len(text) / best / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-limit", type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    converter = Converter()
+    print(f"{'input':>8} | {'legacy MB/s':>12} | {'engine MB/s':>12} | speedup")
+    for label, size in SIZES.items():
+        text = make_text(size)
+        engine = measure(converter.convert, text, args.repeat)
+        if size <= args.legacy_limit:
+            assert legacy_convert(converter, text) == converter.convert(text)
+            legacy = measure(
+                lambda t: legacy_convert(converter, t), text, args.repeat
+                )
+            print(
+                f"{label:>8} | {legacy:>12.2f} | {engine:>12.2f} | "
+                f"{engine / legacy:.1f}x"
+                )
+        else:
+            print(f"{label:>8} | {'skipped':>12} | {engine:>12.2f} |")
+
+    batch = [make_text(64, seed) for seed in range(10_000)]
+    start = time.perf_counter()
+    converter.convert_many(batch)
+    elapsed = time.perf_counter() - start
+    print(f"convert_many: {len(batch) / elapsed:,.0f} texts/s (64 B each)")
+
+
+if __name__ == "__main__":
+    main()
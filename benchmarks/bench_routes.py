@@ -0,0 +1,378 @@
+"""
+Load test every route of the website: the server is started from
+main.py against a seeded local SQLite database and a stand-in SMTP
+server, then each scenario is run by `--concurrency` virtual visitors
+for `--duration` seconds. Every visitor keeps its own connection and
+cookies, like a browser.
+
+Run from the repository root with ``python -m benchmarks.bench_routes``.
+Prints requests per second and the p50/p95/p99 latency of each route,
+and saves them as JSON with the commit they were measured on. Compare
+two runs with ``--compare <earlier.json>``.
+
+The rate limits of the contact page and the demos are raised for the
+run unless RATE_LIMIT_CONTACT or RATE_LIMIT_DEMO is set, otherwise
+most requests would be answered 429.
+"""
+import argparse
+import http.client
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+from benchmarks.fixtures import (
+    SMTPStandIn, free_port, seed, server_env, start_server, wait_for
+    )
+
+RESULTS_DIR = Path("benchmarks/results")
+ABOUT_TITLES = ("website", "author", "tools")
+EXPECTED_STATUS = frozenset((200, 302, 304))
+UNLIMITED = "1000000/1"
+MORSE_INPUTS = [
+    ("encode", "hello world"),
+    ("decode", ".... . .-.. .-.. ---"),
+    ("encode", "the quick brown fox jumps over the lazy dog"),
+    ("decode", "... --- ..."),
+    ("encode", "SOS 123"),
+]
+
+
+class Visitor:
+    """
+    A virtual visitor, with one keep-alive connection and the cookies
+    the server set.
+
+    Parameters
+    ----------
+    port: int
+        The port of the server on localhost.
+    record: Callable[[str, float, bool], None]
+        Called with the route, the seconds and if the status was
+        expected, after every request.
+    """
+    def __init__(
+        self, port: int, record: Callable[[str, float, bool], None]
+    ) -> None:
+        self.port = port
+        self.record = record
+        self.cookies: dict[str, str] = {}
+        self.connection = http.client.HTTPConnection("127.0.0.1", port)
+
+    def request(
+        self,
+        route: str,
+        method: str,
+        path: str,
+        form: dict[str, str] | None = None,
+        json_body: dict[str, Any] | None = None,
+    ) -> None:
+        """Send a request and record its latency under `route`."""
+        headers = {"Accept-Encoding": "gzip"}
+        body = None
+        if form is not None:
+            body = urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(
+                f"{name}={value}" for name, value in self.cookies.items()
+                )
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(
+                "127.0.0.1", self.port
+                )
+            self.record(route, time.perf_counter() - started, False)
+            return
+        elapsed = time.perf_counter() - started
+        for header in response.headers.get_all("Set-Cookie") or ():
+            cookie: SimpleCookie = SimpleCookie(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+        self.record(route, elapsed, response.status in EXPECTED_STATUS)
+
+    def close(self) -> None:
+        """Close the connection."""
+        self.connection.close()
+
+
+def home(visitor: Visitor) -> None:
+    """The home page."""
+    visitor.request("GET /", "GET", "/")
+
+
+def about(visitor: Visitor) -> None:
+    """One of the about pages."""
+    title = random.choice(ABOUT_TITLES)
+    visitor.request("GET /about/<title>", "GET", f"/about/{title}")
+
+
+def contact(visitor: Visitor) -> None:
+    """The contact page."""
+    visitor.request("GET /contact", "GET", "/contact")
+
+
+def contact_post(visitor: Visitor) -> None:
+    """A message sent from the contact page."""
+    visitor.request(
+        "POST /contact", "POST", "/contact",
+        form={
+            "name": "Benchmark",
+            "email": "benchmark@example.com",
+            "message": "Hello from the load test. " * 8,
+            },
+        )
+
+
+def policy(visitor: Visitor) -> None:
+    """The policy page."""
+    visitor.request("GET /policy", "GET", "/policy")
+
+
+def switch_language(visitor: Visitor) -> None:
+    """The link that switches the display language."""
+    visitor.request(
+        "GET /switch-language", "GET", "/switch-language?next=/policy"
+        )
+
+
+def tic_tac_toe(visitor: Visitor) -> None:
+    """A game of tic tac toe against the computer."""
+    visitor.request(
+        "GET /gate/tic-tac-toe", "GET", "/gate/tic-tac-toe?computer=hard"
+        )
+    visitor.request("GET /demo/tic-tac-toe", "GET", "/demo/tic-tac-toe")
+    for position in random.sample(range(1, 10), 5):
+        visitor.request(
+            "POST /api/demo/tic-tac-toe", "POST", "/api/demo/tic-tac-toe",
+            json_body={"user_input": str(position)},
+            )
+
+
+def morse_code_converter(visitor: Visitor) -> None:
+    """A few texts converted into morse code and back."""
+    visitor.request(
+        "GET /gate/morse-code-converter", "GET", "/gate/morse-code-converter"
+        )
+    visitor.request(
+        "GET /demo/morse-code-converter", "GET", "/demo/morse-code-converter"
+        )
+    for mode, text in MORSE_INPUTS:
+        visitor.request(
+            "POST /api/demo/morse", "POST", "/api/demo/morse",
+            json_body={"user_input": text, "mode": mode},
+            )
+
+
+SCENARIOS: dict[str, Callable[[Visitor], None]] = {
+    "home": home,
+    "about": about,
+    "contact": contact,
+    "contact-post": contact_post,
+    "policy": policy,
+    "switch-language": switch_language,
+    "tic-tac-toe": tic_tac_toe,
+    "morse-code-converter": morse_code_converter,
+}
+
+
+def run_scenario(
+    scenario: Callable[[Visitor], None],
+    port: int,
+    concurrency: int,
+    duration: float,
+) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    """
+    Run a scenario from `concurrency` visitors at once for `duration`
+    seconds, after one run each that isn't recorded.
+
+    Returns
+    -------
+    tuple[dict[str, list[float]], dict[str, int], float]
+        The latencies by route, the unexpected responses by route, and
+        the seconds the scenario ran.
+    """
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+    recording = threading.Event()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def record(route: str, seconds: float, ok: bool) -> None:
+        if not recording.is_set():
+            return
+        with lock:
+            latencies[route].append(seconds)
+            if not ok:
+                errors[route] += 1
+
+    def visit() -> None:
+        visitor = Visitor(port, record)
+        scenario(visitor)
+        barrier.wait()
+        while time.perf_counter() < deadline:
+            scenario(visitor)
+        visitor.close()
+
+    deadline = float("inf")
+    threads = [
+        threading.Thread(target=visit, daemon=True)
+        for _ in range(concurrency)
+        ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    recording.set()
+    started = time.perf_counter()
+    deadline = started + duration
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarize(
+    latencies: list[float], errors: int, seconds: float
+) -> dict[str, float]:
+    """Requests per second and latencies in milliseconds of a route."""
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / seconds,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def git_commit() -> str:
+    """The commit of the working tree, with "-dirty" if it's changed."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True,
+            ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def print_table(
+    routes: dict[str, dict[str, float]],
+    earlier: dict[str, dict[str, float]] | None = None,
+) -> None:
+    """Print the results, with the change from `earlier` if given."""
+    print(
+        f"{'route':>32} | {'req/s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | "
+        f"{'p99 ms':>7} | {'errors':>6}"
+        )
+    for route, result in routes.items():
+        line = (
+            f"{route:>32} | {result['rps']:>8.1f} | "
+            f"{result['p50_ms']:>7.2f} | {result['p95_ms']:>7.2f} | "
+            f"{result['p99_ms']:>7.2f} | {result['errors']:>6}"
+            )
+        before = (earlier or {}).get(route)
+        if before:
+            line += (
+                f" | req/s {result['rps'] / before['rps'] - 1:+.0%}, "
+                f"p95 {result['p95_ms'] / before['p95_ms'] - 1:+.0%}"
+                )
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--scenario", action="append", choices=list(SCENARIOS),
+        help="run only these scenarios, all of them by default",
+        )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    smtp = SMTPStandIn().start()
+    port = free_port()
+    with tempfile.TemporaryDirectory() as temp:
+        env = server_env(
+            str(Path(temp) / "site.db"),
+            SMTP_HOST="127.0.0.1",
+            SMTP_PORT=str(smtp.port),
+            RATE_LIMIT_CONTACT=UNLIMITED,
+            RATE_LIMIT_DEMO=UNLIMITED,
+            )
+        seed(env["SQL_DB_URI"])
+        process = start_server(env, port)
+        try:
+            wait_for(
+                f"http://127.0.0.1:{port}/readyz", 200, time.perf_counter()
+                )
+            routes: dict[str, dict[str, float]] = {}
+            for name in args.scenario or SCENARIOS:
+                latencies, errors, seconds = run_scenario(
+                    SCENARIOS[name], port, args.concurrency, args.duration
+                    )
+                for route, values in latencies.items():
+                    routes[route] = summarize(values, errors[route], seconds)
+        finally:
+            process.terminate()
+            process.wait()
+    smtp.shutdown()
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "seed": args.seed,
+        "emails": smtp.messages,
+        "routes": routes,
+    }
+    earlier = None
+    if args.compare:
+        with open(args.compare, encoding="UTF-8") as file:
+            earlier = json.load(file)["routes"]
+    print_table(routes, earlier)
+
+    output = args.output or RESULTS_DIR / f"routes-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, mode="w", encoding="UTF-8") as file:
+        json.dump(results, file, indent=2)
+        file.write("\n")
+    print(f"saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark the moves per second of the bitboard ShowMaker against the
+previous implementation, which kept the board in a dict and two string
+grids, and of ShowMaker on larger grids.
+
+Run from the repository root with ``python -m benchmarks.bench_tic_tac_toe``.
+"""
+import argparse
+import random
+import time
+
+from demo_tic_tac_toe.bitboard import GRID
+from demo_tic_tac_toe.board import ArrayBoard
+from demo_tic_tac_toe.showmaker_demo import ShowMaker, symbols
+
+BOARDS = {"3x3": (3, 3), "15x15": (15, 5), "19x19": (19, 5)}
+
+horizon = [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+verical = [[1, 4, 7], [2, 5, 8], [3, 6, 9]]
+
+
+class LegacyShowMaker(ShowMaker):
+    """ShowMaker before the bitboard engine, kept for reference."""
+    def _setup_new_game(self) -> None:
+        super()._setup_new_game()
+        self._placed: dict[int, str] = dict.fromkeys(range(1, 10), ' ')
+        self._grid = GRID
+        self._placeable_grid = GRID
+
+    def _placeable(self, position: str) -> bool:
+        if position not in [str(x) for x in range(1, 10)]:
+            self.output.write(
+                f"user input '{position}' is not allowed.\n"
+                "accept numbers 1 ~ 9."
+                )
+            return False
+        placeable = [k for k in self._placed if self._placed[k] == " "]
+        if int(position) not in placeable:
+            self.output.write(
+                f"position '{position}' is occupied,\npick another position."
+                )
+            return False
+        self._update_grid(position)
+        return True
+
+    def _update_grid(self, position: str) -> None:
+        symbol = symbols[self.current_player]
+        self._placed[int(position)] = symbol
+        self._grid = self._grid.replace(position, symbol)
+        self._placeable_grid = self._placeable_grid.replace(position, " ")
+
+    def _show_grid(self) -> None:
+        grid = self._grid
+        for num in range(1, 10):
+            grid = grid.replace(str(num), " ")
+        split_grid = grid.replace('\n', '').split('.')
+        split_placeable_grid = self._placeable_grid.split('.')
+        output = "="*28 + "\n"
+        output += " tic tac toe  |   placeable" + "\n"
+        for num, _ in enumerate(split_grid):
+            output += f"{split_grid[num]}  | {split_placeable_grid[num]}"
+        output += "="*28 + "\n"
+        self.output.clear()
+        self.output.write(output)
+
+    def _draw_check(self) -> None:
+        if " " not in self._placed.values() and not self.iswinner:
+            self.iswinner = "draw"
+            self.history.clear()
+            self.history.write("draw.\n")
+            self._show_highlighted_grid()
+
+    def _end_check(self, user_input: str) -> None:
+        num = int(user_input)
+        if num == 5:
+            lines = [[1 + step, 5, 9 - step] for step in range(4)]
+        else:
+            lines = [horizon[(num-1) // 3], verical[(num-1) % 3]]
+            if num % 2 != 0:
+                lines.append([num, 5, 10 - num])
+        win_con = [
+            [str(pos) for pos in line] for line in lines
+            if self._placed[line[0]] == self._placed[line[1]]
+            and self._placed[line[1]] == self._placed[line[2]]
+            ]
+        if win_con:
+            self.iswinner = True
+            if self.current_player:
+                self._p2_score = self._p2_score + 1
+            else:
+                self._p1_score = self._p1_score + 1
+            self._show_win_positions(win_con)
+            self._show_highlighted_grid()
+
+    def _show_highlighted_grid(self) -> None:
+        hl_grid = GRID.replace(".", "")
+        for num in range(1, 10):
+            hl_grid = hl_grid.replace(str(num), f"【{num}】")
+        for position in self._placed:
+            hl_grid = hl_grid.replace(
+                f"【{str(position)}】", self._placed[position]
+                )
+        self.history.write("-"*28)
+        for layer in hl_grid.split('\n')[:-1]:
+            self.history.write(f"        {layer}")
+        self.history.write("-"*28)
+        self._show_score()
+
+
+class ArrayShowMaker(ShowMaker):
+    """ShowMaker on the array-backed board, even for the 3x3 grid."""
+    def _setup_new_game(self) -> None:
+        super()._setup_new_game()
+        self._board = ArrayBoard(self.size, self.k)
+
+
+def make_moves(count: int, size: int = 3, seed: int = 0) -> list[str]:
+    """Random positions, with an occasional occupied or invalid one."""
+    rng = random.Random(seed)
+    return [str(rng.randint(0, size * size)) for _ in range(count)]
+
+
+def measure(showmaker: ShowMaker, moves: list[str], repeat: int) -> float:
+    """Returns the best of `repeat` runs, in moves per second."""
+    best = float("inf")
+    for _ in range(repeat):
+        showmaker.initiate()
+        showmaker.new_game()
+        start = time.perf_counter()
+        for move in moves:
+            showmaker.player_input(move)
+        best = min(best, time.perf_counter() - start)
+    return len(moves) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--moves", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    moves = make_moves(args.moves)
+    legacy, engine = LegacyShowMaker(), ShowMaker()
+    for showmaker in (legacy, engine):
+        showmaker.new_game()
+        for move in moves[:1000]:
+            showmaker.player_input(move)
+    assert legacy.history.text == engine.history.text
+    assert legacy.output.text == engine.output.text
+
+    legacy_rate = measure(legacy, moves, args.repeat)
+    engine_rate = measure(engine, moves, args.repeat)
+    print(f"{'legacy':>8} | {legacy_rate:>12,.0f} moves/s")
+    print(f"{'bitboard':>8} | {engine_rate:>12,.0f} moves/s")
+    print(f"speedup: {engine_rate / legacy_rate:.1f}x")
+
+    print(f"\n{'grid':>8} | {'array moves/s':>14} | {'bitboard moves/s':>16}")
+    for label, (size, k) in BOARDS.items():
+        moves = make_moves(args.moves, size)
+        array_rate = measure(ArrayShowMaker(size, k), moves, args.repeat)
+        if size == k == 3:
+            bitboard = f"{measure(ShowMaker(), moves, args.repeat):>16,.0f}"
+        else:
+            bitboard = f"{'-':>16}"
+        print(f"{label:>8} | {array_rate:>14,.0f} | {bitboard}")
+
+
+if __name__ == "__main__":
+    main()
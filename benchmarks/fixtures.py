@@ -0,0 +1,247 @@
+"""
+Fixtures of the benchmarks that run the whole server: the environment
+it needs, a local SQLite database seeded with the content of every
+page, a stand-in SMTP server that accepts the emails of the contact
+page, and helpers to start the server and wait for it.
+"""
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any
+
+POLL_INTERVAL = 0.005
+TIMEOUT = 60.0
+LANGUAGE_EN = "English"
+LANGUAGE_ZH = "Traditional-Chinese"
+ABOUT_IMAGES = {
+    "website": "about-bg-drafting-instrument.jpg",
+    "author": "about-bg-galaxy-ark.jpg",
+    "tools": "about-bg-nightfall-reflection.jpg",
+}
+
+
+def desc(english: str, chinese: str = "") -> dict[str, str]:
+    """A text in both languages."""
+    return {LANGUAGE_EN: english, LANGUAGE_ZH: chinese or english}
+
+
+def seed(uri: str) -> None:
+    """
+    Create the tables of the website in a database and fill them with
+    content shaped like the real one: the two demo projects, the three
+    about pages and the contact page.
+
+    Parameters
+    ----------
+    uri: str
+        The SQLAlchemy URI of the database, it should be empty.
+    """
+    # resource.classes needs the environment of server_env() to import
+    # pylint: disable=import-outside-toplevel
+    from resource.classes import (
+        AboutImage, AboutText, Base, ContactText, Project
+        )
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    engine = create_engine(uri)
+    Base.metadata.create_all(engine)
+    paragraph = (
+        "This website is built with {<magic-star>}Flask{</magic-star>}, "
+        "Bootstrap and a little JavaScript. " * 4
+        )
+    tools: list[dict[str, Any]] = [
+        {
+            "title": desc(f"Category {number}"),
+            "description": desc("Tools used to build the website."),
+            "tools": [
+                {
+                    "title": f"Tool {number}.{tool}",
+                    "href": f"https://example.com/{number}/{tool}",
+                    "description": desc("What the tool does. " * 3),
+                    "use-case": desc("How the tool is used here."),
+                }
+                for tool in range(6)
+            ],
+        }
+        for number in range(4)
+    ]
+    with Session(engine) as session:
+        session.add_all([
+            Project(
+                title="Morse Code Converter",
+                description=desc("Converts text to morse code. " * 5),
+                keywords={
+                    LANGUAGE_EN: ["Python", "CLI"],
+                    LANGUAGE_ZH: ["Python", "命令列"],
+                    },
+                preview_type="video",
+                preview_video="../static/assets/mov/Morse-Code-Converter.mp4",
+                is_demo="true",
+                demo_ep="gate_morse_code_converter",
+                gh_link="https://github.com/example/morse-code-converter",
+                gh_date="2024-01-01",
+                ),
+            Project(
+                title="Tic Tac Toe",
+                description=desc("Tic tac toe in the terminal. " * 5),
+                keywords={
+                    LANGUAGE_EN: ["Python", "Game"],
+                    LANGUAGE_ZH: ["Python", "遊戲"],
+                    },
+                preview_type="none",
+                is_demo="true",
+                demo_ep="gate_tic_tac_toe",
+                gh_link="https://github.com/example/tic-tac-toe",
+                gh_date="2024-02-01",
+                ),
+            ])
+        for name, fname in ABOUT_IMAGES.items():
+            paragraphs: Any = {
+                LANGUAGE_EN: [paragraph] * 3, LANGUAGE_ZH: [paragraph] * 3
+                }
+            if name == "tools":
+                paragraphs = tools
+            session.add(AboutText(
+                info_name=name,
+                title=desc(f"About the {name}"),
+                description=desc(f"Everything about the {name}."),
+                paragraphs=paragraphs,
+                ))
+            session.add(AboutImage(
+                info_name=name, fname=fname, attribute=f"Photo of {name}."
+                ))
+        session.add(ContactText(
+            title=desc("Contact"),
+            description=desc("Leave a message."),
+            form_name=desc("Name"),
+            form_mail=desc("Email"),
+            form_msg=desc("Message"),
+            form_sent=desc("Sent, thank you!"),
+            ))
+        session.commit()
+    engine.dispose()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Answers every SMTP command with success, and counts the emails."""
+    server: "SMTPStandIn"
+
+    def handle(self) -> None:
+        self._reply("220 stand-in")
+        while line := self.rfile.readline():
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250-stand-in")
+                self._reply("250 8BITMIME")
+            elif command.startswith("DATA"):
+                self._reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self._reply("250 accepted")
+            elif command.startswith("QUIT"):
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 ok")
+
+    def _reply(self, text: str) -> None:
+        self.wfile.write(f"{text}\r\n".encode())
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """
+    An SMTP server on localhost that accepts every email without TLS or
+    login, and only counts them. Serves from a daemon thread once
+    started.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        """The port the server listens on."""
+        return self.server_address[1]
+
+    def start(self) -> "SMTPStandIn":
+        """Serve from a daemon thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def server_env(db_path: str, **defaults: str) -> dict[str, str]:
+    """
+    Fill in the environment of a local server, with a SQLite database
+    at `db_path`, `defaults`, and placeholders, so nothing outside this
+    machine is reached. Variables that are set already are kept.
+
+    Returns
+    -------
+    dict[str, str]
+        A copy of the environment, for start_server().
+    """
+    defaults = {
+        "SQL_DB_URI": f"sqlite:///{db_path}",
+        "EMAIL_ADDRESS": "me@example.com",
+        "EMAIL_PASSWORD": "password",
+        "APP_SECRET_KEY": "secret",
+        "ENDPOINT": "http://127.0.0.1:9/languages",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": "9",
+        **defaults,
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+    return dict(os.environ)
+
+
+def free_port() -> int:
+    """A port nothing listens on right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env: dict[str, str], port: int) -> subprocess.Popen[bytes]:
+    """Start the server in a new process that imports main.py."""
+    return subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-c", "import main"],
+        env={**env, "PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        )
+
+
+def get(url: str) -> tuple[int, bytes]:
+    """The status and body of a GET, (0, b"") if it can't connect."""
+    try:
+        with urllib.request.urlopen(url, timeout=TIMEOUT) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read()
+    except OSError:
+        return 0, b""
+
+
+def wait_for(url: str, status: int, started: float) -> tuple[float, bytes]:
+    """Poll a URL until it answers `status`, returns seconds and body."""
+    while time.perf_counter() - started < TIMEOUT:
+        code, body = get(url)
+        if code == status:
+            return time.perf_counter() - started, body
+        time.sleep(POLL_INTERVAL)
+    raise TimeoutError(f"{url} didn't answer {status} in {TIMEOUT} s.")
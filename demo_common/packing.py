@@ -0,0 +1,91 @@
+"""
+Little helpers to pack the state of the website demos into compact
+bytes and back, on top of the struct module.
+"""
+import struct
+from typing import Any
+
+# ---------------------------------------------------------------------
+FORMAT_VERSION = 1
+
+
+class Packer:
+    """
+    Collects little-endian values, see struct for the formats.
+    """
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+
+    def pack(self, fmt: str, *values: Any) -> None:
+        """Add values packed with a struct format."""
+        self._parts.append(struct.pack("<" + fmt, *values))
+
+    def raw(self, data: bytes) -> None:
+        """Add bytes with their length in front."""
+        self.pack("I", len(data))
+        self._parts.append(data)
+
+    def text(self, value: str) -> None:
+        """Add a string, encoded as UTF-8."""
+        self.raw(value.encode())
+
+    def getvalue(self) -> bytes:
+        """Returns everything added so far."""
+        return b"".join(self._parts)
+
+
+class Unpacker:
+    """
+    Reads back the values added to a Packer, in the same order.
+
+    Parameters
+    ----------
+    data: bytes
+        The bytes returned by Packer.getvalue().
+    """
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._offset = 0
+
+    def unpack(self, fmt: str) -> tuple[Any, ...]:
+        """
+        Read values packed with a struct format.
+
+        Raises
+        ------
+        ValueError
+            If the data ends before the values.
+        """
+        fmt = "<" + fmt
+        try:
+            values = struct.unpack_from(fmt, self._data, self._offset)
+        except struct.error as error:
+            raise ValueError(f"truncated data: {error}") from error
+        self._offset += struct.calcsize(fmt)
+        return values
+
+    def raw(self) -> bytes:
+        """Read bytes added by Packer.raw()."""
+        size, = self.unpack("I")
+        end = self._offset + size
+        if end > len(self._data):
+            raise ValueError("truncated data")
+        data = self._data[self._offset:end]
+        self._offset = end
+        return data
+
+    def text(self) -> str:
+        """Read a string added by Packer.text()."""
+        return self.raw().decode()
+
+    def done(self) -> None:
+        """
+        Raises
+        ------
+        ValueError
+            If there's data left, it wasn't packed the way it's read.
+        """
+        if self._offset != len(self._data):
+            raise ValueError(
+                f"{len(self._data) - self._offset} bytes left unread"
+                )
@@ -0,0 +1,191 @@
+"""
+A bounded history of terminal lines for the website demos, so the demo
+pages can fetch only the lines added since their last update.
+"""
+import os
+import sys
+from collections import deque
+from itertools import islice
+from typing import NamedTuple
+
+from demo_common.packing import Packer, Unpacker
+
+# ---------------------------------------------------------------------
+TERMINAL_MAX_LINES: int = int(os.getenv("TERMINAL_MAX_LINES") or 200)
+# longer lines are cut, so one long input can't fill a whole cookie
+TERMINAL_MAX_LINE_LENGTH: int = int(
+    os.getenv("TERMINAL_MAX_LINE_LENGTH") or 512
+    )
+TRUNCATED = "…"
+
+
+class Delta(NamedTuple):
+    """The lines added to a terminal history after a sequence number."""
+    lines: list[str]
+    seq: int
+    reset: bool
+
+    @property
+    def text(self) -> str:
+        """The lines joined as they are shown in the terminal."""
+        return "".join(line + "\n" for line in self.lines)
+
+
+class TerminalHistory:
+    """
+    A ring buffer of terminal lines, each line gets a sequence number
+    one larger than the line before it, and only the latest `maxlen`
+    lines are kept. Lines longer than `max_line_length` are cut.
+
+    Parameters
+    ----------
+    maxlen: int, by default TERMINAL_MAX_LINES
+        The number of lines to keep.
+    seq: int, by default 0
+        The sequence number of the line before the first one written.
+    max_line_length: int, by default TERMINAL_MAX_LINE_LENGTH
+        The most characters of a line, with TRUNCATED at the end of a
+        line that was cut.
+    """
+    def __init__(
+        self,
+        maxlen: int = TERMINAL_MAX_LINES,
+        seq: int = 0,
+        max_line_length: int = TERMINAL_MAX_LINE_LENGTH,
+    ) -> None:
+        self.seq = seq
+        self.max_line_length = max_line_length
+        self.nbytes = 0
+        self._lines: deque[str] = deque(maxlen=maxlen)
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __str__(self) -> str:
+        return self.text
+
+    @property
+    def text(self) -> str:
+        """All the kept lines joined as they are shown in the terminal."""
+        return "".join(line + "\n" for line in self._lines)
+
+    @property
+    def first_seq(self) -> int:
+        """The sequence number of the oldest line kept."""
+        return self.seq - len(self._lines) + 1
+
+    def write(self, text: str) -> None:
+        """
+        Add text to the history, every line of the text becomes a line
+        of the history, a trailing line break doesn't add an empty line.
+
+        Parameters
+        ----------
+        text: str
+            The text to add.
+        """
+        lines = text.split("\n")
+        if len(lines) > 1 and lines[-1] == "":
+            lines.pop()
+        for line in lines:
+            if len(line) > self.max_line_length:
+                line = line[:self.max_line_length - 1] + TRUNCATED
+            if len(self._lines) == self._lines.maxlen:
+                self.nbytes -= sys.getsizeof(self._lines.popleft())
+            self._lines.append(line)
+            self.nbytes += sys.getsizeof(line)
+            self.seq += 1
+
+    def clear(self) -> None:
+        """
+        Remove all lines. A sequence number is used up by the removal,
+        so callers holding the removed lines are told to reset.
+        """
+        self._lines.clear()
+        self.nbytes = 0
+        self.seq += 1
+
+    def shrink(self, keep: int) -> None:
+        """
+        Remove the oldest lines until at most `keep` lines are left, the
+        sequence numbers of the other lines don't change.
+
+        Parameters
+        ----------
+        keep: int
+            The number of lines to keep.
+        """
+        while len(self._lines) > max(keep, 0):
+            self.nbytes -= sys.getsizeof(self._lines.popleft())
+
+    def to_bytes(self) -> bytes:
+        """
+        Pack the lines and sequence number, see from_bytes().
+
+        Returns
+        -------
+        bytes
+            The packed history.
+        """
+        packer = Packer()
+        packer.pack("QII", self.seq, self._lines.maxlen, len(self._lines))
+        packer.text("\n".join(self._lines))
+        return packer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TerminalHistory":
+        """
+        Unpack a history packed by to_bytes().
+
+        Parameters
+        ----------
+        data: bytes
+            The packed history.
+
+        Returns
+        -------
+        TerminalHistory
+            A history with the same lines and sequence numbers.
+
+        Raises
+        ------
+        ValueError
+            If data isn't a packed history.
+        """
+        unpacker = Unpacker(data)
+        seq, maxlen, count = unpacker.unpack("QII")
+        text = unpacker.text()
+        unpacker.done()
+        lines = text.split("\n") if count else []
+        if (
+            len(lines) != count or count > maxlen or count > seq
+            or (not count and text)
+        ):
+            raise ValueError("corrupted terminal history")
+        history = cls(maxlen, seq - count)
+        for line in lines:
+            history.write(line)
+        return history
+
+    def since(self, seq: int | None) -> Delta:
+        """
+        Returns the lines added after a sequence number. When lines
+        after it are no longer kept, or the sequence number is unknown,
+        all the kept lines are returned with `reset` set, telling the
+        caller to replace what it shows instead of appending to it.
+
+        Parameters
+        ----------
+        seq: int | None
+            The sequence number of the last line the caller has, None
+            to get every kept line.
+
+        Returns
+        -------
+        Delta
+            The new lines and the sequence number of the last one.
+        """
+        if seq is None or not self.first_seq - 1 <= seq <= self.seq:
+            return Delta(list(self._lines), self.seq, True)
+        skip = len(self._lines) - (self.seq - seq)
+        return Delta(list(islice(self._lines, skip, None)), self.seq, False)
@@ -3,10 +3,15 @@ A modified version of morse code converter for website demo purpose.
 """
 
 
+from collections.abc import Iterable, Iterator
 from string import ascii_letters, digits, punctuation
 from typing import Literal
 
+from demo_common.packing import FORMAT_VERSION, Packer, Unpacker
+from demo_common.terminal import TerminalHistory
 from demo_morse_code_converter.convert_tables import ConvertTables
+from demo_morse_code_converter.decoder import MorseDecoder
+from demo_morse_code_converter.encoder import MorseEncoder
 
 EXCLUDE = r'''#%*<>[\]^`{|}~'''
 for symbols in EXCLUDE:
@@ -17,6 +22,9 @@ type MorseCode = Literal[
     "dot", "dash", "code_space", "letter_space", "word_space"
     ]
 type MorseValue = str
+type ConvertMode = Literal["encode", "decode"]
+
+CONVERT_MODES: list[ConvertMode] = ["encode", "decode"]
 
 
 class Converter:
@@ -41,9 +49,75 @@ class Converter:
         self.word_space = ConvertTables.word_space
 
         # for demo only
-        self.history = ""
+        self.history = TerminalHistory()
+        self.mode: ConvertMode = "encode"
 
         self.codes = self.morsecode_regulator()
+        self.encoder = self.build_encoder()
+        self.decoder = self.build_decoder()
+
+    def to_bytes(self) -> bytes:
+        """
+        Pack the configs, mode and history into compact bytes.
+
+        Returns
+        -------
+        bytes
+            The packed converter, see from_bytes().
+        """
+        packer = Packer()
+        packer.pack("BB", FORMAT_VERSION, CONVERT_MODES.index(self.mode))
+        for value in self._configs().values():
+            packer.text(value)
+        packer.raw(self.history.to_bytes())
+        return packer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Converter":
+        """
+        Unpack a converter packed by to_bytes().
+
+        Parameters
+        ----------
+        data: bytes
+            The packed converter.
+
+        Returns
+        -------
+        Converter
+            The converter, as it was when packed.
+
+        Raises
+        ------
+        ValueError
+            If data isn't a converter packed by this version.
+        """
+        unpacker = Unpacker(data)
+        version, mode = unpacker.unpack("BB")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unknown format version {version}")
+        if mode >= len(CONVERT_MODES):
+            raise ValueError("corrupted converter")
+        converter = cls()
+        configs: dict[MorseCode, MorseValue] = {
+            key: unpacker.text() for key in converter._configs()
+            }
+        if configs != converter._configs():
+            converter.update_configs(configs=configs)
+        converter.mode = CONVERT_MODES[mode]
+        converter.history = TerminalHistory.from_bytes(unpacker.raw())
+        unpacker.done()
+        return converter
+
+    def _configs(self) -> dict[MorseCode, MorseValue]:
+        """The current morse code values, as update_configs() takes."""
+        return {
+            'dot': self.dot,
+            'dash': self.dash,
+            'code_space': self.code_space,
+            'letter_space': self.letter_space,
+            'word_space': self.word_space,
+        }
 
     def morsecode_regulator(self) -> dict[str, str]:
         """
@@ -104,6 +178,42 @@ class Converter:
                 )
         return codes
 
+    def build_encoder(self) -> MorseEncoder:
+        """
+        Precompile the current codes and spacing into an encoding
+        engine, has to be called again whenever either of them changes.
+
+        Returns
+        -------
+        MorseEncoder
+            The engine used by convert() and convert_many().
+        """
+        return MorseEncoder(
+            self.codes,
+            include=INCLUDE_WORDS,
+            code_space=self.code_space,
+            letter_space=self.letter_space,
+            word_space=self.word_space,
+            )
+
+    def build_decoder(self) -> MorseDecoder:
+        """
+        Build the lookup trie of the current codes and spacing into a
+        decoding engine, has to be called again whenever either of them
+        changes.
+
+        Returns
+        -------
+        MorseDecoder
+            The engine used by decode() and decode_stream().
+        """
+        return MorseDecoder(
+            self.codes,
+            code_space=self.code_space,
+            letter_space=self.letter_space,
+            word_space=self.word_space,
+            )
+
     def update_configs(
         self, *, configs: dict[MorseCode, MorseValue] | None
     ) -> None:
@@ -129,6 +239,8 @@ class Converter:
         self.code_space = configs['code_space']
         self.letter_space = configs['letter_space']
         self.word_space = configs['word_space']
+        self.encoder = self.build_encoder()
+        self.decoder = self.build_decoder()
 
     def convert(self, user_input: str) -> str:
         """
@@ -144,18 +256,54 @@ class Converter:
         str
             String converted to morse code.
         """
-        output = ''
-        for letter in user_input:
-            if letter == '\r':
-                continue
-            if letter == '\n':
-                output += '\n'
-            elif letter == ' ':
-                output = output.rstrip(self.letter_space) + self.word_space
-            elif letter in INCLUDE_WORDS:
-                code = list(self.codes[letter.upper()])
-                code_space = self.code_space.join(code)
-                output = output + code_space + self.letter_space
-            else:
-                output += f'(invalid_letter:{letter})'
-        return output.rstrip(self.letter_space)
+        return self.encoder.encode(user_input)
+
+    def convert_many(self, user_inputs: Iterable[str]) -> list[str]:
+        """
+        Takes many user inputs and convert each of them into morse
+        code.
+
+        Parameters
+        ----------
+        user_inputs: Iterable[str]
+            Texts to convert into morse code.
+
+        Returns
+        -------
+        list[str]
+            Strings converted to morse code, in the same order.
+        """
+        return self.encoder.encode_many(user_inputs)
+
+    def decode(self, user_input: str) -> str:
+        """
+        Takes morse code from user input and convert it back into text.
+
+        Parameters
+        ----------
+        user_input: str
+            Morse code to convert into text.
+
+        Returns
+        -------
+        str
+            String converted from morse code.
+        """
+        return self.decoder.decode(user_input)
+
+    def decode_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Convert morse code back into text chunk by chunk, for inputs too
+        large to hold in memory at once.
+
+        Parameters
+        ----------
+        chunks: Iterable[str]
+            Morse code to convert, split anywhere.
+
+        Yields
+        ------
+        str
+            Text converted from the morse code received so far.
+        """
+        return self.decoder.stream(chunks)
@@ -0,0 +1,169 @@
+"""
+The morse code decoding engine, converts morse code back into text with
+a lookup trie built from the same tables the converter encodes with.
+"""
+
+
+import re
+from collections.abc import Iterable, Iterator, Mapping
+
+MAX_SHOWN_CODE = 16  # longest invalid code repeated in error markers
+
+
+class _Node:
+    """A node of the lookup trie, one level per dot or dash."""
+    __slots__ = ('letter', 'children')
+
+    def __init__(self) -> None:
+        self.letter: str | None = None
+        self.children: dict[str, _Node] = {}
+
+
+class MorseDecoder:
+    """
+    Converts morse code into text, incrementally if needed.
+
+    The input is split into the longest matching token at each
+    position: a word space, letter space, code space, a dot or dash, or
+    a line break. Dots and dashes walk down the trie, and a letter is
+    emitted when a letter space, word space or line break ends the code.
+
+    Parameters
+    ----------
+    codes: Mapping[str, str]
+        Upper case letters and their morse code, as returned by
+        Converter.morsecode_regulator() and kept up to date by
+        Converter.update_configs().
+    code_space: str
+        Gap between the dots and dashes within a letter.
+    letter_space: str
+        Gap between letters.
+    word_space: str
+        Gap between words.
+    """
+    def __init__(
+        self,
+        codes: Mapping[str, str],
+        *,
+        code_space: str,
+        letter_space: str,
+        word_space: str,
+    ) -> None:
+        self._root = _Node()
+        for letter, code in codes.items():
+            node = self._root
+            for element in code:
+                node = node.children.setdefault(element, _Node())
+            node.letter = letter
+
+        gaps = {
+            gap: name for name, gap in (
+                ('code', code_space),
+                ('letter', letter_space),
+                ('word', word_space),
+            ) if gap
+        }
+        elements = {element for code in codes.values() for element in code}
+        tokens = sorted(
+            [*gaps, *elements, '\n', '\r'], key=len, reverse=True
+            )
+        self._pattern = re.compile(
+            '|'.join(re.escape(token) for token in tokens) + '|.', re.DOTALL
+            )
+        self._gaps = gaps
+        self._elements = elements
+        self._lookahead = max(len(token) for token in tokens)
+
+    def decode(self, text: str) -> str:
+        """
+        Convert morse code into text.
+
+        Parameters
+        ----------
+        text: str
+            Morse code to convert into text.
+
+        Returns
+        -------
+        str
+            String converted from morse code.
+        """
+        return ''.join(self.stream([text]))
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Convert morse code into text chunk by chunk. Only the tail of a
+        chunk that could be the start of a longer token is kept between
+        chunks, so the memory used doesn't grow with the input.
+
+        Parameters
+        ----------
+        chunks: Iterable[str]
+            Morse code to convert, split anywhere.
+
+        Yields
+        ------
+        str
+            Text converted from the morse code received so far.
+        """
+        buffer = ''
+        node: _Node | None = self._root
+        code = ''
+        for chunk in chunks:
+            buffer += chunk
+            safe = len(buffer) - self._lookahead
+            output, node, code, end = self._consume(buffer, safe, node, code)
+            buffer = buffer[end:]
+            if output:
+                yield output
+        output, node, code, _ = self._consume(buffer, len(buffer), node, code)
+        yield output + self._flush(node, code)
+
+    def _consume(
+        self, buffer: str, safe: int, node: _Node | None, code: str
+    ) -> tuple[str, _Node | None, str, int]:
+        """
+        Decode the tokens of `buffer` that start at or before `safe`.
+
+        Returns
+        -------
+        tuple[str, _Node | None, str, int]
+            The text decoded, the trie node and code of the unfinished
+            letter, and where in `buffer` to continue.
+        """
+        output: list[str] = []
+        end = 0
+        for match in self._pattern.finditer(buffer):
+            if match.start() > safe:
+                break
+            end = match.end()
+            token = match.group()
+            gap = self._gaps.get(token)
+            if gap == 'code' or token == '\r':
+                continue
+            if gap is None and token in self._elements:
+                if node is not None:
+                    node = node.children.get(token)
+                if len(code) <= MAX_SHOWN_CODE:
+                    code += token
+                continue
+            output.append(self._flush(node, code))
+            node, code = self._root, ''
+            if gap == 'word':
+                output.append(' ')
+            elif token == '\n':
+                output.append('\n')
+            elif gap is None:
+                output.append(f'(invalid_letter:{token})')
+        return ''.join(output), node, code, end
+
+    @staticmethod
+    def _flush(node: _Node | None, code: str) -> str:
+        """Returns the letter of a finished code."""
+        if not code:
+            return ''
+        if node is not None and node.letter is not None:
+            return node.letter
+        if len(code) > MAX_SHOWN_CODE:
+            code = code[:MAX_SHOWN_CODE] + '...'
+        return f'(invalid_code:{code})'
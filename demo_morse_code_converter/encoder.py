@@ -0,0 +1,138 @@
+"""
+The morse code encoding engine, codes for every acceptable letter are
+joined once when the engine is built, so converting a text is a single
+linear pass over it.
+"""
+
+
+from collections.abc import Iterable, Mapping
+
+WORD_MARK = '\x00'
+
+
+class _TranslateTable(dict[int, str]):
+    """
+    A ``str.translate`` table that turns letters without a morse code
+    into an error marker instead of passing them through.
+    """
+    def __missing__(self, key: int) -> str:
+        return f'(invalid_letter:{chr(key)})'
+
+
+class MorseEncoder:
+    """
+    Converts text into morse code with precompiled codes.
+
+    Parameters
+    ----------
+    codes: Mapping[str, str]
+        Upper case letters and their morse code, as returned by
+        Converter.morsecode_regulator().
+    include: str
+        Letters accepted for convertion, looked up in `codes` by their
+        upper case.
+    code_space: str
+        Gap between the dots and dashes within a letter.
+    letter_space: str
+        Gap between letters.
+    word_space: str
+        Gap between words.
+    """
+    def __init__(
+        self,
+        codes: Mapping[str, str],
+        *,
+        include: str,
+        code_space: str,
+        letter_space: str,
+        word_space: str,
+    ) -> None:
+        table = _TranslateTable()
+        for letter in include:
+            code = codes.get(letter.upper())
+            if code is not None:
+                table[ord(letter)] = code_space.join(code) + letter_space
+        table[ord('\r')] = ''
+        table[ord('\n')] = '\n'
+
+        self._table = table
+        self._letter_space = letter_space
+        self._word_space = word_space
+
+        # When every letter of the word space is also stripped as letter
+        # space, consecutive word spaces collapse into one, so the whole
+        # text can be translated at once and split on the word spaces.
+        self._marked_table: _TranslateTable | None = None
+        if (
+            set(word_space) <= set(letter_space)
+            and not any(WORD_MARK in code for code in table.values())
+        ):
+            self._marked_table = _TranslateTable(table)
+            self._marked_table[ord(' ')] = WORD_MARK
+
+    def encode(self, text: str) -> str:
+        """
+        Convert text into morse code. The text is translated as a whole,
+        or word by word when the spacing doesn't allow that, and only
+        the gap in front of each word space is trimmed, so the cost
+        grows linearly with the length of the text.
+
+        Parameters
+        ----------
+        text: str
+            Text to convert into morse code.
+
+        Returns
+        -------
+        str
+            String converted to morse code.
+        """
+        if self._marked_table is not None and WORD_MARK not in text:
+            letter_space = self._letter_space
+            first, *words = [
+                word.rstrip(letter_space) for word
+                in text.translate(self._marked_table).split(WORD_MARK)
+                ]
+            words = [word for word in words if word]
+            if not words:
+                return first
+            return first + self._word_space + self._word_space.join(words)
+
+        words = text.split(' ')
+        parts = [words[0].translate(self._table)]
+        for word in words[1:]:
+            self._trim(parts)
+            parts.append(self._word_space)
+            parts.append(word.translate(self._table))
+        self._trim(parts)
+        return ''.join(parts)
+
+    def encode_many(self, texts: Iterable[str]) -> list[str]:
+        """
+        Convert many texts into morse code with the same engine.
+
+        Parameters
+        ----------
+        texts: Iterable[str]
+            Texts to convert into morse code.
+
+        Returns
+        -------
+        list[str]
+            Strings converted to morse code, in the same order.
+        """
+        encode = self.encode
+        return [encode(text) for text in texts]
+
+    def _trim(self, parts: list[str]) -> None:
+        """
+        Strip letter space from the end of the converted parts, the same
+        way ``str.rstrip`` would on the joined string. Every part is
+        stripped at most once before it's popped, so this stays linear.
+        """
+        while parts:
+            tail = parts[-1].rstrip(self._letter_space)
+            if tail:
+                parts[-1] = tail
+                return
+            parts.pop()
@@ -0,0 +1,220 @@
+"""
+The bitboard engine of the tic tac toe demo, each player's marks are
+kept as a 9-bit integer, position n of the grid being bit n - 1.
+"""
+from functools import lru_cache
+
+GRID: str = '\
+  7 | 8 | 9 \n.\
+ -----------\n.\
+  4 | 5 | 6 \n.\
+ -----------\n.\
+  1 | 2 | 3 \n'
+
+POSITIONS = range(1, 10)
+FULL = 0b111_111_111
+BOARDS = 3 ** 9  # every way to fill the grid with X, O or nothing
+
+type Line = tuple[int, ...]
+
+
+def bit(position: int) -> int:
+    """The bit of a position of the grid."""
+    return 1 << (position - 1)
+
+
+def _lines_through(position: int) -> tuple[Line, ...]:
+    """
+    The lines a mark at `position` can complete, in the order and
+    direction they are shown to the players.
+    """
+    if position == 5:
+        return tuple((1 + step, 5, 9 - step) for step in range(4))
+    row = (position - 1) // 3 * 3 + 1
+    column = (position - 1) % 3 + 1
+    lines: list[Line] = [
+        (row, row + 1, row + 2), (column, column + 3, column + 6)
+        ]
+    if position % 2 != 0:
+        lines.append((position, 5, 10 - position))  # corners
+    return tuple(lines)
+
+
+CELL_LINES: dict[int, tuple[tuple[int, Line], ...]] = {
+    position: tuple(
+        (bit(a) | bit(b) | bit(c), (a, b, c))
+        for a, b, c in _lines_through(position)
+        )
+    for position in POSITIONS
+}
+WIN_MASKS: frozenset[int] = frozenset(
+    mask for lines in CELL_LINES.values() for mask, _ in lines
+    )
+
+
+def is_win(board: int) -> bool:
+    """
+    Check a player's marks against every line of the grid.
+
+    Parameters
+    ----------
+    board: int
+        The marks of a player.
+
+    Returns
+    -------
+    bool
+        If the marks complete any line.
+    """
+    return any(board & mask == mask for mask in WIN_MASKS)
+
+
+def winning_lines(board: int, position: int) -> list[Line]:
+    """
+    The lines completed by the mark at `position`, only the at most four
+    lines through it are checked.
+
+    Parameters
+    ----------
+    board: int
+        The marks of the player, including the mark at `position`.
+    position: int
+        The position just marked.
+
+    Returns
+    -------
+    list[Line]
+        The completed lines, empty if there's none.
+    """
+    return [
+        line for mask, line in CELL_LINES[position] if board & mask == mask
+        ]
+
+
+def _symbols(x: int, o: int) -> dict[int, str]:
+    """The symbol on each position, ' ' for empty positions."""
+    symbols: dict[int, str] = {}
+    for position in POSITIONS:
+        if x & bit(position):
+            symbols[position] = 'X'
+        elif o & bit(position):
+            symbols[position] = 'O'
+        else:
+            symbols[position] = ' '
+    return symbols
+
+
+@lru_cache(maxsize=BOARDS)
+def render_grid(x: int, o: int) -> str:
+    """
+    The in-game grid next to the placeable positions, as shown in the
+    terminal of the demo. Built once for every board.
+
+    Parameters
+    ----------
+    x: int
+        The marks of player 1.
+    o: int
+        The marks of player 2.
+
+    Returns
+    -------
+    str
+        The grids with a frame, ending with a line break.
+    """
+    grid = placeable = GRID
+    for position, symbol in _symbols(x, o).items():
+        grid = grid.replace(str(position), symbol)
+        if symbol != ' ':
+            placeable = placeable.replace(str(position), ' ')
+    output = "="*28 + "\n"
+    output += " tic tac toe  |   placeable" + "\n"
+    for left, right in zip(
+        grid.replace('\n', '').split('.'), placeable.split('.')
+    ):
+        output += f"{left}  | {right}"
+    output += "="*28 + "\n"
+    return output
+
+
+@lru_cache(maxsize=BOARDS)
+def render_highlighted(x: int, o: int) -> tuple[str, ...]:
+    """
+    The rows of the grid at the end of a round, with the numbers of the
+    positions left out. Built once for every board.
+
+    Parameters
+    ----------
+    x: int
+        The marks of player 1.
+    o: int
+        The marks of player 2.
+
+    Returns
+    -------
+    tuple[str, ...]
+        The rows of the grid.
+    """
+    hl_grid = GRID.replace(".", "")
+    for position, symbol in _symbols(x, o).items():
+        hl_grid = hl_grid.replace(str(position), symbol)
+    return tuple(hl_grid.split('\n')[:-1])
+
+
+class BitBoard:
+    """
+    The 3x3 board kept as the bitboards of player 1 and player 2, with
+    the same methods as demo_tic_tac_toe.board.ArrayBoard.
+    """
+    size = 3
+    k = 3
+
+    def __init__(self) -> None:
+        self.boards: list[int] = [0, 0]
+
+    def to_bytes(self) -> bytes:
+        """The two bitboards, 9 bits each in 3 bytes."""
+        return (self.boards[0] | self.boards[1] << 9).to_bytes(3, "little")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BitBoard":
+        """
+        Unpack a board packed by to_bytes().
+
+        Raises
+        ------
+        ValueError
+            If data isn't a packed 3x3 board.
+        """
+        value = int.from_bytes(data, "little")
+        x, o = value & FULL, value >> 9
+        if len(data) != 3 or x & o or o > FULL:
+            raise ValueError("corrupted 3x3 board")
+        board = cls()
+        board.boards = [x, o]
+        return board
+
+    def is_empty(self, position: int) -> bool:
+        """If nothing is placed at position."""
+        return not (self.boards[0] | self.boards[1]) & bit(position)
+
+    def place(self, position: int, player: int) -> None:
+        """Place the mark of a player, 0 for player 1, 1 for player 2."""
+        self.boards[player] |= bit(position)
+
+    def winning_lines(self, position: int) -> list[Line]:
+        """The lines completed by the mark at position."""
+        player = 0 if self.boards[0] & bit(position) else 1
+        return winning_lines(self.boards[player], position)
+
+    def is_full(self) -> bool:
+        """If every position is placed."""
+        return (self.boards[0] | self.boards[1]) == FULL
+
+    def render(self) -> str:
+        """See render_grid()."""
+        return render_grid(*self.boards)
+
+    def render_final(self) -> tuple[str, ...]:
+        """See render_highlighted()."""
+        return render_highlighted(*self.boards)
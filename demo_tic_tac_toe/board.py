@@ -0,0 +1,272 @@
+"""
+The boards of the tic tac toe demo, an array-backed board for any size
+and any number in a row, and the bitboards for the classic 3x3 game.
+
+Positions are numbered like a numeric keypad, 1 is the bottom left and
+size * size the top right.
+"""
+from functools import cache
+from typing import Protocol
+
+from demo_tic_tac_toe.bitboard import BitBoard, Line
+
+MIN_SIZE = 3
+MAX_SIZE = 19
+SYMBOLS = ' XO'  # empty, player 1 and player 2
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))  # -, |, / and \
+
+
+class Board(Protocol):
+    """What ShowMaker needs from a board, players are 0 and 1."""
+    size: int
+    k: int
+
+    def is_empty(self, position: int) -> bool:
+        ...
+
+    def place(self, position: int, player: int) -> None:
+        ...
+
+    def winning_lines(self, position: int) -> list[Line]:
+        ...
+
+    def is_full(self) -> bool:
+        ...
+
+    def render(self) -> str:
+        ...
+
+    def render_final(self) -> tuple[str, ...]:
+        ...
+
+    def to_bytes(self) -> bytes:
+        ...
+
+
+@cache
+def allow_input(size: int) -> frozenset[str]:
+    """The inputs accepted as positions on a board of `size`."""
+    return frozenset(str(position) for position in range(1, size*size + 1))
+
+
+def make_board(size: int = 3, k: int = 3, data: bytes | None = None) -> Board:
+    """
+    Make an empty board, the bitboards are used for the 3x3 game.
+
+    Parameters
+    ----------
+    size: int, by default 3
+        The number of rows and columns.
+    k: int, by default 3
+        The number of marks in a row that wins.
+    data: bytes | None, by default None
+        The marks packed by the to_bytes() of a board of the same size
+        and k, None for an empty board.
+
+    Returns
+    -------
+    Board
+        The board.
+
+    Raises
+    ------
+    ValueError
+        If size or k is out of range, or data isn't a packed board.
+    """
+    if size == k == 3:
+        return BitBoard() if data is None else BitBoard.from_bytes(data)
+    board = ArrayBoard(size, k)
+    if data is not None:
+        board.load(data)
+    return board
+
+
+class ArrayBoard:
+    """
+    A board of any size, with a cell in a bytearray for each position.
+
+    Only the four directions through a new mark are walked to find the
+    lines it completes, at most k - 1 cells each way. The rendered rows
+    are kept, and only the row of a new mark is rendered again.
+
+    Parameters
+    ----------
+    size: int, by default 3
+        The number of rows and columns, MIN_SIZE to MAX_SIZE.
+    k: int, by default 3
+        The number of marks in a row that wins, 3 to `size`.
+
+    Raises
+    ------
+    ValueError
+        If size or k is out of range.
+    """
+    def __init__(self, size: int = 3, k: int = 3) -> None:
+        if not MIN_SIZE <= size <= MAX_SIZE:
+            raise ValueError(
+                f"size should be {MIN_SIZE} ~ {MAX_SIZE}, got {size}."
+                )
+        if not 3 <= k <= size:
+            raise ValueError(f"k should be 3 ~ {size}, got {k}.")
+        self.size = size
+        self.k = k
+        self.cells = bytearray(size * size)
+        self.placed = 0
+
+        self._width = len(str(size * size))
+        self._grid_rows: list[str] = []
+        self._placeable_rows: list[str] = []
+        self._render_rows()
+
+    def is_empty(self, position: int) -> bool:
+        """If nothing is placed at position."""
+        return self.cells[position - 1] == 0
+
+    def place(self, position: int, player: int) -> None:
+        """
+        Place the mark of a player.
+
+        Parameters
+        ----------
+        position: int
+            An empty position.
+        player: int
+            0 for player 1, 1 for player 2.
+        """
+        self.cells[position - 1] = player + 1
+        self.placed += 1
+        row = (position - 1) // self.size
+        self._grid_rows[row] = self._render_row(row)
+        self._placeable_rows[row] = self._render_row(row, placeable=True)
+
+    def winning_lines(self, position: int) -> list[Line]:
+        """
+        The lines of k or more marks through the mark at position.
+
+        Parameters
+        ----------
+        position: int
+            The position just marked.
+
+        Returns
+        -------
+        list[Line]
+            The positions of each line from its lowest position, in the
+            order -, |, / and \\, empty if there's none.
+        """
+        size, cells = self.size, self.cells
+        index = position - 1
+        player = cells[index]
+        row, column = divmod(index, size)
+        lines: list[Line] = []
+        for d_row, d_column in DIRECTIONS:
+            run = [index]
+            for sign in (-1, 1):
+                r, c = row + sign * d_row, column + sign * d_column
+                for _ in range(self.k - 1):
+                    if not (0 <= r < size and 0 <= c < size):
+                        break
+                    if cells[r * size + c] != player:
+                        break
+                    run.append(r * size + c)
+                    r, c = r + sign * d_row, c + sign * d_column
+            if len(run) >= self.k:
+                lines.append(tuple(i + 1 for i in sorted(run)))
+        return lines
+
+    def is_full(self) -> bool:
+        """If every position is placed."""
+        return self.placed == self.size * self.size
+
+    def render(self) -> str:
+        """
+        The in-game grid next to the placeable positions, in the same
+        layout as demo_tic_tac_toe.bitboard.render_grid().
+
+        Returns
+        -------
+        str
+            The grids with a frame, ending with a line break.
+        """
+        width = len(self._grid_rows[0])
+        separator = " " + "-" * (width - 1)
+        lines = ["="*(width*2 + 4)]
+        lines.append(f"{' tic tac toe':<{width}}  |   placeable")
+        for row in reversed(range(self.size)):
+            lines.append(
+                f"{self._grid_rows[row]}  | {self._placeable_rows[row]}"
+                )
+            if row:
+                lines.append(f"{separator}  | {separator}")
+        lines.append("="*(width*2 + 4))
+        return "\n".join(lines) + "\n"
+
+    def render_final(self) -> tuple[str, ...]:
+        """
+        The rows of the grid at the end of a round, in the same layout
+        as demo_tic_tac_toe.bitboard.render_highlighted().
+
+        Returns
+        -------
+        tuple[str, ...]
+            The rows of the grid.
+        """
+        separator = " " + "-" * (len(self._grid_rows[0]) - 1)
+        rows: list[str] = []
+        for row in reversed(range(self.size)):
+            rows.append(self._grid_rows[row])
+            if row:
+                rows.append(separator)
+        return tuple(rows)
+
+    def to_bytes(self) -> bytes:
+        """The cells, 2 bits each with 4 cells in a byte."""
+        cells = self.cells + bytes(-len(self.cells) % 4)
+        return bytes(
+            cells[i] | cells[i+1] << 2 | cells[i+2] << 4 | cells[i+3] << 6
+            for i in range(0, len(cells), 4)
+            )
+
+    def load(self, data: bytes) -> None:
+        """
+        Replace the cells with the ones packed by to_bytes().
+
+        Raises
+        ------
+        ValueError
+            If data isn't the packed cells of a board of this size.
+        """
+        count = len(self.cells)
+        if len(data) != (count + 3) // 4:
+            raise ValueError(f"corrupted {self.size}x{self.size} board")
+        cells = bytearray(
+            byte >> shift & 3 for byte in data for shift in (0, 2, 4, 6)
+            )
+        if cells[count:].strip(b"\x00") or 3 in cells:
+            raise ValueError(f"corrupted {self.size}x{self.size} board")
+        self.cells = cells[:count]
+        self.placed = count - self.cells.count(0)
+        self._render_rows()
+
+    def _render_rows(self) -> None:
+        """Render every row of both grids."""
+        self._grid_rows = [self._render_row(row) for row in range(self.size)]
+        self._placeable_rows = [
+            self._render_row(row, placeable=True) for row in range(self.size)
+            ]
+
+    def _render_row(self, row: int, placeable: bool = False) -> str:
+        """
+        A row of the in-game grid, or of the placeable grid where placed
+        positions are left out and empty ones show their number.
+        """
+        start = row * self.size
+        cells: list[str] = []
+        for index in range(start, start + self.size):
+            if placeable:
+                text = str(index + 1) if self.cells[index] == 0 else ""
+                cells.append(f" {text:>{self._width}} ")
+            else:
+                text = SYMBOLS[self.cells[index]]
+                cells.append(f" {text:^{self._width}} ")
+        return " " + "|".join(cells)
@@ -1,47 +1,56 @@
 """
 A modified version of tic tac toe for website demo purpose.
 """
-
-GRID: str = '\
-  7 | 8 | 9 \n.\
- -----------\n.\
-  4 | 5 | 6 \n.\
- -----------\n.\
-  1 | 2 | 3 \n'
+from demo_common.packing import FORMAT_VERSION, Packer, Unpacker
+from demo_common.terminal import TerminalHistory
+from demo_tic_tac_toe.bitboard import BitBoard
+from demo_tic_tac_toe.board import allow_input, make_board
+from demo_tic_tac_toe.solver import DIFFICULTIES, solver
 
 symbols = ['X', 'O']
-allow_input = [str(x) for x in range(1, 10)]
-horizon = [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
-verical = [[1, 4, 7], [2, 5, 8], [3, 6, 9]]
+winner_states: list[str | bool] = [False, True, "draw"]
 
 
 class ShowMaker():
     """
     A 2-player based tic tac toe game,
     organizer of the game, with not much customization to save time.
+    The grid can be larger than 3x3 with more marks in a row to win, and
+    on a 3x3 grid player 2 can be played by the computer.
 
     Functions
     ---------
     new_game() shows greet text, and setup everything,
-    player_input() ask players to place X and O alternately.
+    player_input() ask players to place X and O alternately,
+    set_board() change the size of the grid and the marks to win,
+    set_computer() let the computer play as player 2,
+    to_bytes() and from_bytes() pack and unpack the whole game.
+
+    Parameters
+    ----------
+    size: int, by default 3
+        The number of rows and columns of the grid.
+    k: int, by default 3
+        The number of marks in a row that wins.
     """
-    def __init__(self) -> None:
+    def __init__(self, size: int = 3, k: int = 3) -> None:
+        self.size = size
+        self.k = k
         self.iswinner: str | bool = False
         self.current_player = False
         self._round = 0
         self._p1_score = 0
         self._p2_score = 0
         self._setup_new_game()
+        self.computer: str | None = None  # difficulty, None for 2 players
 
         # this only for the demo
-        self.output = ""
+        self.output = TerminalHistory()
         self.input_required = False
-        self.history: str = ""
+        self.history = TerminalHistory()
 
         # for the type checkers
         self.pwd = ""
-        self._grid: str = GRID
-        self._placeable_grid: str = GRID
 
     def initiate(self) -> None:
         """
@@ -54,35 +63,101 @@ class ShowMaker():
         self._p1_score = 0
         self._p2_score = 0
         self._setup_new_game()
+        self.computer = None
 
         # this only for the demo
-        self.output = ""
+        self.output.clear()
         self.input_required = False
-        self.history = ""
+        self.history.clear()
 
         # for the type checkers
         self.pwd = ""
-        self._grid = GRID
-        self._placeable_grid = GRID
+
+    def to_bytes(self) -> bytes:
+        """
+        Pack the game into compact bytes, the board takes 3 bytes on a
+        3x3 grid and 2 bits a position on larger ones.
+
+        Returns
+        -------
+        bytes
+            The packed game, see from_bytes().
+        """
+        difficulties = [None, *DIFFICULTIES]
+        packer = Packer()
+        packer.pack(
+            "BBBBBIII",
+            FORMAT_VERSION,
+            self.size,
+            self.k,
+            int(self.current_player)
+            | winner_states.index(self.iswinner) << 1,
+            difficulties.index(self.computer),
+            self._round,
+            self._p1_score,
+            self._p2_score,
+            )
+        packer.text(self.pwd)
+        packer.raw(self._board.to_bytes())
+        packer.raw(self.output.to_bytes())
+        packer.raw(self.history.to_bytes())
+        return packer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ShowMaker":
+        """
+        Unpack a game packed by to_bytes().
+
+        Parameters
+        ----------
+        data: bytes
+            The packed game.
+
+        Returns
+        -------
+        ShowMaker
+            The game, as it was when packed.
+
+        Raises
+        ------
+        ValueError
+            If data isn't a game packed by this version.
+        """
+        difficulties = [None, *DIFFICULTIES]
+        unpacker = Unpacker(data)
+        (
+            version, size, k, flags, computer, round_, p1_score, p2_score
+        ) = unpacker.unpack("BBBBBIII")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unknown format version {version}")
+        if flags >> 1 >= len(winner_states) or computer >= len(difficulties):
+            raise ValueError("corrupted game")
+        showmaker = cls(size, k)
+        showmaker.set_computer(difficulties[computer])
+        showmaker.current_player = bool(flags & 1)
+        showmaker.iswinner = winner_states[flags >> 1]
+        showmaker._round = round_
+        showmaker._p1_score = p1_score
+        showmaker._p2_score = p2_score
+        showmaker.pwd = unpacker.text()
+        showmaker._board = make_board(size, k, unpacker.raw())
+        showmaker.output = TerminalHistory.from_bytes(unpacker.raw())
+        showmaker.history = TerminalHistory.from_bytes(unpacker.raw())
+        unpacker.done()
+        return showmaker
 
     def _setup_new_game(self) -> None:
         """
-        Set current player alternately, resets _placed, _grid,
-        _placeable_grid, the state of playing and iswinner.
+        Set current player alternately, resets _board.
 
-        In-game grid on the left is _grid, right is _placeable_grid.
+        _board holds the marks of player 1 and player 2, see
+        demo_tic_tac_toe.board.
         """
         if self._round % 2 == 0:
             self.current_player = False  # use True as 1 and False as 0
         else:
             self.current_player = True
-        self._placed: dict[int, str] = {
-            1: ' ', 2: ' ', 3: ' ',
-            4: ' ', 5: ' ', 6: ' ',
-            7: ' ', 8: ' ', 9: ' ',
-        }
-        self._grid = GRID
-        self._placeable_grid = GRID
+        self._board = make_board(self.size, self.k)
 
     def new_game(self) -> None:
         """
@@ -90,6 +165,8 @@ class ShowMaker():
         """
         self._setup_new_game()
         self._show_grid()
+        if self.computer is not None and self.current_player:
+            self._computer_move()
         self.pwd = (
             f'player {int(self.current_player)+1}'
             f'({symbols[self.current_player]}) marks: '
@@ -115,15 +192,92 @@ class ShowMaker():
             f'({symbols[self.current_player]}) marks: '
             )
         if self._placeable(user_input):
-            self._show_grid()
-            self._end_check(user_input)
-            self._draw_check()
-            self.current_player = not self.current_player
+            self._mark(user_input)
+            if self.computer is not None and not self.iswinner:
+                self._computer_move()
             self.pwd = (
                 f'player {int(self.current_player)+1}'
                 f'({symbols[self.current_player]}) marks: '
             )
 
+    def set_board(self, size: int, k: int) -> None:
+        """
+        Change the grid, takes effect from the next new_game().
+
+        Parameters
+        ----------
+        size: int
+            The number of rows and columns of the grid,
+            demo_tic_tac_toe.board.MIN_SIZE ~ MAX_SIZE.
+        k: int
+            The number of marks in a row that wins, 3 ~ size.
+
+        Raises
+        ------
+        ValueError
+            If size or k is out of range, or the computer is playing
+            and the grid isn't 3x3.
+        """
+        make_board(size, k)  # raises if out of range
+        if self.computer is not None and not size == k == 3:
+            raise ValueError("the computer only plays on a 3x3 grid.")
+        self.size = size
+        self.k = k
+
+    def set_computer(self, difficulty: str | None) -> None:
+        """
+        Let the computer play as player 2, takes effect from the next
+        new_game().
+
+        Parameters
+        ----------
+        difficulty: str | None
+            One of demo_tic_tac_toe.solver.DIFFICULTIES, None to play
+            with 2 players.
+
+        Raises
+        ------
+        ValueError
+            If difficulty is unknown, or the grid isn't 3x3.
+        """
+        if difficulty is not None and difficulty not in DIFFICULTIES:
+            raise ValueError(
+                f"difficulty should be one of {list(DIFFICULTIES)} or None,"
+                f" got {difficulty!r}."
+                )
+        if difficulty is not None and not self.size == self.k == 3:
+            raise ValueError("the computer only plays on a 3x3 grid.")
+        self.computer = difficulty
+
+    def _mark(self, position: str) -> None:
+        """
+        Show the grid after the current player placed at position, check
+        if the round ended, then change the current player.
+
+        Parameters
+        ----------
+        position: str
+            The position placed by the current player.
+        """
+        self._show_grid()
+        self._end_check(position)
+        self._draw_check()
+        self.current_player = not self.current_player
+
+    def _computer_move(self) -> None:
+        """
+        Place the mark of player 2 at the position chosen by the solver.
+        """
+        assert self.computer is not None
+        assert isinstance(self._board, BitBoard)
+        position = str(solver.choose(
+            self._board.boards[True], self._board.boards[False],
+            self.computer
+            ))
+        self._update_grid(position)
+        self._mark(position)
+        self.output.write(f"computer marks: {position}")
+
     def _placeable(self, position: str) -> bool:
         """
         Check if position is in allow_input and is unique(haven't
@@ -139,17 +293,15 @@ class ShowMaker():
         bool
             If position is in allow_input and is unique.
         """
-        if position not in allow_input:
-            self.output += (
+        if position not in allow_input(self.size):
+            self.output.write(
                 f"user input '{position}' is not allowed.\n"
-                "accept numbers 1 ~ 9."
+                f"accept numbers 1 ~ {self.size * self.size}."
                 )
             return False
 
-        # pylint: disable-next=consider-using-dict-items
-        placeable = [k for k in self._placed if self._placed[k] == " "]
-        if int(position) not in placeable:
-            self.output += (
+        if not self._board.is_empty(int(position)):
+            self.output.write(
                 f"position '{position}' is occupied,\npick another position."
                 )
             return False
@@ -158,37 +310,21 @@ class ShowMaker():
 
     def _update_grid(self, position: str) -> None:
         """
-        Update the grid with position(allowed and unique), also updates:
-        _grid: position will be replaced by players represent symbol
-        _placeable_grid: position will be replaced by ' '
-        _placed: store relationship between position and symbol
+        Mark position(allowed and unique) on the current player's board.
 
         Parameters
         ----------
         position: str
             The position user input to place 'O' or 'X'.
         """
-        symbol = symbols[self.current_player]
-        self._placed[int(position)] = symbol
-        self._grid = self._grid.replace(position, symbol)
-        self._placeable_grid = self._placeable_grid.replace(position, " ")
+        self._board.place(int(position), int(self.current_player))
 
     def _show_grid(self) -> None:
         """
-        Modify the grid to current state of the game, and print it out
-        after format.
+        Print the grid of the current state of the game after format.
         """
-        grid = self._grid
-        for num in range(1, 10):
-            grid = grid.replace(str(num), " ")
-        grid = grid.replace('\n', '')
-        split_grid: list[str] = grid.split('.')
-        split_placeable_grid: list[str] = self._placeable_grid.split('.')
-        self.output = "="*28 + "\n"
-        self.output += " tic tac toe  |   placeable" + "\n"
-        for num, _ in enumerate(split_grid):
-            self.output += f"{split_grid[num]}  | {split_placeable_grid[num]}"
-        self.output += "="*28 + "\n"
+        self.output.clear()
+        self.output.write(self._board.render())
 
     def _draw_check(self) -> None:
         """
@@ -196,9 +332,10 @@ class ShowMaker():
         if none, game is draw and round is ended,
         lastly print player scores.
         """
-        if " " not in self._placed.values() and not self.iswinner:
+        if self._board.is_full() and not self.iswinner:
             self.iswinner = "draw"
-            self.history = "draw.\n"
+            self.history.clear()
+            self.history.write("draw.\n")
             self._show_highlighted_grid()
 
     def _end_check(self, user_input: str) -> None:
@@ -212,56 +349,11 @@ class ShowMaker():
         user_input: str
             The position user input to place 'O' or 'X'.
         """
-        if user_input == "5":
-            self._win_con_5()
-            return None
-        num: int = int(user_input)
-        idx_x = (num-1) // 3
-        idx_y = (num-1) % 3
-        x = horizon[idx_x]
-        y = verical[idx_y]
-        positions = [x, y]
-        win_con: list[list[str]] = []
-        for pos in positions:
-            # '-' -> '|' shape check
-            if (
-                self._placed[pos[0]] == self._placed[pos[1]]
-                and self._placed[pos[1]] == self._placed[pos[2]]
-            ):
-                win_con.append([str(pos[0]), str(pos[1]), str(pos[2])])
-        input_num = int(user_input)
-        if input_num % 2 != 0:
-            if (
-                self._placed[input_num] == self._placed[5]
-                and self._placed[5] == self._placed[10-input_num]
-            ):
-                # 'X' shape check on corner place
-                win_con.append([str(input_num), str(5), str(10-input_num)])
-        if win_con:
-            self.iswinner = True
-            if self.current_player:
-                self._p2_score = self._p2_score + 1
-            else:
-                self._p1_score = self._p1_score + 1
-            self._show_win_positions(win_con)
-            self._show_highlighted_grid()
-
-    def _win_con_5(self) -> None:
-        """
-        Only tests if the current placement at the position 5 will
-        result a winner, if Ture, show the winning line's position in
-        grid with highlighted text, and print position of the line.
-        """
-        left = 1
-        mid = 5
-        right = 9
-        win_con = []
-        for step in range(4):
-            if (
-                self._placed[left+step] == self._placed[mid]
-                and self._placed[mid] == self._placed[right-step]
-            ):
-                win_con.append([str(left+step), str(mid), str(right-step)])
+        position = int(user_input)
+        win_con = [
+            [str(num) for num in line] for line in
+            self._board.winning_lines(position)
+            ]
         if win_con:
             self.iswinner = True
             if self.current_player:
@@ -293,21 +385,23 @@ class ShowMaker():
             return None
         if not isinstance(con[0], list):
             con = [con]  # type: ignore
-        self.history = (
+        history = (
             f'player {int(self.current_player)+1}'
             f'({symbols[self.current_player]}) wins last round with position: '
             )
         if isinstance(con[0], list):
             for wc in con:
-                self.history += "[" + ", ".join(wc) + "], "  # type: ignore
-            self.history = self.history.rstrip(", ")
-            self.history += "\n"
+                history += "[" + ", ".join(wc) + "], "  # type: ignore
+            history = history.rstrip(", ")
+            history += "\n"
         elif isinstance(con[0], str):
-            self.history += ', '.join(con[0]) + "\n"  # type: ignore
+            history += ', '.join(con[0]) + "\n"  # type: ignore
         else:
             raise ValueError(
                 f"con[0] != list or str, con = {con}, type = {type(con[0])}"
                 )
+        self.history.clear()
+        self.history.write(history)
         return None
 
     def _show_highlighted_grid(self) -> None:
@@ -315,29 +409,19 @@ class ShowMaker():
         Takes winning line(s)'s position as input,
         print the grid with highlighted winning line.
         """
-        hl_grid: str = GRID.replace(".", "")
-        for num in range(1, 10):
-            hl_grid = hl_grid.replace(str(num), f"【{num}】")
-
-        # pylint: disable-next=consider-using-dict-items
-        for position in self._placed:
-            hl_grid = hl_grid.replace(
-                f"【{str(position)}】", self._placed[position]
-                )
-        layers = hl_grid.split('\n')[:-1]
-        self.history += "-"*28 + "\n"
-        for layer in layers:
-            self.history += f"        {layer}\n"
-        self.history += "-"*28 + "\n"
+        self.history.write("-"*28)
+        for layer in self._board.render_final():
+            self.history.write(f"        {layer}")
+        self.history.write("-"*28)
         self._show_score()
 
     def _show_score(self):
         """
         print players score after format.
         """
-        self.history += '~'*17 + "\n"
-        self.history += '     score' + "\n"
-        self.history += f" player 1(X):  {self._p1_score}" + "\n"
-        self.history += f" player 2(O):  {self._p2_score}" + "\n"
-        self.history += '~'*17 + "\n"
+        self.history.write('~'*17)
+        self.history.write('     score')
+        self.history.write(f" player 1(X):  {self._p1_score}")
+        self.history.write(f" player 2(O):  {self._p2_score}")
+        self.history.write('~'*17)
         self._round = self._round + 1
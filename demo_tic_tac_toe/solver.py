@@ -0,0 +1,228 @@
+"""
+The computer opponent of the tic tac toe demo. Every position the game
+can reach is solved once with minimax, and the scores are kept in a
+table indexed by the position, so choosing a move is a few lookups.
+"""
+import os
+import random
+from array import array
+from pathlib import Path
+
+from demo_tic_tac_toe.bitboard import BOARDS, FULL, POSITIONS, bit, is_win
+
+# the chance to play one of the best moves, otherwise a worse move is
+# played when there's one
+DIFFICULTIES: dict[str, float] = {
+    "easy": 0.4,
+    "normal": 0.8,
+    "perfect": 1.0,
+}
+UNSOLVED = -128
+
+_rng = random.Random()
+
+# base 3 digits of every bitboard, a position is the sum of the digits of
+# the player to move and twice the digits of the other player
+_DIGITS: list[int] = [
+    sum(3 ** (position - 1) for position in POSITIONS if board & bit(position))
+    for board in range(FULL + 1)
+]
+
+
+def index(mine: int, theirs: int) -> int:
+    """
+    The index of a position in the table.
+
+    Parameters
+    ----------
+    mine: int
+        The marks of the player to move.
+    theirs: int
+        The marks of the other player.
+
+    Returns
+    -------
+    int
+        The index, below BOARDS.
+    """
+    return _DIGITS[mine] + 2 * _DIGITS[theirs]
+
+
+class Solver:
+    """
+    The minimax scores of every reachable position, for the player to
+    move. A win scores 10 minus the number of marks on the grid when it
+    happens, so quicker wins and slower losses are preferred, a draw
+    scores 0.
+
+    Parameters
+    ----------
+    table: array[int] | None, by default None
+        Scores saved by save(), the positions are solved when None.
+
+    Raises
+    ------
+    ValueError
+        If `table` doesn't have a score for every position.
+    """
+    def __init__(self, table: array[int] | None = None) -> None:
+        if table is not None and len(table) != BOARDS:
+            raise ValueError(f"expected {BOARDS} scores, got {len(table)}")
+        self._table = table or array('b', [UNSOLVED]) * BOARDS
+        if table is None:
+            self._solve(0, 0)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Solver":
+        """
+        Load the scores saved by save(), positions are solved and saved
+        to `path` if it doesn't exist yet.
+
+        Parameters
+        ----------
+        path: str | Path
+            The file of the scores.
+
+        Returns
+        -------
+        Solver
+            The solver.
+        """
+        path = Path(path)
+        if not path.exists():
+            solver = cls()
+            solver.save(path)
+            return solver
+        table = array('b')
+        table.frombytes(path.read_bytes())
+        return cls(table)
+
+    def save(self, path: str | Path) -> None:
+        """
+        Save the scores, one byte for each position.
+
+        Parameters
+        ----------
+        path: str | Path
+            The file to write to.
+        """
+        Path(path).write_bytes(self._table.tobytes())
+
+    def scores(self, mine: int, theirs: int) -> dict[int, int]:
+        """
+        The score of every empty position for the player to move.
+
+        Parameters
+        ----------
+        mine: int
+            The marks of the player to move.
+        theirs: int
+            The marks of the other player.
+
+        Returns
+        -------
+        dict[int, int]
+            The positions and their scores.
+        """
+        taken = mine | theirs
+        scores: dict[int, int] = {}
+        for position in POSITIONS:
+            if taken & bit(position):
+                continue
+            after = mine | bit(position)
+            score = _final_score(after, theirs)
+            if score is None:
+                score = -self._table[index(theirs, after)]
+            scores[position] = score
+        return scores
+
+    def choose(
+        self,
+        mine: int,
+        theirs: int,
+        difficulty: str = "perfect",
+        rng: random.Random | None = None,
+    ) -> int:
+        """
+        Choose a position for the player to move.
+
+        Parameters
+        ----------
+        mine: int
+            The marks of the player to move.
+        theirs: int
+            The marks of the other player.
+        difficulty: str, by default "perfect"
+            One of DIFFICULTIES.
+        rng: random.Random | None, by default None
+            The random generator to pick between moves, a generator
+            shared by every solver when None.
+
+        Returns
+        -------
+        int
+            The position, 1 to 9.
+
+        Raises
+        ------
+        ValueError
+            If the grid is full.
+        """
+        rng = rng or _rng
+        scores = self.scores(mine, theirs)
+        if not scores:
+            raise ValueError("no empty position left.")
+        best = max(scores.values())
+        best_moves = [pos for pos, score in scores.items() if score == best]
+        worse_moves = [pos for pos, score in scores.items() if score < best]
+        if worse_moves and rng.random() >= DIFFICULTIES[difficulty]:
+            return rng.choice(worse_moves)
+        return rng.choice(best_moves)
+
+    def _solve(self, mine: int, theirs: int) -> int:
+        """Negamax over the positions after this one, memoized in the table."""
+        key = index(mine, theirs)
+        if self._table[key] == UNSOLVED:
+            best = UNSOLVED
+            for position in POSITIONS:
+                if (mine | theirs) & bit(position):
+                    continue
+                after = mine | bit(position)
+                score = _final_score(after, theirs)
+                if score is None:
+                    score = -self._solve(theirs, after)
+                best = max(best, score)
+            self._table[key] = best
+        return self._table[key]
+
+
+def _final_score(after: int, theirs: int) -> int | None:
+    """
+    The score of a move that ends the round, None if the round goes on.
+
+    Parameters
+    ----------
+    after: int
+        The marks of the player who moved, including the move.
+    theirs: int
+        The marks of the other player.
+    """
+    if is_win(after):
+        return 10 - (after | theirs).bit_count()
+    if (after | theirs) == FULL:
+        return 0
+    return None
+
+
+def _default_solver() -> Solver:
+    """
+    The solver of the demo, loaded from the file at TIC_TAC_TOE_TABLE if
+    the environment variable is set.
+    """
+    path = os.getenv("TIC_TAC_TOE_TABLE")
+    if path:
+        return Solver.load(path)
+    return Solver()
+
+
+solver = _default_solver()
@@ -1,47 +1,82 @@
 """
 The source code of the server.
 """
+import logging
 import os
-import smtplib
+from resource.assets import Assets
 from resource.classes import (
-    COOKIE_PATH, HREF_HOME, AboutImage, AboutText, AllowedTitles, Base,
-    ContactText, Current, Project, RouteRetVal, handle_lang_pref, set_cookies
+    HREF_HOME, AllowedTitles, Base, Current, RouteRetVal, handle_lang_pref,
+    set_cookies
     )
-
-from flask import Flask, redirect, render_template, request, url_for
+from resource.content import ContentCache
+from resource.fragments import Fragments
+from resource.images import Images
+from resource.languages import LanguageRefresher
+from resource.media import Media
+from resource.metrics import metrics
+from resource.outbox import Outbox
+from resource.pagecache import PageCache
+from resource.ratelimit import RateLimiter
+from resource.sessions import (
+    SESSION_STATELESS, CookieStore, DemoState, SessionStore, demo_state_size,
+    new_demo_state, session_id
+    )
+from resource.startup import Startup
+from resource.streams import STREAM_MAX, Snapshot, StreamHub
+from resource.templating import setup_jinja
+from resource.tracing import tracer
+from typing import Any
+from urllib.parse import urlsplit
+
+from flask import Flask, jsonify, redirect, render_template, request, url_for
 from flask_bootstrap import Bootstrap5  # type: ignore[import-untyped, note]
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
 from waitress import serve
+from werkzeug.exceptions import HTTPException
 from werkzeug.wrappers.response import Response
 
-from demo_morse_code_converter.converter import Converter
-from demo_tic_tac_toe.showmaker_demo import ShowMaker
-
 # ---------------------------------------------------------------------
 
 MAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
 MAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 APP_KEY = os.getenv("APP_SECRET_KEY")
 SQL_DB_URI = os.getenv("SQL_DB_URI")
+PORT: int = int(os.getenv("PORT") or 10000)
+# worker threads of waitress, a quarter at most hold demo streams
+THREADS: int = int(os.getenv("THREADS") or 8)
+LOG_LEVEL = os.getenv("LOG_LEVEL") or "INFO"
 
 assert isinstance(MAIL_ADDRESS, str), f"Environment variable {MAIL_ADDRESS=}"
 assert isinstance(MAIL_PASSWORD, str), f"Environment variable {MAIL_PASSWORD=}"
 assert isinstance(APP_KEY, str), f"Environment variable {APP_KEY=}"
 assert isinstance(SQL_DB_URI, str), f"Environment variable {SQL_DB_URI=}"
 
+logging.basicConfig(level=LOG_LEVEL)
+
 # setup flask
 app = Flask(__name__)
+startup = Startup()
+startup.init_app(app)
+metrics.init_app(app)
+tracer.init_app(app)
 app.config['SECRET_KEY'] = APP_KEY
 app.config["SQLALCHEMY_DATABASE_URI"] = SQL_DB_URI
 db = SQLAlchemy(model_class=Base)
+content = ContentCache(db, app)
+# the about pages show the GitHub languages, refreshed by `languages`
+pages = PageCache(lambda: content.generation + languages.generation)
+setup_jinja(app, lambda: content.generation)
+limiter = RateLimiter()
 
 
 # website routes
 @app.route('/')
 @set_cookies
+@pages.cached
 def home() -> RouteRetVal:
     """The home page of website."""
-    project_data = db.session.execute(db.select(Project)).scalars().all()
+    project_data = content.get().projects
     language = handle_lang_pref()
     body = render_template(
         "index.html",
@@ -55,24 +90,12 @@ def home() -> RouteRetVal:
 
 @app.route("/about/<title>")
 @set_cookies
+@pages.cached
 def about(title: AllowedTitles) -> RouteRetVal:
     """The about page of website."""
-    static_data = db.session.execute(
-        db.select(AboutText).where(AboutText.info_name == title)
-        ).scalar()
-
-    tags_whole = render_template("magic-star.html", current=current)
-    tags_former, tags_latter = tags_whole.split(
-        current.effect_placeholder_spliter
-        )
-    effect = {
-        current.effect_placeholder_former: tags_former,
-        current.effect_placeholder_latter: tags_latter,
-    }
-
-    background = db.session.execute(
-        db.select(AboutImage).where(AboutImage.info_name == title)
-        ).scalar()
+    snapshot = content.get()
+    static_data = snapshot.about_texts.get(title)
+    background = snapshot.about_images.get(title)
 
     language = handle_lang_pref()
     body = render_template(
@@ -82,22 +105,22 @@ def about(title: AllowedTitles) -> RouteRetVal:
         title=title,
         static_data=static_data,
         background=background,
-        effect=effect,
         page="about"
         )
     return body, language
 
 
 @app.route("/contact", methods=["GET", "POST"])
+@limiter.limit("contact", "5/600")
 @set_cookies
 def contact() -> RouteRetVal:
     """The contact page of website."""
-    static_data = db.session.execute(db.select(ContactText)).scalar()
+    static_data = content.get().contact
     language = handle_lang_pref()
     msg_sent = False
     if request.method == "POST":
         data = request.form
-        send_email(data["name"], data["email"], data["message"])
+        outbox.enqueue(data["name"], data["email"], data["message"])
         msg_sent = True
     body = render_template(
         "contact.html",
@@ -112,6 +135,7 @@ def contact() -> RouteRetVal:
 
 @app.route("/policy")
 @set_cookies
+@pages.cached
 def policy() -> RouteRetVal:
     language = handle_lang_pref()
     body = render_template(
@@ -127,151 +151,487 @@ def policy() -> RouteRetVal:
 def switch_language() -> RouteRetVal:
     """
     Switch website display language between Traditional Chinese and
-    English.
+    English, then go back to the page in ``?next=``.
     """
     language = handle_lang_pref(switch=True)
-    endpoint = request.cookies.get(COOKIE_PATH, default=HREF_HOME).lstrip("/")
-    endpoint = "home" if endpoint == "" else endpoint
-    if endpoint.startswith("about"):
-        endpoint, title = endpoint.split("/", maxsplit=1)
-        body = redirect(url_for(endpoint, title=title))
-    else:
-        body = redirect(url_for(endpoint))
-    return body, language
+    path = request.args.get("next", default="").strip()
+    if not is_local_page(path):
+        path = HREF_HOME or "/"
+    return redirect(path), language
+
+
+def is_local_page(path: str) -> bool:
+    """
+    If `path` is a page of this website, so it's safe to redirect to.
+
+    Browsers drop tabs and newlines from URLs, and read "\\" as "/",
+    so "/<tab>/host" would be "//host" on another website. A path with
+    whitespace or control characters is never a page.
+    """
+    if not path.startswith("/") or path[1:2] in ("/", "\\"):
+        return False
+    if not path.isprintable() or any(char.isspace() for char in path):
+        return False
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc:
+        return False
+    try:
+        app.url_map.bind("localhost").match(parts.path)
+    except HTTPException:
+        return False
+    return True
 
 
 @app.route("/gate/tic-tac-toe")
 def gate_tic_tac_toe() -> Response:
     """
     The page to redirect to tic tac toe demo.
-    This also resets the demo.
+    This also resets the visitor's demo, ``?size=<n>&k=<k>`` sets the
+    grid to n x n with k marks in a row to win, and on a 3x3 grid
+    ``?computer=<difficulty>`` lets the computer play as player 2.
     """
-    dk_showmaker.initiate()
-    dk_showmaker.new_game()
+    # pylint: disable-next=import-outside-toplevel
+    from demo_tic_tac_toe.solver import DIFFICULTIES
+
+    size = request.args.get("size", 3, type=int)
+    k = request.args.get("k", 3, type=int)
+    difficulty = request.args.get("computer")
+    sid = session_id()
+    with demo_sessions.checkout(sid) as state:
+        state.showmaker.initiate()
+        try:
+            state.showmaker.set_board(size, k)
+        except ValueError:
+            state.showmaker.set_board(3, 3)
+        if difficulty in DIFFICULTIES and state.showmaker.size == 3:
+            state.showmaker.set_computer(difficulty)
+        state.showmaker.new_game()
+    demo_streams.publish(sid, "tic-tac-toe")
     return redirect(url_for('demo_tic_tac_toe'))
 
 
 @app.route("/demo/tic-tac-toe", methods=['GET', 'POST'])
+@limiter.limit("demo", "60/30")
 def demo_tic_tac_toe() -> str:
     """The page with tic tac toe demo."""
+    sid = session_id()
+    with demo_sessions.checkout(sid) as state:
+        if request.method == "POST":
+            enter = request.form.get('user_input') or ""
+            state.showmaker.player_input(
+                user_input=enter
+                )
+        context = tic_tac_toe_context(state)
     if request.method == "POST":
-        enter = request.form.get('user_input') or ""
-        dk_showmaker.player_input(
-            user_input=enter
-            )
-    result = dk_showmaker.output
-    pwd = dk_showmaker.pwd
-    history = dk_showmaker.history
-    is_winner = str(dk_showmaker.iswinner)
-    player = int(dk_showmaker.current_player) + 1
-    return render_template(
-        'demo-tic_tac_toe.html',
-        terminal_lines=result,
-        pwd=pwd,
-        history=history,
-        is_winner=is_winner,
-        player=player
-        )
+        demo_streams.publish(sid, "tic-tac-toe")
+    return render_template('demo-tic_tac_toe.html', **context)
 
 
 @app.route('/demo/tic-tac-toe/input-receive')
 def demo_tic_tac_toe_input_receive() -> str:
-    """The page to receive user input on tic tac toe demo."""
-    result = dk_showmaker.output
-    pwd = dk_showmaker.pwd
-    history = dk_showmaker.history
-    is_winner = str(dk_showmaker.iswinner)
-    player = int(dk_showmaker.current_player) + 1
+    """
+    The page to receive user input on tic tac toe demo, only terminal
+    lines after the sequence number in ``?since=`` are included.
+    """
+    since = request.args.get("since", type=int)
+    with demo_sessions.checkout(session_id()) as state:
+        context = tic_tac_toe_context(state, since=since)
     return render_template(
-        'demo-cz_terminal-tic_tac_toe.html',
-        terminal_lines=result,
-        pwd=pwd, history=history,
-        is_winner=is_winner,
-        player=player
+        'demo-cz_terminal-tic_tac_toe.html', **context
         )  # cz stands for customized
 
 
+@app.route("/api/demo/tic-tac-toe", methods=["POST"])
+@limiter.limit("demo", "60/30")
+def api_demo_tic_tac_toe() -> Response:
+    """
+    Apply user input to tic tac toe demo and respond with the terminal
+    lines added after the sequence number in `since`, so the demo page
+    is updated with a single request.
+    """
+    enter, since, _ = demo_payload()
+    sid = session_id()
+    with demo_sessions.checkout(sid) as state:
+        state.showmaker.player_input(user_input=enter)
+        payload = tic_tac_toe_payload(state, since)
+    demo_streams.publish(sid, "tic-tac-toe")
+    return jsonify(payload)
+
+
+@app.route("/demo/tic-tac-toe/stream")
+def demo_tic_tac_toe_stream() -> Response:
+    """
+    Server-Sent Events of the visitor's tic tac toe demo, starts after
+    the sequence number in `Last-Event-ID` or ``?since=``.
+    """
+    sid = session_id()
+
+    def snapshot(since: int | None) -> dict[str, Any]:
+        with demo_sessions.checkout(sid) as state:
+            return tic_tac_toe_payload(state, since)
+    return demo_stream(sid, "tic-tac-toe", snapshot)
+
+
 @app.route("/gate/morse-code-converter")
 def gate_morse_code_converter() -> Response:
     """
     The page to redirect to morse code converter demo.
-    This also resets the demo.
+    This also resets the visitor's demo.
     """
-    converter.history = ""
+    sid = session_id()
+    with demo_sessions.checkout(sid) as state:
+        state.converter.history.clear()
+    demo_streams.publish(sid, "morse-code-converter")
     return redirect(url_for('demo_morse_code_converter'))
 
 
 @app.route('/demo/morse-code-converter', methods=['GET', 'POST'])
+@limiter.limit("demo", "60/30")
 def demo_morse_code_converter() -> str:
     """The page with morse code converter demo."""
+    sid = session_id()
+    with demo_sessions.checkout(sid) as state:
+        if request.method == "POST":
+            morse_code_input(
+                state,
+                user_input=request.form.get('user_input') or "",
+                mode=request.form.get('mode'),
+                )
+        delta = state.converter.history.since(None)
+        mode = state.converter.mode
     if request.method == "POST":
-        enter = request.form.get('user_input') or ""
-        converter.history += enter + "\n"
-        converter.history += converter.convert(
-            user_input=enter
-            ) + "\n"
+        demo_streams.publish(sid, "morse-code-converter")
     return render_template(
-        'demo-morse_code_converter.html',
-        terminal_lines=converter.history,
+        'demo-morse_code_converter.html', delta=delta, mode=mode
         )
 
 
 @app.route('/demo/morse-code-converter/input-recieve')
 def demo_morse_code_converter_input_receive() -> str:
-    """The page to receive user input on morse code converter demo."""
+    """
+    The page to receive user input on morse code converter demo, only
+    terminal lines after the sequence number in ``?since=`` are
+    included.
+    """
+    since = request.args.get("since", type=int)
+    with demo_sessions.checkout(session_id()) as state:
+        delta = state.converter.history.since(since)
     return render_template(
-        'demo-cz_terminal-morse_code_converter.html',
-        terminal_lines=converter.history,
+        'demo-cz_terminal-morse_code_converter.html', delta=delta
         )  # cz stands for customized
 
 
+@app.route("/api/demo/morse", methods=["POST"])
+@limiter.limit("demo", "60/30")
+def api_demo_morse() -> Response:
+    """
+    Apply user input to morse code converter demo and respond with the
+    terminal lines added after the sequence number in `since`, so the
+    demo page is updated with a single request.
+    """
+    enter, since, mode = demo_payload()
+    sid = session_id()
+    with demo_sessions.checkout(sid) as state:
+        morse_code_input(state, user_input=enter, mode=mode)
+        payload = morse_code_payload(state, since)
+    demo_streams.publish(sid, "morse-code-converter")
+    return jsonify(payload)
+
+
+@app.route("/demo/morse-code-converter/stream")
+def demo_morse_code_converter_stream() -> Response:
+    """
+    Server-Sent Events of the visitor's morse code converter demo,
+    starts after the sequence number in `Last-Event-ID` or ``?since=``.
+    """
+    sid = session_id()
+
+    def snapshot(since: int | None) -> dict[str, Any]:
+        with demo_sessions.checkout(sid) as state:
+            return morse_code_payload(state, since)
+    return demo_stream(sid, "morse-code-converter", snapshot)
+
+
 # other functions
-def send_email(name: str, email: str, message: str) -> None:
+def demo_stream(sid: str, demo: str, snapshot: Snapshot) -> Response:
     """
-    Use my email address to send emails to myself, so there is no need
-    to valid user input on this.
+    Open a Server-Sent Events stream of a visitor's demo.
 
     Parameters
     ----------
-    name: str
-        The name of the user who sent the email.
-    email: str
-        The email address of the user who sent the email.
-    message: str
-        The message as the email body.
-    """
-    email_message = (
-        f"Subject:Message from site.\n\n{message}"
-        f"\n\nby {name}.\nEmail: {email}"
-    )
-    with smtplib.SMTP("smtp.gmail.com") as connection:
-        connection.starttls()
-        connection.login(
-            user=MAIL_ADDRESS, password=MAIL_PASSWORD  # type: ignore
-            )
-        connection.sendmail(
-            from_addr=MAIL_ADDRESS, to_addrs=MAIL_ADDRESS,  # type: ignore
-            msg=email_message
+    sid: str
+        The session id of the visitor.
+    demo: str
+        The name of the demo, as used with ``demo_streams.publish()``.
+    snapshot: Snapshot
+        Returns the payload of the lines after a sequence number.
+
+    Returns
+    -------
+    Response
+        The stream, or 503 when this worker has no stream slot left.
+        Without state on the server no worker can see other requests'
+        updates, so with DEMO_STATELESS 204 tells the page not to try.
+    """
+    if SESSION_STATELESS:
+        return Response(status=204)
+    subscription = demo_streams.open(sid, demo)
+    if subscription is None:
+        return Response(
+            "too many streams", status=503, headers={"Retry-After": "30"}
             )
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", type=int)
+    return Response(
+        demo_streams.events(subscription, snapshot, since),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+def demo_payload() -> tuple[str, int | None, str | None]:
+    """
+    Read the user input of a demo API request, sent either as JSON or
+    as a form.
+
+    Returns
+    -------
+    tuple[str, int | None, str | None]
+        The user input, the sequence number of the last terminal line
+        the page shows, and the mode of the morse code converter.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = request.form.to_dict()
+    try:
+        since = int(data["since"])
+    except (KeyError, TypeError, ValueError):
+        since = None
+    return str(data.get("user_input") or ""), since, data.get("mode")
+
+
+def morse_code_input(
+    state: DemoState, *, user_input: str, mode: str | None
+) -> None:
+    """
+    Convert user input on morse code converter demo and write both to
+    the terminal, meant to be called while the visitor's session is
+    checked out.
+
+    Parameters
+    ----------
+    state: DemoState
+        The demo objects of the visitor.
+    user_input: str
+        The user input.
+    mode: str | None
+        "decode" to convert morse code into text, anything else to
+        convert text into morse code.
+    """
+    converter = state.converter
+    if mode == "decode":
+        converter.mode = "decode"
+        result = converter.decode(user_input=user_input)
+    else:
+        converter.mode = "encode"
+        result = converter.convert(user_input=user_input)
+    converter.history.write(user_input.replace("\r", "") + "\n")
+    converter.history.write(result + "\n")
+
+
+def morse_code_payload(
+    state: DemoState, since: int | None
+) -> dict[str, Any]:
+    """
+    The JSON payload with the morse code converter terminal lines after
+    a sequence number, meant to be called while the visitor's session is
+    checked out.
+    """
+    delta = state.converter.history.since(since)
+    return {**delta._asdict(), "mode": state.converter.mode}
+
+
+def tic_tac_toe_payload(
+    state: DemoState, since: int | None
+) -> dict[str, Any]:
+    """
+    The JSON payload with the tic tac toe terminal lines after a
+    sequence number, meant to be called while the visitor's session is
+    checked out.
+    """
+    context = tic_tac_toe_context(state, since=since)
+    return {
+        **context["delta"]._asdict(),
+        "pwd": context["pwd"],
+        "status": context["status"],
+        "history": context["history"],
+    }
+
+
+def tic_tac_toe_context(
+    state: DemoState, *, since: int | None = None
+) -> dict[str, Any]:
+    """
+    Collect the values the tic tac toe templates need from a visitor's
+    game, meant to be called while the visitor's session is checked
+    out.
+
+    Parameters
+    ----------
+    state: DemoState
+        The demo objects of the visitor.
+    since: int | None, by default None
+        Only include terminal lines after this sequence number, None to
+        include all of them.
+
+    Returns
+    -------
+    dict[str, Any]
+        The template context.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from demo_tic_tac_toe.solver import DIFFICULTIES
+
+    showmaker = state.showmaker
+    is_winner = str(showmaker.iswinner)
+    # players are switched after every mark, the winner marked last
+    winner = int(not showmaker.current_player) + 1
+    if is_winner == "True":
+        if showmaker.computer is None:
+            player = f"player {winner}"
+        else:
+            player = "computer" if winner == 2 else "you"
+        status = (
+            f"{player} wins this round! "
+            "Enter any position to start a new game!"
+        )
+    elif is_winner == "draw":
+        status = "draw! Game continues."
+    else:
+        status = ""
+    return {
+        "delta": showmaker.output.since(since),
+        "pwd": showmaker.pwd,
+        "history": showmaker.history.text,
+        "is_winner": is_winner,
+        "status": status,
+        "computer": showmaker.computer,
+        "difficulties": list(DIFFICULTIES),
+        "size": showmaker.size,
+        "k": showmaker.k,
+    }
 
 
 # init db & bootstrap
 db.init_app(app)
 Bootstrap5(app)
+# emails to myself from the contact page, so there is no need to valid
+# user input on this
+outbox = Outbox(db, app, address=MAIL_ADDRESS, password=MAIL_PASSWORD)
 
-dk_showmaker = ShowMaker()
-dk_showmaker.new_game()
-converter = Converter()
+demo_sessions: SessionStore[DemoState] | CookieStore
+if SESSION_STATELESS:
+    demo_sessions = CookieStore(APP_KEY)
+else:
+    demo_sessions = SessionStore(new_demo_state, sizer=demo_state_size)
+demo_streams = StreamHub(max_streams=max(1, min(STREAM_MAX, THREADS // 4)))
 current = Current()
+fragments = Fragments(app, current)
+fragments.build()
+app.jinja_env.globals["fragments"] = fragments
+languages = LanguageRefresher(current, on_update=fragments.build)
+app.jinja_env.globals["picture"] = Images.load().picture
+Assets.load().init_app(app)
+Media().init_app(app)
+
+
+def cache_counts() -> dict[str, tuple[int, int]]:
+    """The hits and misses of each cache."""
+    fragment_cache = getattr(app.jinja_env, "fragment_cache")
+    return {
+        "content": (content.hits, content.misses),
+        "page": (pages.hits, pages.misses),
+        "fragment": (fragment_cache.hits, fragment_cache.misses),
+    }
+
+
+def cache_hit_ratios() -> dict[tuple[str, ...], float]:
+    """The share of lookups each cache answered."""
+    return {
+        (name,): hits / (hits + misses) if hits + misses else 0.0
+        for name, (hits, misses) in cache_counts().items()
+    }
+
+
+# numbers the objects above keep anyway, read when /metrics is scraped
+metrics.gauge(
+    "portfolio_cache_hits_total", "Cache hits, by cache.",
+    lambda: {(name,): hits for name, (hits, _) in cache_counts().items()},
+    ("cache",), kind="counter",
+    )
+metrics.gauge(
+    "portfolio_cache_misses_total", "Cache misses, by cache.",
+    lambda: {(name,): miss for name, (_, miss) in cache_counts().items()},
+    ("cache",), kind="counter",
+    )
+metrics.gauge(
+    "portfolio_cache_hit_ratio", "Share of lookups answered by a cache.",
+    cache_hit_ratios, ("cache",),
+    )
+metrics.gauge(
+    "portfolio_outbox_messages_total", "Emails of the outbox, by outcome.",
+    lambda: {
+        ("sent",): outbox.sent,
+        ("retried",): outbox.retries,
+        ("failed",): outbox.failed,
+    },
+    ("outcome",), kind="counter",
+    )
+metrics.gauge(
+    "portfolio_outbox_pending", "Emails waiting to be sent.",
+    lambda: {(): outbox.pending},
+    )
+metrics.gauge(
+    "portfolio_rate_limited_total", "Requests answered 429.",
+    lambda: {(): limiter.limited}, kind="counter",
+    )
+if isinstance(demo_sessions, SessionStore):
+    metrics.gauge(
+        "portfolio_demo_sessions", "Demo sessions kept in memory.",
+        lambda: {(): len(demo_sessions)},
+        )
+
+
+def warm_database() -> None:
+    """Open the first connection of the pool."""
+    with app.app_context():
+        db.session.execute(text("SELECT 1"))
+
+
+def compile_templates() -> None:
+    """Compile the templates of the website, or load their bytecode."""
+    assert app.jinja_loader is not None
+    for name in app.jinja_loader.list_templates():
+        app.jinja_env.get_template(name)
+
+
+# warm up in the background, in order, /readyz answers 200 once done
+startup.add("database", warm_database)
+startup.add("outbox", outbox.start)
+startup.add("content", content.start)
+startup.add("templates", compile_templates)
+startup.add("demos", new_demo_state)
+startup.add("languages", languages.start)
+startup.start()
 
 if __name__ == "__main__":
     # local
-    current.update_lang_byte()
     app.run(debug=True, port=5000)
 else:
     # on Render
     assert os.path.exists(current.path_lang_byte), (
         "GitHub language percentages file not exist,"
-        "do ``current.update_lang_byte()`` to create one."
+        "do ``python -m resource.languages`` to create one."
     )
-    serve(app, port=10000, host="0.0.0.0")
+    serve(app, port=PORT, host="0.0.0.0", threads=THREADS)
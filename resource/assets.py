@@ -0,0 +1,285 @@
+"""
+The stylesheets and scripts of the website, bundled by page, minified
+and saved under a name with a hash of their content, next to a gzip
+and a brotli copy, so browsers can keep them for a year.
+
+The templates link a bundle by its name through ``asset_url()``. The
+bundles are built when the server starts if they're missing or older
+than their sources, or with:
+
+    python -m resource.assets
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+from flask import Flask, Response, request, send_from_directory, url_for
+
+try:
+    import brotli  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # pragma: no cover, brotli copies are optional
+    brotli = None
+
+# ---------------------------------------------------------------------
+STATIC_DIR = Path("static")
+SOURCE_DIR = STATIC_DIR / "assets"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+ENCODING = "UTF-8"
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# the bundles by name, with their sources in SOURCE_DIR
+BUNDLES: dict[str, tuple[str, ...]] = {
+    "site.css": ("css/style.css",),
+    "site.js": ("scripts/avatar.js", "scripts/hover.js"),
+    "about.js": ("scripts/magic.js",),
+    "demo-tic_tac_toe.css": ("css/style-demo-tic_tac_toe.css",),
+    "demo-tic_tac_toe.js": ("scripts/demo-tic_tac_toe.js",),
+    "demo-morse_code_converter.css": (
+        "css/style-demo-morse_code_converter.css",
+        ),
+    "demo-morse_code_converter.js": (
+        "scripts/demo-morse_code_converter.js",
+        ),
+}
+# encodings of the compressed copies, by preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+_CSS_TOKENS = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)""", re.S
+    )
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*|:\s+")
+
+
+def minify_css(text: str) -> str:
+    """
+    Remove the comments and the whitespace that doesn't matter from a
+    stylesheet, strings are left as they are.
+    """
+    parts: list[str] = []
+    chunk: list[str] = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(text):
+        string, comment, _ = match.groups()
+        chunk.append(text[position:match.start()])
+        position = match.end()
+        if comment:
+            chunk.append(" ")
+        elif string:
+            parts.append(_squeeze_css("".join(chunk)))
+            parts.append(string)
+            chunk = []
+        else:
+            chunk.append(" ")
+    chunk.append(text[position:])
+    parts.append(_squeeze_css("".join(chunk)))
+    return "".join(parts).strip()
+
+
+def _squeeze_css(text: str) -> str:
+    """Collapse whitespace, and drop it around punctuation."""
+    text = re.sub(r"\s+", " ", text)
+    text = _CSS_PUNCTUATION.sub(lambda match: match.group(1) or ":", text)
+    return text.replace(";}", "}")
+
+
+def minify_js(text: str) -> str:
+    """
+    Remove indentation, blank lines and comments on lines of their own
+    from a script. Line breaks are kept, so automatic semicolons and
+    regular expressions aren't affected, and lines inside template
+    literals are left as they are.
+    """
+    lines: list[str] = []
+    in_comment = in_template = False
+    for line in text.splitlines():
+        if in_template:
+            lines.append(line)
+        elif in_comment:
+            in_comment = "*/" not in line
+            continue
+        else:
+            stripped = line.strip()
+            if not stripped or stripped.startswith("//"):
+                continue
+            if stripped.startswith("/*"):
+                in_comment = "*/" not in stripped
+                continue
+            lines.append(stripped)
+        if (line.count("`") - line.count("\\`")) % 2:
+            in_template = not in_template
+    return "\n".join(lines) + "\n"
+
+
+def build(
+    bundles: dict[str, tuple[str, ...]] | None = None,
+    source_dir: Path = SOURCE_DIR,
+    dist_dir: Path = DIST_DIR,
+    manifest_path: Path = MANIFEST_PATH,
+) -> dict[str, str]:
+    """
+    Build every bundle and save the manifest.
+
+    Parameters
+    ----------
+    bundles: dict[str, tuple[str, ...]] | None, by default None
+        The bundles by name, with their sources, BUNDLES when None.
+    source_dir: Path, by default SOURCE_DIR
+        The folder of the sources.
+    dist_dir: Path, by default DIST_DIR
+        The folder of the bundles.
+    manifest_path: Path, by default MANIFEST_PATH
+        The JSON file of the manifest.
+
+    Returns
+    -------
+    dict[str, str]
+        The manifest, the path of each bundle in the static folder by
+        name.
+    """
+    bundles = BUNDLES if bundles is None else bundles
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    manifest: dict[str, str] = {}
+    for name, sources in bundles.items():
+        texts = [
+            (source_dir / source).read_text(encoding=ENCODING)
+            for source in sources
+            ]
+        stem, suffix = os.path.splitext(name)
+        if suffix == ".css":
+            text = "\n".join(minify_css(text) for text in texts)
+        else:
+            text = ";\n".join(minify_js(text) for text in texts)
+        data = text.encode(ENCODING)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        path = dist_dir / f"{stem}.{digest}{suffix}"
+        _write(path, data)
+        gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+        _write(path.with_name(path.name + ".gz"), gzipped)
+        if brotli is not None:
+            _write(path.with_name(path.name + ".br"), brotli.compress(data))
+        manifest[name] = path.relative_to(STATIC_DIR).as_posix()
+    _write(
+        manifest_path,
+        (json.dumps(manifest, indent=2) + "\n").encode(ENCODING),
+        )
+    os.utime(manifest_path)  # newer than the sources, even if unchanged
+    return manifest
+
+
+def _write(path: Path, data: bytes) -> None:
+    """
+    Write a file through a temporary file, so other workers building at
+    the same time never read half of it.
+    """
+    if path.exists() and path.read_bytes() == data:
+        return
+    temp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temp.write_bytes(data)
+    os.replace(temp, path)
+
+
+class Assets:
+    """
+    The bundles of the website, with ``asset_url()`` for the templates
+    and a route that serves them compressed and immutable.
+
+    Parameters
+    ----------
+    manifest: dict[str, str]
+        The path of each bundle in the static folder by name.
+    """
+    def __init__(self, manifest: dict[str, str]) -> None:
+        self.manifest = manifest
+
+    @classmethod
+    def load(cls, manifest_path: Path = MANIFEST_PATH) -> "Assets":
+        """
+        Load the manifest, the bundles are built first if the manifest
+        is out of date.
+        """
+        if _is_stale(manifest_path):
+            return cls(build(manifest_path=manifest_path))
+        with open(manifest_path, encoding=ENCODING) as file:
+            return cls(json.load(file))
+
+    def asset_url(self, name: str) -> str:
+        """
+        The URL of a bundle by name.
+
+        Raises
+        ------
+        KeyError
+            If there's no bundle of that name.
+        """
+        return url_for("static", filename=self.manifest[name])
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Add ``asset_url()`` to the templates, and the route of the
+        bundles, which is matched before the static route of Flask.
+        """
+        app.jinja_env.globals["asset_url"] = self.asset_url
+        app.add_url_rule(
+            f"{app.static_url_path}/{DIST_DIR.name}/<path:filename>",
+            endpoint="dist",
+            view_func=self.send,
+            )
+
+    def send(self, filename: str) -> Response:
+        """
+        Respond with a bundle, or its compressed copy that the browser
+        accepts.
+        """
+        sent = filename
+        encoding = None
+        for name, suffix in ENCODINGS.items():
+            if request.accept_encodings[name] and (
+                DIST_DIR / (filename + suffix)
+            ).is_file():
+                sent, encoding = filename + suffix, name
+                break
+        response = send_from_directory(
+            DIST_DIR.resolve(),
+            sent,
+            mimetype=_mimetype(filename),
+            max_age=IMMUTABLE_MAX_AGE,
+            )
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def _mimetype(filename: str) -> str | None:
+    """The mime type of a bundle, from its extension."""
+    return {".css": "text/css", ".js": "text/javascript"}.get(
+        os.path.splitext(filename)[1]
+        )
+
+
+def _is_stale(manifest_path: Path) -> bool:
+    """
+    If the manifest is missing, older than a source, or doesn't have
+    every bundle.
+    """
+    if not manifest_path.exists():
+        return True
+    with open(manifest_path, encoding=ENCODING) as file:
+        if set(json.load(file)) != set(BUNDLES):
+            return True
+    built = manifest_path.stat().st_mtime
+    return any(
+        (SOURCE_DIR / source).stat().st_mtime > built
+        for sources in BUNDLES.values() for source in sources
+        )
+
+
+if __name__ == "__main__":
+    for bundle, built_path in build().items():
+        print(f"{bundle}: {built_path}")
@@ -4,15 +4,17 @@ and a class used to record and store website information.
 """
 import json
 import os
+import time
 from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
 from functools import lru_cache, wraps
 from pathlib import Path
+from resource.metrics import metrics
+from resource.tracing import tracer
 from typing import Any, Literal, TypeAlias, cast, get_args
 
-import requests
 from flask import Response, make_response, request
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from werkzeug.datastructures.accept import LanguageAccept
 from werkzeug.wrappers.response import Response as RedirectResponse
@@ -38,15 +40,20 @@ HEADERS = {
     "X-GitHub-Api-Version": "2022-11-28",
 }
 COOKIE_LANG = "language"
-COOKIE_PATH = "endpoint"
 COOKIE_MAX_DAY = 14
 COOKIE_MAX_SEC = COOKIE_MAX_DAY * 24 * 60 * 60
+PAGE_MAX_AGE = 5 * 60
 LANGUAGE_ZH: Languages = "Traditional-Chinese"
 LANGUAGE_EN: Languages = "English"
 
 ENDPOINT: str = os.getenv("ENDPOINT") or ""
 assert ENDPOINT != "", ERRMSG.format(var="ENDPOINT")
 
+SET_COOKIES_SECONDS = metrics.histogram(
+    "portfolio_set_cookies_duration_seconds",
+    "Seconds of set_cookies() after the route function returned.",
+    )
+
 
 class Base(DeclarativeBase):
     """base model for SQLAlchemy."""
@@ -106,6 +113,24 @@ class ContactText(Base):
     form_sent: Mapped[Desc] = mapped_column(JSON, nullable=False)
 
 
+class OutboxMessage(Base):
+    """A message from the contact page waiting to be emailed."""
+    __tablename__ = "OutboxMessage"
+    info_id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(nullable=False)
+    email: Mapped[str] = mapped_column(nullable=False)
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # value hint (status): 'pending', 'sent' or 'failed'
+    status: Mapped[str] = mapped_column(nullable=False, index=True)
+    attempts: Mapped[int] = mapped_column(nullable=False)
+
+    # unix timestamps
+    created_at: Mapped[float] = mapped_column(nullable=False)
+    next_attempt: Mapped[float] = mapped_column(nullable=False)
+    last_error: Mapped[str] = mapped_column(nullable=True)
+
+
 # tracking class
 class Current():
     """
@@ -154,23 +179,22 @@ class Current():
     effect_placeholder_latter = "</magic-star>"
 
     def __init__(self) -> None:
-        self.lang_byte = self.get_lang_byte()
-        self.lang_percentage = self.get_lang_percentage()
-        self.lang_style = self.get_lang_style()
+        self.set_lang_byte(self.get_lang_byte())
 
-    def update_lang_byte(self) -> None:
+    def set_lang_byte(self, lang_byte: dict[str, int]) -> None:
         """
-        Fetch the number of each language in bytes of code from this
-        repository on GitHub, and store the value as Python dict to a
-        JSON file.
+        Replace the number of each language in bytes of code, and the
+        percentages and styles computed from it. The GitHub languages
+        are kept up to date by ``resource.languages``.
+
+        Parameters
+        ----------
+        lang_byte: dict[str, int]
+            Programming language as key and number of bytes of code.
         """
-        response = requests.get(
-            ENDPOINT, headers=HEADERS, timeout=10
-            )
-        response.raise_for_status()
-        lang_byte = json.loads(response.text)
-        with open(self.path_lang_byte, mode="w", encoding=ENCODING) as file:
-            json.dump(lang_byte, file)
+        self.lang_byte = lang_byte
+        self.lang_percentage = self.get_lang_percentage()
+        self.lang_style = self.get_lang_style()
 
     def get_lang_byte(self) -> dict[str, int]:
         """
@@ -322,6 +346,11 @@ def set_cookies(func: Callable[..., RouteRetVal]) -> Callable[..., Response]:
     A decorator to set user preferences in cookies for the Flask route
     function.
 
+    The language cookie is only sent when the language differs from the
+    one the request already implies, so responses without a cookie can
+    be kept by browsers and shared caches, which are told to keep a copy
+    for each language with `Vary`.
+
     Parameters
     ----------
     func: Callable[..., RouteRetVal]
@@ -336,14 +365,24 @@ def set_cookies(func: Callable[..., RouteRetVal]) -> Callable[..., Response]:
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> Response:
         body, language = func(*args, **kwargs)
-        expires = datetime.now(timezone.utc) + timedelta(days=COOKIE_MAX_DAY)
+        started = time.perf_counter()
 
         response = make_response(body)
-        response.set_cookie(
-            COOKIE_PATH, request.path, max_age=COOKIE_MAX_SEC, expires=expires
-            )
-        response.set_cookie(
-            COOKIE_LANG, language, max_age=COOKIE_MAX_SEC, expires=expires
-            )
+        response.vary.update(("Cookie", "Accept-Language"))
+        if language != handle_lang_pref():
+            expires = (
+                datetime.now(timezone.utc) + timedelta(days=COOKIE_MAX_DAY)
+                )
+            response.set_cookie(
+                COOKIE_LANG, language, max_age=COOKIE_MAX_SEC, expires=expires
+                )
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+        elif request.method in ("GET", "HEAD"):
+            response.cache_control.public = True
+            response.cache_control.max_age = PAGE_MAX_AGE
+        elapsed = time.perf_counter() - started
+        SET_COOKIES_SECONDS.observe(elapsed)
+        tracer.record("set_cookies", "cookies", started, elapsed)
         return response
     return wrapper
@@ -0,0 +1,279 @@
+"""
+An in-process snapshot of the website content kept in the database, so
+the pages are served without querying the database. The content only
+changes when the site owner edits it, the snapshot is refreshed in the
+background when a cheap version query sees a change, or after a while.
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from resource.classes import AboutImage, AboutText, Base, ContactText, Project
+from types import MappingProxyType
+from typing import Any
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select
+
+# ---------------------------------------------------------------------
+CONTENT_CHECK_INTERVAL: float = float(
+    os.getenv("CONTENT_CHECK_INTERVAL") or 30
+    )
+CONTENT_MAX_AGE: float = float(os.getenv("CONTENT_MAX_AGE") or 10 * 60)
+MODELS: tuple[type[Base], ...] = (Project, AboutText, AboutImage, ContactText)
+
+logger = logging.getLogger(__name__)
+
+
+def freeze(value: Any) -> Any:
+    """
+    An immutable copy of a value loaded from a JSON column, dicts become
+    read-only mappings and lists become tuples.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType(
+            {key: freeze(val) for key, val in value.items()}
+            )
+    if isinstance(value, list):
+        return tuple(freeze(val) for val in value)
+    return value
+
+
+def _row_type(model: type[Base]) -> type:
+    """A named tuple with a field for each column of a table."""
+    return namedtuple(  # type: ignore[misc]
+        f"{model.__name__}Row", [column.key for column in model.__table__.c]
+        )
+
+
+ROW_TYPES: dict[type[Base], type] = {
+    model: _row_type(model) for model in MODELS
+}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    The rows of the content tables at one point in time, each row is a
+    named tuple with the same attributes as the model.
+    """
+    projects: tuple[Any, ...] = ()
+    about_texts: Mapping[str, Any] = field(default_factory=dict)
+    about_images: Mapping[str, Any] = field(default_factory=dict)
+    contact: Any = None
+    version: tuple[int, ...] = ()
+    loaded_at: float = 0
+
+
+class ContentCache:
+    """
+    Keeps a Snapshot of the content tables. After start(), a background
+    thread runs the version query every `check_interval` seconds, which
+    only counts the rows and takes the largest id of each table, and
+    loads a new snapshot when the version changed or the snapshot is
+    older than `max_age` seconds, so edits that keep the version are
+    picked up too.
+
+    Parameters
+    ----------
+    db: SQLAlchemy
+        The database of the app.
+    app: Flask
+        The app, its context is needed to query the database.
+    check_interval: float
+        Seconds between version queries.
+    max_age: float
+        Seconds before the snapshot is loaded again.
+    """
+    def __init__(
+        self,
+        db: SQLAlchemy,
+        app: Flask,
+        *,
+        check_interval: float = CONTENT_CHECK_INTERVAL,
+        max_age: float = CONTENT_MAX_AGE,
+    ) -> None:
+        self.db = db
+        self.app = app
+        self.check_interval = check_interval
+        self.max_age = max_age
+        # goes up with every snapshot loaded, for caches of the pages
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.checks = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.last_refresh_seconds = 0.0
+        self.total_refresh_seconds = 0.0
+
+        self._snapshot: Snapshot | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self) -> Snapshot:
+        """
+        Returns the current snapshot, loading it from the database only
+        when there's none yet.
+
+        Returns
+        -------
+        Snapshot
+            The content.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        with self._lock:
+            self.misses += 1
+            if self._snapshot is None:
+                self._snapshot = self._load(self._version())
+            return self._snapshot
+
+    def refresh(self, *, force: bool = False) -> bool:
+        """
+        Load a new snapshot if the content changed.
+
+        Parameters
+        ----------
+        force: bool, by default False
+            Load a new snapshot even if the version didn't change.
+
+        Returns
+        -------
+        bool
+            If a new snapshot was loaded.
+        """
+        with self._lock:
+            version = self._version()
+            self.checks += 1
+            snapshot = self._snapshot
+            if (
+                not force
+                and snapshot is not None
+                and snapshot.version == version
+                and time.monotonic() - snapshot.loaded_at < self.max_age
+            ):
+                return False
+            self._snapshot = self._load(version)
+            return True
+
+    def start(self) -> None:
+        """
+        Load the first snapshot and keep it fresh in a background thread.
+        A database that can't be reached yet is retried by the thread.
+        """
+        if self._thread is not None:
+            return
+        try:
+            self.refresh()
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.errors += 1
+            logger.exception("loading the content snapshot failed")
+        self._thread = threading.Thread(
+            target=self._run, name="content-refresh", daemon=True
+            )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict[str, float]:
+        """
+        The counters of the cache.
+
+        Returns
+        -------
+        dict[str, float]
+            Hits and misses of get(), version checks, refreshes, failed
+            refreshes, the seconds the last and all refreshes took, and
+            the age of the snapshot in seconds.
+        """
+        snapshot = self._snapshot
+        age = -1.0
+        if snapshot is not None:
+            age = time.monotonic() - snapshot.loaded_at
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "checks": self.checks,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "total_refresh_seconds": self.total_refresh_seconds,
+            "age_seconds": age,
+        }
+
+    def _run(self) -> None:
+        """The loop of the background thread."""
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.errors += 1
+                logger.exception("refreshing the content snapshot failed")
+
+    def _version(self) -> tuple[int, ...]:
+        """
+        The number of rows and the largest id of each content table, in
+        a single query.
+        """
+        columns = []
+        for model in MODELS:
+            table = model.__table__
+            columns.append(
+                select(func.count()).select_from(table).scalar_subquery()
+                )
+            columns.append(
+                select(func.coalesce(func.max(table.c.info_id), 0))
+                .scalar_subquery()
+                )
+        with self.app.app_context():
+            row = self.db.session.execute(select(*columns)).one()
+        return tuple(row)
+
+    def _load(self, version: tuple[int, ...]) -> Snapshot:
+        """Load every row of the content tables into a new snapshot."""
+        start = time.perf_counter()
+        rows: dict[type[Base], list[Any]] = {}
+        with self.app.app_context():
+            for model in MODELS:
+                row_type = ROW_TYPES[model]
+                rows[model] = [
+                    row_type(*(
+                        freeze(getattr(obj, column))
+                        for column in row_type._fields
+                    ))
+                    for obj in self.db.session.execute(
+                        select(model).order_by(model.__table__.c.info_id)
+                        ).scalars()
+                    ]
+        snapshot = Snapshot(
+            projects=tuple(rows[Project]),
+            about_texts=MappingProxyType(
+                {row.info_name: row for row in rows[AboutText]}
+                ),
+            about_images=MappingProxyType(
+                {row.info_name: row for row in rows[AboutImage]}
+                ),
+            contact=rows[ContactText][0] if rows[ContactText] else None,
+            version=version,
+            loaded_at=time.monotonic(),
+            )
+        elapsed = time.perf_counter() - start
+        self.generation += 1
+        self.refreshes += 1
+        self.last_refresh_seconds = elapsed
+        self.total_refresh_seconds += elapsed
+        return snapshot
@@ -0,0 +1,72 @@
+"""
+The template fragments that don't depend on the request, rendered once
+when the server starts instead of on every page that shows them.
+"""
+from resource.classes import Current, Languages
+from typing import get_args
+
+from flask import Flask, render_template
+from markupsafe import Markup
+
+
+class Fragments:
+    """
+    The rendered fragments, available to the templates as `fragments`
+    once registered to the Jinja environment of the app.
+
+    Parameters
+    ----------
+    app: Flask
+        The app, its context is needed to render the templates.
+    current: Current
+        The state of the website the fragments are rendered from.
+
+    Attributes
+    ----------
+    effect: dict[str, str]
+        The tags of the magic star effect before and after the text,
+        by the placeholders in the paragraphs of the about pages.
+    github_languages: dict[Languages, Markup]
+        The block with the bar of the GitHub languages, by language.
+    """
+    def __init__(self, app: Flask, current: Current) -> None:
+        self.app = app
+        self.current = current
+        self.effect: dict[str, str] = {}
+        self.github_languages: dict[Languages, Markup] = {}
+
+    def build(self) -> None:
+        """
+        Render every fragment, again after `current` changes.
+
+        Raises
+        ------
+        ValueError
+            If the magic star template doesn't have the split marker
+            exactly once.
+        """
+        with self.app.app_context():
+            self.effect = self._effect()
+            self.github_languages = {
+                language: Markup(render_template(
+                    "github-languages.html",
+                    current=self.current,
+                    language=language,
+                    ))
+                for language in get_args(Languages)
+            }
+
+    def _effect(self) -> dict[str, str]:
+        """Render the magic star effect and split it around the text."""
+        current = self.current
+        spliter = current.effect_placeholder_spliter
+        tags_whole = render_template("magic-star.html", current=current)
+        if tags_whole.count(spliter) != 1:
+            raise ValueError(
+                f"magic-star.html should have {spliter!r} exactly once."
+                )
+        tags_former, tags_latter = tags_whole.split(spliter)
+        return {
+            current.effect_placeholder_former: tags_former,
+            current.effect_placeholder_latter: tags_latter,
+        }
@@ -0,0 +1,207 @@
+"""
+Smaller copies of the images of the website, in a few widths and in
+WebP next to the format of the original, so browsers pick one that
+fits the screen with `srcset`. The copies are listed in a manifest that
+the templates read through ``picture()``.
+
+Build them again after adding or changing an image, Pillow is only
+needed for this:
+
+    python -m resource.images
+"""
+import json
+from collections.abc import Iterable
+from html import escape
+from pathlib import Path
+from typing import Any, TypedDict
+
+from flask import url_for
+from markupsafe import Markup
+
+# ---------------------------------------------------------------------
+STATIC_DIR = Path("static")
+IMAGE_DIR = STATIC_DIR / "assets/img"
+DERIVED_DIR = IMAGE_DIR / "derived"
+MANIFEST_PATH = STATIC_DIR / "assets/json/image-manifest.json"
+ENCODING = "UTF-8"
+
+IMAGE_WIDTHS = (480, 960, 1440, 1920)
+IMAGE_SUFFIXES = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG"}
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+SAVE_OPTIONS: dict[str, dict[str, Any]] = {
+    "JPEG": {"quality": 78, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 72, "method": 6},
+}
+
+type Source = tuple[str, int]  # path in the static folder, and width
+
+
+class ImageEntry(TypedDict):
+    """The manifest entry of an image."""
+    width: int
+    height: int
+    sources: dict[str, list[Source]]  # by mime type, narrowest first
+
+
+def build(
+    image_dir: Path = IMAGE_DIR,
+    out_dir: Path = DERIVED_DIR,
+    manifest_path: Path = MANIFEST_PATH,
+    widths: Iterable[int] = IMAGE_WIDTHS,
+) -> dict[str, ImageEntry]:
+    """
+    Save the copies of every image in `image_dir` and the manifest.
+    Copies newer than their image are kept as they are.
+
+    Parameters
+    ----------
+    image_dir: Path, by default IMAGE_DIR
+        The folder of the images.
+    out_dir: Path, by default DERIVED_DIR
+        The folder of the copies.
+    manifest_path: Path, by default MANIFEST_PATH
+        The JSON file of the manifest.
+    widths: Iterable[int], by default IMAGE_WIDTHS
+        The widths of the copies, an image narrower than one of them is
+        only copied in its own width instead.
+
+    Returns
+    -------
+    dict[str, ImageEntry]
+        The manifest, by file name of the image.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from PIL import Image, ImageOps
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest: dict[str, ImageEntry] = {}
+    for path in sorted(image_dir.iterdir()):
+        fmt = IMAGE_SUFFIXES.get(path.suffix.lower())
+        if fmt is None:
+            continue
+        with Image.open(path) as opened:
+            image = ImageOps.exif_transpose(opened)
+        sizes = sorted({min(width, image.width) for width in widths})
+        entry: ImageEntry = {
+            "width": image.width, "height": image.height, "sources": {}
+            }
+        for out_fmt in ("WEBP", fmt):
+            sources = entry["sources"][MIME_TYPES[out_fmt]] = []
+            suffix = ".webp" if out_fmt == "WEBP" else path.suffix.lower()
+            for width in sizes:
+                out = out_dir / f"{path.stem}-{width}w{suffix}"
+                source = out.relative_to(STATIC_DIR).as_posix()
+                sources.append((source, width))
+                if _is_newer(out, path):
+                    continue
+                height = round(image.height * width / image.width)
+                resized = image.resize(
+                    (width, height), Image.Resampling.LANCZOS
+                    )
+                if out_fmt == "JPEG":
+                    resized = resized.convert("RGB")
+                resized.save(out, out_fmt, **SAVE_OPTIONS[out_fmt])
+        manifest[path.name] = entry
+    with open(manifest_path, mode="w", encoding=ENCODING) as file:
+        json.dump(manifest, file, indent=2)
+        file.write("\n")
+    return manifest
+
+
+def _is_newer(path: Path, than: Path) -> bool:
+    """If path exists and was changed after `than`."""
+    return path.exists() and path.stat().st_mtime >= than.stat().st_mtime
+
+
+class Images:
+    """
+    The manifest of the copies, with ``picture()`` for the templates.
+
+    Parameters
+    ----------
+    manifest: dict[str, ImageEntry]
+        The manifest, by file name of the image.
+    """
+    def __init__(self, manifest: dict[str, ImageEntry]) -> None:
+        self.manifest = manifest
+
+    @classmethod
+    def load(cls, path: Path = MANIFEST_PATH) -> "Images":
+        """
+        Load the manifest saved by build(), an empty one if the file
+        doesn't exist, so the pages fall back to the images themselves.
+        """
+        if not path.exists():
+            return cls({})
+        with open(path, encoding=ENCODING) as file:
+            return cls(json.load(file))
+
+    def srcset(self, fname: str, mime_type: str) -> str:
+        """
+        The `srcset` of an image in one format, empty if there's no copy
+        of it.
+        """
+        entry = self.manifest.get(fname)
+        if entry is None:
+            return ""
+        return ", ".join(
+            f"{url_for('static', filename=source)} {width}w"
+            for source, width in entry["sources"].get(mime_type, ())
+            )
+
+    def picture(
+        self, fname: str, *, sizes: str = "100vw", **attributes: Any
+    ) -> Markup:
+        """
+        A `<picture>` of an image in the image folder, with the copies
+        in WebP and in the format of the image.
+
+        Parameters
+        ----------
+        fname: str
+            The file name of the image.
+        sizes: str, by default "100vw"
+            The `sizes` attribute, the width the image is shown at.
+        **attributes: Any
+            Attributes of the `<img>`, `class_` for `class`.
+
+        Returns
+        -------
+        Markup
+            The HTML, only an `<img>` of the image if there's no copy.
+        """
+        attributes.setdefault("alt", "")
+        attributes["class"] = attributes.pop("class_", None)
+        img_attributes = " ".join(
+            f'{key}="{escape(str(value))}"'
+            for key, value in attributes.items() if value is not None
+            )
+        entry = self.manifest.get(fname)
+        if entry is None:
+            src = url_for("static", filename=f"assets/img/{fname}")
+            return Markup(f'<img src="{escape(src)}" {img_attributes}>')
+        tags = ["<picture>"]
+        mime_types = list(entry["sources"])
+        for mime_type in mime_types[:-1]:
+            tags.append(
+                f'<source type="{mime_type}" '
+                f'srcset="{escape(self.srcset(fname, mime_type))}" '
+                f'sizes="{escape(sizes)}">'
+                )
+        fallback = mime_types[-1]
+        widest, _ = entry["sources"][fallback][-1]
+        tags.append(
+            f'<img src="{escape(url_for("static", filename=widest))}" '
+            f'srcset="{escape(self.srcset(fname, fallback))}" '
+            f'sizes="{escape(sizes)}" width="{entry["width"]}" '
+            f'height="{entry["height"]}" {img_attributes}>'
+            )
+        tags.append("</picture>")
+        return Markup("".join(tags))
+
+
+if __name__ == "__main__":
+    for name, built in build().items():
+        sources = next(iter(built["sources"].values()))
+        print(f"{name}: {[width for _, width in sources]}")
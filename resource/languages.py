@@ -0,0 +1,274 @@
+"""
+The GitHub languages of the website, refreshed by a background thread
+from the languages endpoint of one or more repositories, which are
+summed up. Every request sends the ETag of the last response, so a
+refresh of languages that didn't change costs a 304 without a body and
+doesn't count against the rate limit of GitHub.
+
+The repositories are the `GITHUB_ENDPOINTS` environment variable,
+separated by commas, or `ENDPOINT`. Point them to a stand-in server to
+try it locally. To refresh the saved file once:
+
+    python -m resource.languages
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from resource.classes import ENCODING, ENDPOINT, HEADERS, Current
+from resource.tracing import Trace, tracer
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+# ---------------------------------------------------------------------
+GITHUB_ENDPOINTS: list[str] = [
+    endpoint.strip()
+    for endpoint in (os.getenv("GITHUB_ENDPOINTS") or ENDPOINT).split(",")
+    if endpoint.strip()
+]
+GITHUB_TOKEN: str = os.getenv("GITHUB_TOKEN") or ""
+LANGUAGES_REFRESH_INTERVAL: float = float(
+    os.getenv("LANGUAGES_REFRESH_INTERVAL") or 6 * 60 * 60
+    )
+LANGUAGES_TIMEOUT = 10
+LANGUAGES_MAX_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+class LanguageRefresher:
+    """
+    Keeps the languages of `current` up to date. The repositories are
+    fetched at the same time over a pooled session, and when their sum
+    changed it's saved to the JSON file of `current`, swapped into
+    `current`, and `on_update` is called.
+
+    A repository that can't be fetched keeps its last languages, the
+    sum waits until every repository has been fetched once.
+
+    Parameters
+    ----------
+    current: Current
+        The state of the website, with the languages.
+    endpoints: list[str], by default GITHUB_ENDPOINTS
+        The languages endpoints of the repositories.
+    on_update: Callable[[], None] | None, by default None
+        Called after new languages are swapped in, before `generation`
+        goes up.
+    interval: float, by default LANGUAGES_REFRESH_INTERVAL
+        Seconds between refreshes.
+    session: requests.Session | None, by default None
+        The HTTP session, a new one on the first refresh when None, so
+        requests is only imported by the background thread.
+    """
+    def __init__(
+        self,
+        current: Current,
+        endpoints: list[str] | None = None,
+        *,
+        on_update: Callable[[], None] | None = None,
+        interval: float = LANGUAGES_REFRESH_INTERVAL,
+        session: "requests.Session | None" = None,
+    ) -> None:
+        self.current = current
+        self.endpoints = list(
+            GITHUB_ENDPOINTS if endpoints is None else endpoints
+            )
+        self.on_update = on_update
+        self.interval = interval
+        self.session = session
+        # goes up with every update, for caches of the pages
+        self.generation = 0
+
+        self.refreshes = 0
+        self.updates = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.last_refresh_seconds = 0.0
+
+        self._etags: dict[str, str] = {}
+        self._lang_bytes: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh(self) -> bool:
+        """
+        Fetch the languages of every repository, and update `current`
+        if their sum changed.
+
+        Returns
+        -------
+        bool
+            If `current` was updated.
+        """
+        with self._lock, tracer.trace("languages refresh") as trace:
+            started = time.perf_counter()
+            if self.session is None:
+                self.session = _new_session()
+            workers = min(LANGUAGES_MAX_WORKERS, len(self.endpoints)) or 1
+            # the fetches run on other threads, so they're given the trace
+            fetch = partial(self._fetch, trace=trace)
+            with ThreadPoolExecutor(workers) as executor:
+                fetched = list(executor.map(fetch, self.endpoints))
+            self.refreshes += 1
+            self.last_refresh_seconds = time.perf_counter() - started
+            for endpoint, lang_byte in zip(self.endpoints, fetched):
+                if lang_byte is not None:
+                    self._lang_bytes[endpoint] = lang_byte
+            if not all(map(self._lang_bytes.__contains__, self.endpoints)):
+                return False
+            lang_byte = sum_lang_bytes(
+                self._lang_bytes[endpoint] for endpoint in self.endpoints
+                )
+            if lang_byte == self.current.lang_byte:
+                return False
+            save_lang_byte(self.current.path_lang_byte, lang_byte)
+            self.current.set_lang_byte(lang_byte)
+            if self.on_update is not None:
+                self.on_update()
+            self.generation += 1
+            self.updates += 1
+            return True
+
+    def start(self) -> None:
+        """
+        Refresh now and every `interval` seconds in a background thread,
+        so the server doesn't wait for GitHub to start.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="languages-refresh", daemon=True
+            )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict[str, float]:
+        """
+        The counters of the refresher.
+
+        Returns
+        -------
+        dict[str, float]
+            Refreshes, updates of the languages, responses that were
+            304 Not Modified, failed requests, and the seconds the last
+            refresh took.
+        """
+        return {
+            "refreshes": self.refreshes,
+            "updates": self.updates,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "last_refresh_seconds": self.last_refresh_seconds,
+        }
+
+    def _run(self) -> None:
+        """The loop of the background thread."""
+        while True:
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.errors += 1
+                logger.exception("refreshing the GitHub languages failed")
+            if self._stop.wait(self.interval):
+                break
+
+    def _fetch(
+        self, endpoint: str, trace: Trace | None = None
+    ) -> dict[str, int] | None:
+        """
+        The languages of a repository, None if they didn't change since
+        the last response or can't be fetched. The request is a span of
+        `trace`.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from requests import RequestException
+
+        assert self.session is not None
+        headers = dict(HEADERS)
+        etag = self._etags.get(endpoint)
+        if etag is not None and endpoint in self._lang_bytes:
+            headers["If-None-Match"] = etag
+        try:
+            with tracer.span("github get", "io", trace, url=endpoint):
+                response = self.session.get(
+                    endpoint, headers=headers, timeout=LANGUAGES_TIMEOUT
+                    )
+            if response.status_code == 304:
+                self.not_modified += 1
+                return None
+            response.raise_for_status()
+            lang_byte = {
+                str(lang): int(byte) for lang, byte in response.json().items()
+                }
+        except (
+            RequestException, AttributeError, TypeError, ValueError
+        ) as error:
+            self.errors += 1
+            logger.warning("fetching %s failed: %s", endpoint, error)
+            return None
+        if "ETag" in response.headers:
+            self._etags[endpoint] = response.headers["ETag"]
+        return lang_byte
+
+
+def sum_lang_bytes(lang_bytes: Iterable[dict[str, int]]) -> dict[str, int]:
+    """
+    The bytes of each language over several repositories, the largest
+    first like GitHub does.
+    """
+    total: dict[str, int] = {}
+    for lang_byte in lang_bytes:
+        for lang, byte in lang_byte.items():
+            total[lang] = total.get(lang, 0) + byte
+    return dict(sorted(total.items(), key=lambda item: -item[1]))
+
+
+def save_lang_byte(path: Path, lang_byte: dict[str, int]) -> None:
+    """
+    Save the languages to a JSON file through a temporary file, so the
+    file is never read half written.
+    """
+    temp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(temp, mode="w", encoding=ENCODING) as file:
+        json.dump(lang_byte, file)
+    os.replace(temp, path)
+
+
+def _new_session() -> "requests.Session":
+    """A session with a connection pool for every worker."""
+    # pylint: disable=import-outside-toplevel
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+
+    session = Session()
+    adapter = HTTPAdapter(
+        pool_connections=LANGUAGES_MAX_WORKERS,
+        pool_maxsize=LANGUAGES_MAX_WORKERS,
+        )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if GITHUB_TOKEN:
+        session.headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+    return session
+
+
+if __name__ == "__main__":
+    refresher = LanguageRefresher(Current())
+    refresher.refresh()
+    print(refresher.current.lang_byte)
@@ -0,0 +1,229 @@
+"""
+The preview videos of the projects, served with byte ranges so a
+browser can seek without downloading the video again, and strong ETags
+so it can keep what it has. The body is handed to the server as a file
+through `wsgi.file_wrapper`, waitress then sends it from its I/O
+thread, and a worker thread isn't held while a video plays.
+
+A video can have a poster, the JPEG of the same name next to it, made
+from one of its frames with ffmpeg by:
+
+    python -m resource.media
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import subprocess
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path, PurePosixPath
+from typing import IO
+
+from flask import Flask, abort, request, url_for
+from werkzeug.datastructures import ContentRange
+from werkzeug.security import safe_join
+from werkzeug.wrappers.response import Response
+
+# ---------------------------------------------------------------------
+STATIC_DIR = Path("static")
+MEDIA_DIR = STATIC_DIR / "assets/mov"
+MEDIA_MAX_AGE = 24 * 60 * 60
+MEDIA_BLOCK_SIZE = 64 * 1024
+POSTER_SUFFIX = ".jpg"
+POSTER_TIME = 1.0  # seconds into the video
+POSTER_WIDTH = 960
+FFMPEG: str = os.getenv("FFMPEG") or "ffmpeg"
+
+
+class Media:
+    """
+    The route of the videos, matched before the static route of Flask
+    for MEDIA_DIR, so the links saved in the database stay the same.
+
+    Parameters
+    ----------
+    media_dir: Path, by default MEDIA_DIR
+        The folder of the videos and their posters.
+    """
+    def __init__(self, media_dir: Path = MEDIA_DIR) -> None:
+        self.media_dir = media_dir
+        self._etags: dict[Path, tuple[tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        """Add the route of the videos, and ``video_poster()``."""
+        path = self.media_dir.relative_to(STATIC_DIR).as_posix()
+        app.add_url_rule(
+            f"{app.static_url_path}/{path}/<path:filename>",
+            endpoint="media",
+            view_func=self.send,
+            )
+        app.jinja_env.globals["video_poster"] = self.poster
+
+    def poster(self, src: str) -> str | None:
+        """
+        The URL of the poster of a video, None if it doesn't have one.
+
+        Parameters
+        ----------
+        src: str
+            The URL or the path of the video.
+        """
+        name = PurePosixPath(src).stem + POSTER_SUFFIX
+        if not (self.media_dir / name).is_file():
+            return None
+        return url_for("media", filename=name)
+
+    def etag(self, path: Path, stat: os.stat_result) -> str:
+        """
+        The strong ETag of a file, a hash of its content, computed again
+        only when its size or modified time changes.
+        """
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._etags.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as file:
+            while block := file.read(MEDIA_BLOCK_SIZE):
+                digest.update(block)
+        etag = digest.hexdigest()
+        with self._lock:
+            self._etags[path] = (key, etag)
+        return etag
+
+    def send(self, filename: str) -> Response:
+        """
+        Respond with a file, or the part of it in the `Range` header as
+        206 Partial Content. A range the file doesn't have gets 416,
+        several ranges get the whole file.
+        """
+        joined = safe_join(str(self.media_dir), filename)
+        if joined is None or not os.path.isfile(joined):
+            abort(404)
+        path = Path(joined)
+        stat = path.stat()
+        size = stat.st_size
+        etag = self.etag(path, stat)
+
+        response = Response(
+            mimetype=mimetypes.guess_type(path.name)[0]
+            or "application/octet-stream"
+            )
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime  # type: ignore[assignment]
+        response.accept_ranges = "bytes"
+        response.cache_control.public = True
+        response.cache_control.max_age = MEDIA_MAX_AGE
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+
+        start, stop = 0, size
+        ranges = request.range
+        if (
+            ranges is not None and len(ranges.ranges) == 1
+            and _if_range_matches(etag, response)
+        ):
+            bounds = ranges.range_for_length(size)
+            if bounds is None:
+                response.status_code = 416
+                response.content_range = ContentRange(  # type: ignore
+                    "bytes", None, None, size
+                    )
+                return response
+            start, stop = bounds
+            response.status_code = 206
+            response.content_range = ContentRange(  # type: ignore
+                "bytes", start, stop, size
+                )
+        response.content_length = stop - start
+        if request.method == "HEAD":
+            return response
+        response.response = _file_body(path, start, stop - start)
+        response.direct_passthrough = True
+        return response
+
+
+def _if_range_matches(etag: str, response: Response) -> bool:
+    """
+    If a range can be sent, when `If-Range` is missing or matches the
+    file, otherwise the whole file is sent.
+    """
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return if_range.date == response.last_modified
+    return True
+
+
+def _file_body(path: Path, start: int, length: int) -> Iterable[bytes]:
+    """
+    The body of a response, `length` bytes of a file from `start`. With
+    `wsgi.file_wrapper`, the server reads the file itself and stops at
+    the Content-Length.
+    """
+    file = open(path, "rb")  # pylint: disable=consider-using-with
+    file.seek(start)
+    wrapper = request.environ.get("wsgi.file_wrapper")
+    if wrapper is not None:
+        return wrapper(file, MEDIA_BLOCK_SIZE)  # type: ignore[no-any-return]
+    return _read(file, length)
+
+
+def _read(file: IO[bytes], length: int) -> Iterator[bytes]:
+    """Read up to `length` bytes of a file in blocks, then close it."""
+    with file:
+        while length > 0:
+            block = file.read(min(MEDIA_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def build_posters(media_dir: Path = MEDIA_DIR) -> list[Path]:
+    """
+    Save a poster for every video in `media_dir`, from the frame at
+    POSTER_TIME. Posters newer than their video are kept as they are.
+
+    Returns
+    -------
+    list[Path]
+        The posters.
+
+    Raises
+    ------
+    FileNotFoundError
+        If ffmpeg isn't installed, set FFMPEG to its path if it isn't
+        on PATH.
+    """
+    ffmpeg = shutil.which(FFMPEG)
+    if ffmpeg is None:
+        raise FileNotFoundError(f"ffmpeg not found, got FFMPEG={FFMPEG!r}.")
+    posters = []
+    for video in sorted(media_dir.glob("*.mp4")):
+        poster = video.with_suffix(POSTER_SUFFIX)
+        posters.append(poster)
+        if poster.exists() and (
+            poster.stat().st_mtime >= video.stat().st_mtime
+        ):
+            continue
+        subprocess.run(
+            [
+                ffmpeg, "-loglevel", "error", "-y",
+                "-ss", str(POSTER_TIME), "-i", str(video),
+                "-frames:v", "1", "-vf", f"scale='min({POSTER_WIDTH},iw)':-2",
+                "-q:v", "4", str(poster),
+            ],
+            check=True,
+            )
+    return posters
+
+
+if __name__ == "__main__":
+    for built_poster in build_posters():
+        print(built_poster)
@@ -0,0 +1,345 @@
+"""
+Counters and latency histograms of the server, exposed at ``/metrics``
+in the text format of Prometheus.
+
+Every thread counts into its own shard, so the hot path takes no lock
+and never waits for another thread. The shards are only merged when
+``/metrics`` is scraped. Modules declare their metrics on `metrics` at
+import, like ``REQUESTS = metrics.counter(...)``, and gauges are read
+from callbacks at scrape time, for numbers other objects already keep.
+
+``/metrics`` only exists when METRICS_TOKEN is set, and only answers
+scrapes that send it as a bearer token.
+"""
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ---------------------------------------------------------------------
+METRICS_TOKEN: str = os.getenv("METRICS_TOKEN") or ""
+# seconds, from a page served from the cache to a slow SMTP server
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+    2.5, 5.0, 10.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# other methods are counted as "OTHER", clients can send any method and
+# every label value is a series kept forever
+METHODS = frozenset(("GET", "HEAD", "POST", "OPTIONS"))
+
+type Labels = tuple[str, ...]
+type Samples = dict[Labels, float]
+
+
+class _Shard:
+    """The counts of one thread, only written by that thread."""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self) -> None:
+        self.counters: dict[tuple[str, Labels], float] = {}
+        # bucket counts, the last one for +Inf, then the sum
+        self.histograms: dict[tuple[str, Labels], list[float]] = {}
+
+
+class Counter:
+    """A number that only goes up, by label values."""
+    def __init__(self, metrics: "Metrics", name: str) -> None:
+        self.metrics = metrics
+        self.name = name
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        """Add `value` to the count of the label values."""
+        counters = self.metrics.shard().counters
+        key = (self.name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+
+class Histogram:
+    """Observed seconds in buckets, by label values."""
+    def __init__(
+        self, metrics: "Metrics", name: str, buckets: tuple[float, ...]
+    ) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.buckets = buckets
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        """Count an observation of the label values."""
+        histograms = self.metrics.shard().histograms
+        key = (self.name, labels)
+        counts = histograms.get(key)
+        if counts is None:
+            counts = histograms[key] = [0.0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, seconds)] += 1
+        counts[-1] += seconds
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the seconds the body of a with statement takes."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+
+class Metrics:
+    """
+    The metrics of the server, declared with counter(), histogram() and
+    gauge(), and rendered by render().
+    """
+    def __init__(self) -> None:
+        # name: (type, help, label names)
+        self.families: dict[str, tuple[str, str, tuple[str, ...]]] = {}
+        self._buckets: dict[str, tuple[float, ...]] = {}
+        self._gauges: dict[str, Callable[[], Samples]] = {}
+        self._shards: list[_Shard] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def shard(self) -> _Shard:
+        """The shard of the current thread, the lock is only taken once."""
+        shard: _Shard | None = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def counter(
+        self, name: str, help_text: str, labels: tuple[str, ...] = ()
+    ) -> Counter:
+        """Declare a counter, its name should end with ``_total``."""
+        self._declare(name, "counter", help_text, labels)
+        return Counter(self, name)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Declare a histogram of seconds."""
+        self._declare(name, "histogram", help_text, labels)
+        self._buckets[name] = buckets
+        return Histogram(self, name, buckets)
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        read: Callable[[], Samples],
+        labels: tuple[str, ...] = (),
+        kind: str = "gauge",
+    ) -> None:
+        """
+        Declare a metric read by a callback when scraped.
+
+        Parameters
+        ----------
+        name: str
+            The name of the metric.
+        help_text: str
+            The description of the metric.
+        read: Callable[[], Samples]
+            Returns the values by label values.
+        labels: tuple[str, ...], by default ()
+            The label names.
+        kind: str, by default "gauge"
+            The type of the metric, "counter" for counts kept elsewhere.
+        """
+        self._declare(name, kind, help_text, labels)
+        self._gauges[name] = read
+
+    def collect(
+        self,
+    ) -> tuple[dict[str, Samples], dict[str, dict[Labels, list[float]]]]:
+        """
+        Merge the shards of every thread.
+
+        Returns
+        -------
+        tuple[dict[str, Samples], dict[str, dict[Labels, list[float]]]]
+            The counters, and the bucket counts and sums of the
+            histograms, by name and label values.
+        """
+        with self._lock:
+            shards = list(self._shards)
+        counters: dict[str, Samples] = {}
+        histograms: dict[str, dict[Labels, list[float]]] = {}
+        for shard in shards:
+            # copying a dict is atomic, the thread may be adding keys
+            for (name, labels), value in shard.counters.copy().items():
+                samples = counters.setdefault(name, {})
+                samples[labels] = samples.get(labels, 0) + value
+            for (name, labels), counts in shard.histograms.copy().items():
+                merged = histograms.setdefault(name, {}).setdefault(
+                    labels, [0.0] * len(counts)
+                    )
+                for index, count in enumerate(list(counts)):
+                    merged[index] += count
+        return counters, histograms
+
+    def render(self) -> str:
+        """Every metric in the text format of Prometheus."""
+        counters, histograms = self.collect()
+        lines: list[str] = []
+        for name, (kind, help_text, label_names) in self.families.items():
+            lines.append(f"# HELP {name} {_escape_help(help_text)}")
+            lines.append(f"# TYPE {name} {kind}")
+            if name in self._buckets:
+                self._render_histogram(
+                    lines, name, label_names, histograms.get(name, {})
+                    )
+                continue
+            if name in self._gauges:
+                samples = self._gauges[name]()
+            else:
+                samples = counters.get(name, {})
+            for labels, value in sorted(samples.items()):
+                lines.append(
+                    f"{name}{_labels(label_names, labels)} {_number(value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Count the requests of the app and the time they take, time the
+        SQL queries, and add ``/metrics`` if METRICS_TOKEN is set.
+        """
+        app.before_request(_request_started)
+        app.after_request(_request_finished)
+        event.listen(Engine, "before_cursor_execute", _query_started)
+        event.listen(Engine, "after_cursor_execute", _query_finished)
+        if METRICS_TOKEN:
+            app.add_url_rule("/metrics", "metrics", self.view)
+
+    def view(self) -> Response:
+        """The route of ``/metrics``."""
+        if not authorized():
+            return Response("unauthorized", status=401)
+        response = Response(self.render(), content_type=CONTENT_TYPE)
+        response.cache_control.no_store = True
+        return response
+
+    def _declare(
+        self, name: str, kind: str, help_text: str, labels: tuple[str, ...]
+    ) -> None:
+        """Add a metric family, a name can only be declared once."""
+        if name in self.families:
+            raise ValueError(f"metric {name!r} is already declared.")
+        self.families[name] = (kind, help_text, labels)
+
+    def _render_histogram(
+        self,
+        lines: list[str],
+        name: str,
+        label_names: tuple[str, ...],
+        samples: dict[Labels, list[float]],
+    ) -> None:
+        """Add the cumulative buckets, sum and count of a histogram."""
+        bounds = [*map(_number, self._buckets[name]), "+Inf"]
+        for labels, counts in sorted(samples.items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket = _labels((*label_names, "le"), (*labels, bound))
+                lines.append(f"{name}_bucket{bucket} {_number(cumulative)}")
+            label_text = _labels(label_names, labels)
+            lines.append(f"{name}_sum{label_text} {_number(counts[-1])}")
+            lines.append(f"{name}_count{label_text} {_number(cumulative)}")
+
+
+def authorized() -> bool:
+    """If the request sent METRICS_TOKEN, which is set, as a bearer token."""
+    return bool(METRICS_TOKEN) and hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(),
+        f"Bearer {METRICS_TOKEN}".encode(),
+        )
+
+
+def _labels(names: tuple[str, ...], values: Labels) -> str:
+    """The labels of a sample, like ``{endpoint="home"}``."""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label(value)}"'
+        for name, value in zip(names, values)
+        )
+    return f"{{{pairs}}}"
+
+
+def _escape_label(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    """A value without a trailing ``.0`` for whole numbers."""
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+metrics = Metrics()
+
+REQUESTS = metrics.counter(
+    "portfolio_requests_total",
+    "Requests by endpoint, method and status code.",
+    ("endpoint", "method", "status"),
+    )
+REQUEST_SECONDS = metrics.histogram(
+    "portfolio_request_duration_seconds",
+    "Seconds from the start of a request to its response, by endpoint.",
+    ("endpoint",),
+    )
+QUERY_SECONDS = metrics.histogram(
+    "portfolio_db_query_duration_seconds",
+    "Seconds of the SQL queries, by statement.",
+    ("statement",),
+    )
+
+
+def _request_started() -> None:
+    """Note when a request starts."""
+    g.metrics_started = time.perf_counter()
+
+
+def _request_finished(response: Response) -> Response:
+    """Count a request, Flask also calls this for 500 on exceptions."""
+    started: float | None = g.pop("metrics_started", None)
+    # the routes of the app, "none" for every URL that matches none
+    endpoint = request.endpoint or "none"
+    method = request.method if request.method in METHODS else "OTHER"
+    REQUESTS.inc(endpoint, method, str(response.status_code))
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+    return response
+
+
+def _query_started(conn: Any, *_: Any) -> None:
+    """Note when a SQL query starts, queries can't nest on a connection."""
+    conn.info["metrics_query_started"] = time.perf_counter()
+
+
+def _query_finished(
+    conn: Any, cursor: Any, statement: str, *_: Any
+) -> None:
+    """Observe how long a SQL query took."""
+    started: float | None = conn.info.pop("metrics_query_started", None)
+    if started is not None:
+        kind = (statement.split(None, 1) or ["OTHER"])[0].upper()
+        QUERY_SECONDS.observe(time.perf_counter() - started, kind)
@@ -0,0 +1,402 @@
+"""
+The outbox of the contact page. A message is saved to the database and
+the request returns at once, then a background thread emails it over a
+long-lived SMTP connection, and retries with a backoff when that fails.
+
+To try it locally, point SMTP_HOST and SMTP_PORT to a stand-in server,
+like ``python -m aiosmtpd -n -l localhost:1025``. STARTTLS is required
+before logging in, unless SMTP_HOST is a loopback address or
+SMTP_STARTTLS is 0, then it's only used when the server offers it.
+"""
+import ipaddress
+import logging
+import os
+import smtplib
+import ssl
+import threading
+import time
+from email.message import EmailMessage
+from resource.classes import OutboxMessage
+from resource.metrics import metrics
+from resource.tracing import tracer
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select
+
+# ---------------------------------------------------------------------
+SMTP_HOST: str = os.getenv("SMTP_HOST") or "smtp.gmail.com"
+SMTP_PORT: int = int(os.getenv("SMTP_PORT") or smtplib.SMTP_PORT)
+SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS") != "0"
+SMTP_TIMEOUT = 30
+OUTBOX_POLL_INTERVAL = 30.0
+OUTBOX_BURST_DELAY = 1.0
+OUTBOX_BATCH = 20
+OUTBOX_IDLE_TIMEOUT = 60.0
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF = 10.0
+OUTBOX_BACKOFF_MAX = 30 * 60.0
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+SUBJECT = "Message from site."
+
+SMTP_SECONDS = metrics.histogram(
+    "portfolio_smtp_send_duration_seconds",
+    "Seconds to email a message, connecting included.",
+    )
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Saves the messages of the contact page and emails them to the site
+    owner from a background thread.
+
+    The thread wakes up when a message is added, or every
+    `poll_interval` seconds for retries, waits `burst_delay` seconds so
+    a burst of messages is sent together, and sends up to `batch` due
+    messages over one connection. The connection is kept for the next
+    messages, and closed after `idle_timeout` seconds without one. A
+    message that fails is tried again after `OUTBOX_BACKOFF` seconds,
+    doubled for every attempt, and given up after `max_attempts`.
+
+    Parameters
+    ----------
+    db: SQLAlchemy
+        The database of the app.
+    app: Flask
+        The app, its context is needed to query the database.
+    address: str
+        The email address to send from and to.
+    password: str
+        The password of `address` on the SMTP server.
+    host: str, by default SMTP_HOST
+        The SMTP server.
+    port: int, by default SMTP_PORT
+        The port of the SMTP server.
+    starttls: bool, by default SMTP_STARTTLS
+        If the server has to offer STARTTLS, so the password is never
+        sent in plaintext. Not required for a loopback `host`.
+    """
+    def __init__(
+        self,
+        db: SQLAlchemy,
+        app: Flask,
+        *,
+        address: str,
+        password: str,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        starttls: bool = SMTP_STARTTLS,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        burst_delay: float = OUTBOX_BURST_DELAY,
+        batch: int = OUTBOX_BATCH,
+        idle_timeout: float = OUTBOX_IDLE_TIMEOUT,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    ) -> None:
+        self.db = db
+        self.app = app
+        self.address = address
+        self.password = password
+        self.host = host
+        self.port = port
+        self.starttls = starttls and not _is_loopback(host)
+        self.poll_interval = poll_interval
+        self.burst_delay = burst_delay
+        self.batch = batch
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.connections = 0
+        # kept in memory, counted in the database once with the table
+        self.pending = 0
+
+        self._connection: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self._has_table = False
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def enqueue(self, name: str, email: str, message: str) -> int:
+        """
+        Save a message to be emailed, and wake the background thread.
+
+        Parameters
+        ----------
+        name: str
+            The name of the user who sent the message.
+        email: str
+            The email address of the user who sent the message.
+        message: str
+            The message.
+
+        Returns
+        -------
+        int
+            The id of the saved message.
+        """
+        now = time.time()
+        row = OutboxMessage(
+            name=name,
+            email=email,
+            message=message,
+            status=STATUS_PENDING,
+            attempts=0,
+            created_at=now,
+            next_attempt=now,
+            )
+        self._create_table()
+        with self.app.app_context():
+            self.db.session.add(row)
+            self.db.session.commit()
+            info_id = row.info_id
+        self._count_pending(1)
+        self._wake.set()
+        return info_id
+
+    def start(self) -> None:
+        """
+        Create the table of the outbox if it doesn't exist, and start
+        the background thread, which first sends what was left by the
+        previous run.
+        """
+        if self._thread is not None:
+            return
+        self._create_table()
+        self._stop.clear()
+        self._wake.set()
+        self._thread = threading.Thread(
+            target=self._run, name="outbox", daemon=True
+            )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and close the connection."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close()
+
+    def flush(self) -> int:
+        """
+        Send every message that is due now, in batches.
+
+        Returns
+        -------
+        int
+            The number of messages sent.
+        """
+        total = 0
+        while True:
+            sent, attempted = self._send_batch()
+            total += sent
+            if sent < attempted or attempted < self.batch:
+                return total
+
+    def stats(self) -> dict[str, int]:
+        """
+        The counters of the outbox.
+
+        Returns
+        -------
+        dict[str, int]
+            Messages sent, failed attempts that will be retried,
+            messages given up on, SMTP connections opened, and messages
+            waiting to be sent.
+        """
+        return {
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+            "connections": self.connections,
+            "pending": self.pending,
+        }
+
+    def _create_table(self) -> None:
+        """
+        Create the table of the outbox if it doesn't exist, and count
+        the messages a previous run left, once. Also done by enqueue(),
+        as the contact page is served before start().
+        """
+        if self._has_table:
+            return
+        with self._lock, self.app.app_context():
+            if self._has_table:
+                return
+            OutboxMessage.__table__.create(  # type: ignore[attr-defined]
+                self.db.engine, checkfirst=True
+                )
+            pending = self.db.session.execute(
+                select(func.count())
+                .select_from(OutboxMessage)
+                .where(OutboxMessage.status == STATUS_PENDING)
+                ).scalar_one()
+            self._count_pending(pending)
+            self._has_table = True
+
+    def _count_pending(self, change: int) -> None:
+        """Add to the messages waiting, from any thread."""
+        with self._pending_lock:
+            self.pending += change
+
+    def _run(self) -> None:
+        """The loop of the background thread."""
+        while not self._stop.is_set():
+            woken = self._wake.wait(self._wait_time())
+            if self._stop.is_set():
+                break
+            if woken:
+                self._stop.wait(self.burst_delay)
+                self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("sending the outbox failed")
+            if time.monotonic() - self._last_used >= self.idle_timeout:
+                self._close()
+
+    def _wait_time(self) -> float:
+        """Seconds to sleep, shorter while a connection is open."""
+        if self._connection is None:
+            return self.poll_interval
+        idle = time.monotonic() - self._last_used
+        return max(0.0, min(self.poll_interval, self.idle_timeout - idle))
+
+    def _send_batch(self) -> tuple[int, int]:
+        """
+        Send up to `batch` due messages, stopping at the first failure
+        as the rest would most likely fail the same way.
+
+        Returns
+        -------
+        tuple[int, int]
+            The number of messages sent, and tried.
+        """
+        sent = attempted = 0
+        with self._lock, self.app.app_context():
+            rows = self.db.session.execute(
+                select(OutboxMessage)
+                .where(OutboxMessage.status == STATUS_PENDING)
+                .where(OutboxMessage.next_attempt <= time.time())
+                .order_by(OutboxMessage.info_id)
+                .limit(self.batch)
+                ).scalars().all()
+            if not rows:
+                return sent, attempted
+            with tracer.trace("outbox send", messages=len(rows)):
+                for row in rows:
+                    attempted += 1
+                    try:
+                        self._send(self._build(row))
+                    except (smtplib.SMTPException, OSError) as error:
+                        self._close()
+                        self._retry_later(row, error)
+                        self.db.session.commit()
+                        break
+                    row.status = STATUS_SENT
+                    row.last_error = None  # type: ignore[assignment]
+                    self.db.session.commit()
+                    self._count_pending(-1)
+                    self.sent += 1
+                    sent += 1
+        return sent, attempted
+
+    def _retry_later(self, row: OutboxMessage, error: Exception) -> None:
+        """Schedule another attempt of a message, or give up on it."""
+        row.attempts += 1
+        row.last_error = f"{type(error).__name__}: {error}"[:500]
+        if row.attempts >= self.max_attempts:
+            row.status = STATUS_FAILED
+            self._count_pending(-1)
+            self.failed += 1
+            logger.error(
+                "gave up emailing message %s: %s", row.info_id, row.last_error
+                )
+            return
+        backoff = min(
+            OUTBOX_BACKOFF * 2 ** (row.attempts - 1), OUTBOX_BACKOFF_MAX
+            )
+        row.next_attempt = time.time() + backoff
+        self.retries += 1
+        logger.warning(
+            "emailing message %s failed, retry in %.0f s: %s",
+            row.info_id, backoff, row.last_error,
+            )
+
+    def _build(self, row: OutboxMessage) -> EmailMessage:
+        """The email of a message, the sender is also the recipient."""
+        email = EmailMessage()
+        email["Subject"] = SUBJECT
+        email["From"] = self.address
+        email["To"] = self.address
+        email.set_content(
+            f"{row.message}\n\nby {row.name}.\nEmail: {row.email}"
+            )
+        return email
+
+    def _send(self, email: EmailMessage) -> None:
+        """
+        Send an email over the kept connection. A connection the server
+        closed meanwhile is opened again once.
+        """
+        with SMTP_SECONDS.time(), tracer.span("smtp send", "io"):
+            try:
+                self._connect().send_message(email)
+            except smtplib.SMTPServerDisconnected:
+                self._close()
+                self._connect().send_message(email)
+        self._last_used = time.monotonic()
+
+    def _connect(self) -> smtplib.SMTP:
+        """The kept connection, opened and logged in if there's none."""
+        if self._connection is not None:
+            return self._connection
+        connection = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            connection.ehlo()
+            if connection.has_extn("starttls"):
+                connection.starttls(context=ssl.create_default_context())
+                connection.ehlo()
+            elif self.starttls:
+                raise smtplib.SMTPNotSupportedError(
+                    f"{self.host} doesn't offer STARTTLS, not logging in."
+                    )
+            if connection.has_extn("auth"):
+                connection.login(self.address, self.password)
+        except BaseException:
+            connection.close()
+            raise
+        self._connection = connection
+        self.connections += 1
+        return connection
+
+    def _close(self) -> None:
+        """Close the kept connection, if there's one."""
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+
+def _is_loopback(host: str) -> bool:
+    """If `host` is this machine, like a local stand-in server."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
@@ -0,0 +1,194 @@
+"""
+A cache of the rendered pages of the website. The pages that only
+depend on the route and the display language are rendered once for
+each language and served from memory, with an ETag so browsers that
+already have a page get a 304 instead.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import wraps
+from resource.classes import Languages, RouteRetVal, handle_lang_pref
+from typing import Any, NamedTuple
+
+from flask import request
+from werkzeug.wrappers.response import Response
+
+# ---------------------------------------------------------------------
+PAGE_CACHE_MAX_BYTES: int = int(
+    os.getenv("PAGE_CACHE_MAX_BYTES") or 8 * 1024 * 1024
+    )
+
+type PageKey = tuple[str | None, tuple[tuple[str, Hashable], ...], Languages]
+
+
+class Page(NamedTuple):
+    """A rendered page and its strong ETag."""
+    body: bytes
+    etag: str
+
+
+class PageCache:
+    """
+    Rendered pages by endpoint, view arguments and display language,
+    the least recently used pages are evicted once the bodies add up
+    to more than `max_bytes`. Every page is dropped when the content
+    the pages are rendered from changes, which is told by `generation`.
+
+    Parameters
+    ----------
+    generation: Callable[[], int]
+        Returns a number that changes with the content of the pages.
+    max_bytes: int, by default PAGE_CACHE_MAX_BYTES
+        The most bytes of page bodies to keep.
+    """
+    def __init__(
+        self,
+        generation: Callable[[], int],
+        max_bytes: int = PAGE_CACHE_MAX_BYTES,
+    ) -> None:
+        self.generation = generation
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+        self._pages: OrderedDict[PageKey, Page] = OrderedDict()
+        self._generation: int | None = None
+        self._lock = threading.Lock()
+
+    def cached(
+        self, func: Callable[..., RouteRetVal]
+    ) -> Callable[..., RouteRetVal]:
+        """
+        A decorator for a Flask route function that only renders a page
+        for the visitor's language, to be put under ``set_cookies``.
+        Responses other than a page, like redirects, aren't cached.
+
+        Parameters
+        ----------
+        func: Callable[..., RouteRetVal]
+            A Flask route function to be wrapped.
+
+        Returns
+        -------
+        Callable[..., tuple[Response, Languages]]
+            The wrapped function, responds with the page and its ETag,
+            or 304 when it matches `If-None-Match`.
+        """
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> RouteRetVal:
+            language = handle_lang_pref()
+            key: PageKey = (
+                request.endpoint, tuple(sorted(kwargs.items())), language
+                )
+            generation = self.generation()
+            page = self.get(key)
+            if page is None:
+                body, language = func(*args, **kwargs)
+                if not isinstance(body, str):
+                    return body, language
+                page = self.put(key, body, generation)
+            response = Response(page.body, mimetype="text/html")
+            response.set_etag(page.etag)
+            response.make_conditional(request.environ)
+            if response.status_code == 304:
+                self.not_modified += 1
+            return response, language
+        return wrapper
+
+    def get(self, key: PageKey) -> Page | None:
+        """
+        Returns the page for a key and marks it as recently used, None
+        if it isn't cached.
+        """
+        with self._lock:
+            self._check_generation()
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(
+        self, key: PageKey, body: str, generation: int | None = None
+    ) -> Page:
+        """
+        Cache a rendered page, evicting the least recently used pages
+        to stay within `max_bytes`. A page larger than `max_bytes`, or
+        rendered before the content changed, is returned without being
+        cached.
+
+        Parameters
+        ----------
+        key: PageKey
+            The endpoint, view arguments and display language.
+        body: str
+            The rendered page.
+        generation: int | None, by default None
+            The generation read before rendering, None for the current
+            one.
+
+        Returns
+        -------
+        Page
+            The encoded page and its ETag.
+        """
+        data = body.encode()
+        page = Page(data, hashlib.blake2b(data, digest_size=16).hexdigest())
+        if len(data) > self.max_bytes:
+            return page
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                return page
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            while self._pages and self.size + len(data) > self.max_bytes:
+                _, evicted = self._pages.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.evictions += 1
+            self._pages[key] = page
+            self.size += len(data)
+        return page
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        with self._lock:
+            self._pages.clear()
+            self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        The counters of the cache.
+
+        Returns
+        -------
+        dict[str, int]
+            The number of pages and their bytes, hits, misses, 304
+            responses and evicted pages.
+        """
+        return {
+            "pages": len(self._pages),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+        }
+
+    def _check_generation(self) -> None:
+        """Drop every page if the content changed, called with the lock."""
+        generation = self.generation()
+        if generation != self._generation:
+            self._pages.clear()
+            self.size = 0
+            self._generation = generation
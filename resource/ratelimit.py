@@ -0,0 +1,253 @@
+"""
+Rate limiting of the routes that send emails or change the state of the
+demos, with token buckets by client IP and by demo session, kept in
+this process.
+
+A limit is written as ``<requests>/<seconds>``: a client can make that
+many requests at once, and gets them back evenly over that many
+seconds. The limit of a route is read from the environment variable
+``RATE_LIMIT_<NAME>``, like ``RATE_LIMIT_CONTACT=5/600``.
+
+The client IP is read from X-Forwarded-For, as the server runs behind
+the load balancer of Render, which appends the IP it got the request
+from. ``PROXY_COUNT`` is the number of proxies in front of the server
+that each append one, 1 by default. Only the IP appended by the first
+of them is used, the ones before it are sent by the client and can be
+anything. Set it to 0 when clients connect to the server directly, as
+then the client writes the whole header.
+"""
+import math
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import wraps
+from resource.sessions import SESSION_KEY
+from typing import Any
+
+from flask import jsonify, request, session
+from werkzeug.wrappers.response import Response
+
+# ---------------------------------------------------------------------
+RATE_LIMIT_MAX_KEYS = 4096
+RATE_LIMIT_SWEEP_INTERVAL = 60.0
+# proxies in front of the server that append the client IP to
+# X-Forwarded-For, 0 when clients connect to the server directly
+PROXY_COUNT: int = int(os.getenv("PROXY_COUNT") or 1)
+
+
+def parse_limit(limit: str) -> tuple[float, float]:
+    """
+    Read a limit written as ``<requests>/<seconds>``.
+
+    Returns
+    -------
+    tuple[float, float]
+        The capacity of a bucket, and the tokens added per second.
+
+    Raises
+    ------
+    ValueError
+        If the limit isn't written like that, or isn't positive.
+    """
+    try:
+        count, seconds = (float(part) for part in limit.split("/"))
+    except ValueError as error:
+        raise ValueError(
+            f"limit should be '<requests>/<seconds>', got {limit!r}."
+            ) from error
+    if count < 1 or seconds <= 0:
+        raise ValueError(f"limit should be positive, got {limit!r}.")
+    return count, count / seconds
+
+
+class TokenBuckets:
+    """
+    A token bucket for each key, in a table of `max_keys` slots. Keys
+    whose bucket filled up again are swept every `sweep_interval`
+    seconds, and when the table is full the key used least recently
+    gives its slot away. Keys are kept in the order they were last
+    used, so both only look at the keys that go.
+
+    Not thread-safe, see RateLimiter.
+
+    Parameters
+    ----------
+    capacity: float
+        The most tokens in a bucket, a new key starts with a full one.
+    rate: float
+        Tokens added to a bucket per second.
+    max_keys: int, by default RATE_LIMIT_MAX_KEYS
+        The number of slots.
+    sweep_interval: float, by default RATE_LIMIT_SWEEP_INTERVAL
+        Seconds between sweeps.
+    """
+    def __init__(
+        self,
+        capacity: float,
+        rate: float,
+        max_keys: int = RATE_LIMIT_MAX_KEYS,
+        sweep_interval: float = RATE_LIMIT_SWEEP_INTERVAL,
+    ) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+
+        self._tokens = array('d', [0.0]) * max_keys
+        self._stamps = array('d', [0.0]) * max_keys
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._free = list(reversed(range(max_keys)))
+        self._swept = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def wait(self, key: str, now: float) -> float:
+        """
+        Seconds until the bucket of a key has a token, 0 if it has one.
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            return 0.0
+        tokens = self._refill(slot, now)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, key: str, now: float) -> None:
+        """Take a token from the bucket of a key."""
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slot(key, now)
+            self._tokens[slot] = self.capacity
+        else:
+            self._slots.move_to_end(key)
+        self._tokens[slot] = self._refill(slot, now) - 1
+        self._stamps[slot] = now
+
+    def sweep(self, now: float) -> None:
+        """Free the slots of keys whose bucket is full again."""
+        self._swept = now
+        full = self.capacity / self.rate
+        while self._slots:
+            slot = next(iter(self._slots.values()))
+            if now - self._stamps[slot] < full:
+                break
+            self._free.append(self._slots.popitem(last=False)[1])
+
+    def _refill(self, slot: int, now: float) -> float:
+        """The tokens of a slot after the time since it was last used."""
+        elapsed = now - self._stamps[slot]
+        return min(self.capacity, self._tokens[slot] + elapsed * self.rate)
+
+    def _slot(self, key: str, now: float) -> int:
+        """A free slot for a new key."""
+        if now - self._swept >= self.sweep_interval or not self._free:
+            self.sweep(now)
+        if not self._free:
+            self._free.append(self._slots.popitem(last=False)[1])
+        slot = self._free.pop()
+        self._slots[key] = slot
+        return slot
+
+
+class RateLimiter:
+    """
+    Limits of the routes by name, routes decorated with the same name
+    share their buckets.
+    """
+    def __init__(self) -> None:
+        self.limited = 0
+        self._buckets: dict[str, tuple[TokenBuckets, TokenBuckets]] = {}
+        self._lock = threading.Lock()
+
+    def limit(
+        self, name: str, default: str, methods: tuple[str, ...] = ("POST",)
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        A decorator for a Flask route function, put between the route
+        and ``set_cookies``. A request over the limit of its client IP
+        or its demo session gets 429 with `Retry-After`, instead of the
+        response of the route. The body is JSON for ``/api/`` routes,
+        with the seconds to wait as "retry_after".
+
+        Parameters
+        ----------
+        name: str
+            The name of the limit, ``RATE_LIMIT_<NAME>`` overrides it.
+        default: str
+            The limit if the environment variable isn't set.
+        methods: tuple[str, ...], by default ("POST",)
+            The request methods that are limited.
+
+        Returns
+        -------
+        Callable[[Callable[..., Any]], Callable[..., Any]]
+            The decorator.
+        """
+        env = f"RATE_LIMIT_{name.upper()}"
+        if name not in self._buckets:
+            capacity, rate = parse_limit(os.getenv(env) or default)
+            self._buckets[name] = (
+                TokenBuckets(capacity, rate), TokenBuckets(capacity, rate)
+                )
+        by_ip, by_session = self._buckets[name]
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if request.method in methods:
+                    wait = self._take(by_ip, by_session)
+                    if wait:
+                        return too_many_requests(math.ceil(wait))
+                return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _take(self, by_ip: TokenBuckets, by_session: TokenBuckets) -> float:
+        """
+        Take a token for the request from both buckets if they have
+        one, otherwise returns the seconds to wait.
+        """
+        keys = [(by_ip, client_ip())]
+        sid = session.get(SESSION_KEY)
+        if isinstance(sid, str):
+            keys.append((by_session, sid))
+        now = time.monotonic()
+        with self._lock:
+            wait = max(buckets.wait(key, now) for buckets, key in keys)
+            if wait:
+                self.limited += 1
+                return wait
+            for buckets, key in keys:
+                buckets.take(key, now)
+        return 0.0
+
+
+def too_many_requests(retry_after: int) -> Response:
+    """The 429 response, JSON for the APIs the demo pages fetch."""
+    response: Response
+    if request.path.startswith("/api/"):
+        response = jsonify(
+            error="too many requests", retry_after=retry_after
+            )
+    else:
+        response = Response("too many requests")
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def client_ip(proxy_count: int = PROXY_COUNT) -> str:
+    """
+    The IP of the client, the one added to X-Forwarded-For by the
+    first of `proxy_count` proxies in front of the server, or the
+    address of the connection when the header is missing or shorter.
+    """
+    header = request.headers.get("X-Forwarded-For")
+    if proxy_count and header:
+        forwarded = header.split(",")
+        if len(forwarded) >= proxy_count:
+            return forwarded[-proxy_count].strip()
+    return request.remote_addr or ""
@@ -0,0 +1,391 @@
+"""
+A bounded in-memory store for the state of the website demos, so each
+visitor plays with their own tic tac toe board and morse code converter.
+
+Visitors are told apart by a random session id kept in the signed
+Flask session cookie. With DEMO_STATELESS set, the state itself is kept
+in signed cookies instead, see CookieStore.
+
+The demos are imported by the first visitor that needs them, or by the
+startup of the server, not by this module.
+"""
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+from demo_common.terminal import TerminalHistory
+from flask import after_this_request, g, request, session
+from itsdangerous import BadData, Signer, base64_decode, base64_encode
+from werkzeug.wrappers.response import Response
+
+if TYPE_CHECKING:
+    from demo_morse_code_converter.converter import Converter
+    from demo_tic_tac_toe.showmaker_demo import ShowMaker
+
+# ---------------------------------------------------------------------
+State = TypeVar("State")
+
+SESSION_KEY = "demo_sid"
+SESSION_MAX: int = int(os.getenv("DEMO_SESSION_MAX") or 512)
+SESSION_TTL: float = float(os.getenv("DEMO_SESSION_TTL") or 30 * 60)
+SESSION_MAX_BYTES: int = int(
+    os.getenv("DEMO_SESSION_MAX_BYTES") or 32 * 1024 * 1024
+    )
+STATE_BASE_BYTES = 4 * 1024  # rough footprint of a fresh DemoState
+
+SESSION_STATELESS: bool = (
+    os.getenv("DEMO_STATELESS", "").lower() in ("1", "true", "yes")
+    )
+# browsers keep at least 4096 bytes a cookie, name and attributes included
+COOKIE_MAX_BYTES = 3800
+# the newest input and its result, of the morse code converter
+COOKIE_MIN_LINES = 2
+COOKIE_SHOWMAKER = "demo_tic_tac_toe"
+COOKIE_CONVERTER = "demo_morse_code"
+
+
+@dataclass
+class DemoState:
+    """The demo objects that belong to a single visitor."""
+    showmaker: "ShowMaker"
+    converter: "Converter"
+
+
+@dataclass
+class _Entry(Generic[State]):
+    """A stored state along with its lock and bookkeeping."""
+    state: State
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    last_seen: float = field(default_factory=time.monotonic)
+    size: int = 0
+
+
+class SessionStore(Generic[State]):
+    """
+    A thread-safe store that maps session ids to states, evicts the
+    least recently used state when it is full, drops states idle for
+    longer than the TTL, and serializes access to a single state with a
+    per-session lock.
+
+    Parameters
+    ----------
+    factory: Callable[[], State]
+        Creates the state for a session seen for the first time.
+    sizer: Callable[[State], int]
+        Estimates how many bytes a state takes, used to enforce
+        `max_bytes`.
+    max_sessions: int
+        The maximum number of states kept at the same time.
+    max_bytes: int
+        The maximum number of bytes (estimated by `sizer`) all states
+        can take together.
+    ttl: float
+        Seconds a state can stay idle before it's dropped.
+    """
+    def __init__(
+        self,
+        factory: Callable[[], State],
+        *,
+        sizer: Callable[[State], int],
+        max_sessions: int = SESSION_MAX,
+        max_bytes: int = SESSION_MAX_BYTES,
+        ttl: float = SESSION_TTL,
+    ) -> None:
+        self.factory = factory
+        self.sizer = sizer
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.evictions = 0
+        self.expirations = 0
+
+        self._entries: OrderedDict[str, _Entry[State]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + ttl
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        """The estimated number of bytes taken by all states."""
+        return self._total_bytes
+
+    @contextmanager
+    def checkout(self, sid: str) -> Iterator[State]:
+        """
+        Borrow the state of a session, creating it when needed. The
+        per-session lock is held until the ``with`` block exits, so
+        concurrent requests from the same visitor take turns.
+
+        Parameters
+        ----------
+        sid: str
+            The session id.
+
+        Yields
+        ------
+        State
+            The state that belongs to the session.
+        """
+        entry = self._touch(sid)
+        with entry.lock:
+            yield entry.state
+            size = self.sizer(entry.state)
+        self._resize(sid, entry, size)
+
+    def sweep(self) -> None:
+        """Drop every state that has been idle for longer than the TTL."""
+        with self._lock:
+            self._sweep(time.monotonic())
+
+    def _touch(self, sid: str) -> _Entry[State]:
+        """
+        Get or create the entry of a session and mark it as the most
+        recently used one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            entry = self._entries.get(sid)
+            if entry is None:
+                entry = _Entry(self.factory(), size=STATE_BASE_BYTES)
+                self._entries[sid] = entry
+                self._total_bytes += entry.size
+                self._evict(keep=sid)
+            else:
+                self._entries.move_to_end(sid)
+            entry.last_seen = now
+            return entry
+
+    def _resize(self, sid: str, entry: _Entry[State], size: int) -> None:
+        """Record the new size of a state and evict others if needed."""
+        with self._lock:
+            if self._entries.get(sid) is not entry:
+                return  # evicted or reset while in use
+            self._total_bytes += size - entry.size
+            entry.size = size
+            self._evict(keep=sid)
+
+    def _evict(self, *, keep: str) -> None:
+        """
+        Evict the least recently used states until the store is within
+        its limits, never evicting the state of `keep`.
+        """
+        while self._entries and (
+            len(self._entries) > self.max_sessions
+            or self._total_bytes > self.max_bytes
+        ):
+            sid = next(iter(self._entries))
+            if sid == keep:
+                break
+            self._total_bytes -= self._entries.pop(sid).size
+            self.evictions += 1
+
+    def _sweep(self, now: float) -> None:
+        """
+        Drop expired states, the entries are ordered by last use so this
+        stops at the first state that is still alive.
+        """
+        while self._entries:
+            sid, entry = next(iter(self._entries.items()))
+            if now - entry.last_seen < self.ttl:
+                break
+            del self._entries[sid]
+            self._total_bytes -= entry.size
+            self.expirations += 1
+        self._next_sweep = now + min(self.ttl, 60)
+
+
+class CookieStore:
+    """
+    Keeps the state of each visitor's demos in signed cookies instead of
+    in memory, so any worker process or server can serve any request,
+    and restarts don't lose games.
+
+    Each demo object is packed with its to_bytes(), compressed and
+    signed with the secret key, in a cookie of its own that is only set
+    again when the object changed. When a cookie would grow too large
+    the oldest terminal lines are dropped.
+
+    Parameters
+    ----------
+    secret_key: str
+        The key the cookies are signed with.
+    max_bytes: int
+        The maximum length of a cookie value.
+    ttl: float
+        Seconds the cookies are kept by the browser after the last
+        change.
+    """
+    def __init__(
+        self,
+        secret_key: str,
+        *,
+        max_bytes: int = COOKIE_MAX_BYTES,
+        ttl: float = SESSION_TTL,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.rejected = 0
+
+        self._signer = Signer(secret_key, salt="demo-state")
+
+    @contextmanager
+    def checkout(self, sid: str) -> Iterator[DemoState]:
+        """
+        Borrow the state of the current visitor, loaded from the request
+        cookies once per request. Changes are written to the response
+        cookies when the request ends.
+
+        Parameters
+        ----------
+        sid: str
+            Not used, the cookies belong to the visitor already. Taken
+            to stand in for SessionStore.checkout().
+
+        Yields
+        ------
+        DemoState
+            The state of the current visitor.
+        """
+        state: DemoState | None = g.get("demo_state")
+        if state is None:
+            # pylint: disable=import-outside-toplevel
+            from demo_morse_code_converter.converter import Converter
+            from demo_tic_tac_toe.showmaker_demo import ShowMaker
+
+            showmaker = self._load(COOKIE_SHOWMAKER, ShowMaker.from_bytes)
+            if showmaker is None:
+                showmaker = ShowMaker()
+                showmaker.new_game()
+            converter = self._load(COOKIE_CONVERTER, Converter.from_bytes)
+            state = DemoState(showmaker, converter or Converter())
+            g.demo_state = state
+            after_this_request(self._save)
+        yield state
+
+    def _load[T](self, name: str, loader: Callable[[bytes], T]) -> T | None:
+        """
+        Unpack the object in a request cookie, None when it's missing or
+        doesn't hold a valid object.
+        """
+        value = request.cookies.get(name)
+        if value is None:
+            return None
+        try:
+            data = zlib.decompress(base64_decode(self._signer.unsign(value)))
+            return loader(data)
+        except (BadData, zlib.error, ValueError):
+            self.rejected += 1
+            return None
+
+    def _save(self, response: Response) -> Response:
+        """Set the cookies of the objects that changed in this request."""
+        state: DemoState = g.demo_state
+        parts: list[
+            tuple[str, "ShowMaker | Converter", list[TerminalHistory]]
+            ]
+        parts = [
+            (
+                COOKIE_SHOWMAKER, state.showmaker,
+                [state.showmaker.output, state.showmaker.history],
+            ),
+            (COOKIE_CONVERTER, state.converter, [state.converter.history]),
+        ]
+        for name, obj, histories in parts:
+            value = self._dump(obj, histories)
+            if value != request.cookies.get(name):
+                response.set_cookie(
+                    name, value, max_age=int(self.ttl), httponly=True,
+                    samesite="Lax", secure=request.is_secure,
+                    )
+        return response
+
+    def _dump(
+        self, obj: "ShowMaker | Converter", histories: list[TerminalHistory]
+    ) -> str:
+        """
+        Pack, compress and sign an object, halving its terminal
+        histories until the value fits in a cookie. The newest
+        `COOKIE_MIN_LINES` lines of each history are always kept.
+        """
+        while True:
+            data = base64_encode(zlib.compress(obj.to_bytes()))
+            value = self._signer.sign(data).decode()
+            if len(value) <= self.max_bytes or all(
+                len(history) <= COOKIE_MIN_LINES for history in histories
+            ):
+                return value
+            for history in histories:
+                history.shrink(max(len(history) // 2, COOKIE_MIN_LINES))
+
+
+def new_demo_state() -> DemoState:
+    """
+    Create the demo objects for a new visitor.
+
+    Returns
+    -------
+    DemoState
+        A tic tac toe game ready to play and an empty converter.
+    """
+    # pylint: disable=import-outside-toplevel
+    from demo_morse_code_converter.converter import Converter
+    from demo_tic_tac_toe.showmaker_demo import ShowMaker
+
+    showmaker = ShowMaker()
+    showmaker.new_game()
+    return DemoState(showmaker=showmaker, converter=Converter())
+
+
+def demo_state_size(state: DemoState) -> int:
+    """
+    Estimate the number of bytes a visitor's demo objects take, only
+    the parts that grow while playing are measured.
+
+    Parameters
+    ----------
+    state: DemoState
+        The demo objects of a visitor.
+
+    Returns
+    -------
+    int
+        The estimated size in bytes.
+    """
+    return STATE_BASE_BYTES + sum(
+        history.nbytes for history in (
+            state.converter.history,
+            state.showmaker.output,
+            state.showmaker.history,
+        )
+    )
+
+
+def session_id() -> str:
+    """
+    Returns the demo session id of the current visitor, a new one is
+    created and stored in the signed session cookie when missing.
+
+    Returns
+    -------
+    str
+        The session id.
+    """
+    sid = session.get(SESSION_KEY)
+    if not isinstance(sid, str):
+        sid = uuid.uuid4().hex
+        session[SESSION_KEY] = sid
+    return sid
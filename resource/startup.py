@@ -0,0 +1,140 @@
+"""
+The startup of the server. What the first visitors would otherwise wait
+for, connecting to the database, loading the content, compiling the
+templates and importing the demos, is done in phases by a background
+thread while the server already accepts connections.
+
+``/healthz`` answers as soon as the process is up, ``/readyz`` only
+once every phase is done, so the platform routes traffic to the server
+when it's warm. Both respond with the seconds each phase took.
+"""
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from flask import Flask, jsonify
+from werkzeug.wrappers.response import Response
+
+# ---------------------------------------------------------------------
+STARTUP_RETRY_INTERVAL = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class Startup:
+    """
+    Phases of the startup run in the order they're added, a phase that
+    fails is logged and tried again after `retry_interval` seconds
+    before the next one starts.
+
+    Parameters
+    ----------
+    retry_interval: float, by default STARTUP_RETRY_INTERVAL
+        Seconds between attempts of a phase that failed.
+    """
+    def __init__(
+        self, retry_interval: float = STARTUP_RETRY_INTERVAL
+    ) -> None:
+        self.retry_interval = retry_interval
+        self.phases: list[tuple[str, Callable[[], Any]]] = []
+        # seconds by phase, "setup" is from creation to start()
+        self.timings: dict[str, float] = {}
+        self.attempts: dict[str, int] = {}
+        self.ready = threading.Event()
+
+        self._created = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, name: str, func: Callable[[], Any]) -> None:
+        """
+        Add a phase after the ones already added.
+
+        Parameters
+        ----------
+        name: str
+            The name of the phase in the timings.
+        func: Callable[[], Any]
+            Runs the phase, raises if it failed.
+        """
+        self.phases.append((name, func))
+
+    def init_app(self, app: Flask) -> None:
+        """Add ``/healthz`` and ``/readyz``."""
+        app.add_url_rule("/healthz", view_func=self.healthz)
+        app.add_url_rule("/readyz", view_func=self.readyz)
+
+    def start(self) -> None:
+        """Run the phases in a background thread."""
+        if self._thread is not None:
+            return
+        self.timings["setup"] = time.perf_counter() - self._created
+        self._thread = threading.Thread(
+            target=self.run, name="startup", daemon=True
+            )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after the phase it's in."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> bool:
+        """
+        Run every phase in order.
+
+        Returns
+        -------
+        bool
+            If every phase is done, False when stopped before.
+        """
+        for name, func in self.phases:
+            if name in self.timings:
+                continue
+            while not self._stop.is_set():
+                self.attempts[name] = self.attempts.get(name, 0) + 1
+                started = time.perf_counter()
+                try:
+                    func()
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logger.exception("startup phase %r failed", name)
+                    self._stop.wait(self.retry_interval)
+                    continue
+                self.timings[name] = time.perf_counter() - started
+                logger.info(
+                    "startup phase %r took %.3f s", name, self.timings[name]
+                    )
+                break
+            else:
+                return False
+        self.timings["total"] = time.perf_counter() - self._created
+        self.ready.set()
+        return True
+
+    def healthz(self) -> Response:
+        """200 as long as the process is up."""
+        return self._status(200)
+
+    def readyz(self) -> Response:
+        """200 once every phase is done, 503 before."""
+        return self._status(200 if self.ready.is_set() else 503)
+
+    def _status(self, status: int) -> Response:
+        """The state of the startup as JSON, never cached."""
+        response = jsonify(
+            ready=self.ready.is_set(),
+            timings={
+                name: round(seconds, 4)
+                for name, seconds in self.timings.items()
+                },
+            pending=[
+                name for name, _ in self.phases if name not in self.timings
+                ],
+            )
+        response.status_code = status
+        response.cache_control.no_store = True
+        return response
@@ -0,0 +1,246 @@
+"""
+Server-Sent Events for the website demos, so a demo page keeps one
+long-lived connection that receives new terminal lines as they are
+written, instead of fetching them after every submit. A visitor has
+at most one stream of each demo, a new one replaces the one of their
+other tab.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from typing import Any
+
+# ---------------------------------------------------------------------
+Snapshot = Callable[[int | None], dict[str, Any]]
+
+# every stream holds a worker thread, main.py also keeps this to a
+# quarter of the threads the server runs with
+STREAM_MAX: int = int(os.getenv("DEMO_STREAM_MAX") or 2)
+STREAM_QUEUE_SIZE: int = int(os.getenv("DEMO_STREAM_QUEUE_SIZE") or 8)
+STREAM_HEARTBEAT: float = float(os.getenv("DEMO_STREAM_HEARTBEAT") or 15)
+STREAM_MAX_AGE: float = float(os.getenv("DEMO_STREAM_MAX_AGE") or 5 * 60)
+STREAM_RETRY_MS = 3000
+
+
+class Subscription:
+    """
+    A client listening to the updates of one demo session. Updates are
+    queued as notifications only, the lines themselves are read from the
+    session when the client is ready for them, so a slow client never
+    holds more than `queue_size` notifications.
+    """
+    def __init__(self, key: tuple[str, str], queue_size: int) -> None:
+        self.key = key
+        # set when another stream of the same session and demo took its
+        # place
+        self.replaced = False
+        self._queue: queue.Queue[None] = queue.Queue(maxsize=queue_size)
+
+    def notify(self) -> None:
+        """Tell the client there are new lines."""
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # a pending notification will pick these lines up too
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait for notifications, all pending ones are taken at once.
+
+        Returns
+        -------
+        bool
+            False if nothing arrived within `timeout` seconds.
+        """
+        try:
+            self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return True
+
+
+class StreamHub:
+    """
+    Keeps track of the open demo streams of this worker and wakes them
+    up when their session changes.
+
+    Parameters
+    ----------
+    max_streams: int
+        The maximum number of streams open at the same time.
+    queue_size: int
+        The number of notifications kept for each stream.
+    heartbeat: float
+        Seconds of silence before a comment is sent to keep the
+        connection open and notice clients that left.
+    max_age: float
+        Seconds before a stream is closed, the browser reconnects on
+        its own and picks up where it left off.
+    """
+    def __init__(
+        self,
+        *,
+        max_streams: int = STREAM_MAX,
+        queue_size: int = STREAM_QUEUE_SIZE,
+        heartbeat: float = STREAM_HEARTBEAT,
+        max_age: float = STREAM_MAX_AGE,
+    ) -> None:
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_age = max_age
+
+        self.rejected = 0
+
+        self._subscriptions: defaultdict[
+            tuple[str, str], set[Subscription]
+        ] = defaultdict(set)
+        self._current: dict[tuple[str, str], Subscription] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        """The number of open streams."""
+        return self._active
+
+    def open(self, sid: str, demo: str) -> Subscription | None:
+        """
+        Start listening to the updates of a demo session. The stream
+        the session already has of this demo, from another tab, is
+        replaced, streams of its other demos are kept.
+
+        Parameters
+        ----------
+        sid: str
+            The session id.
+        demo: str
+            The name of the demo.
+
+        Returns
+        -------
+        Subscription | None
+            None when this worker already has `max_streams` streams.
+        """
+        with self._lock:
+            previous = self._current.get((sid, demo))
+            if previous is not None:
+                self._remove(previous)
+                previous.replaced = True
+                previous.notify()
+            elif self._active >= self.max_streams:
+                self.rejected += 1
+                return None
+            subscription = Subscription((sid, demo), self.queue_size)
+            self._subscriptions[subscription.key].add(subscription)
+            self._current[subscription.key] = subscription
+            self._active += 1
+            return subscription
+
+    def close(self, subscription: Subscription) -> None:
+        """Stop listening, the stream slot is given back."""
+        with self._lock:
+            self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        """Forget a subscription, the lock has to be held."""
+        listeners = self._subscriptions.get(subscription.key)
+        if listeners is None or subscription not in listeners:
+            return
+        listeners.discard(subscription)
+        if not listeners:
+            del self._subscriptions[subscription.key]
+        if self._current.get(subscription.key) is subscription:
+            del self._current[subscription.key]
+        self._active -= 1
+
+    def publish(self, sid: str, demo: str) -> None:
+        """
+        Tell every stream of a demo session that there are new lines.
+
+        Parameters
+        ----------
+        sid: str
+            The session id.
+        demo: str
+            The name of the demo.
+        """
+        with self._lock:
+            listeners = list(self._subscriptions.get((sid, demo), ()))
+        for subscription in listeners:
+            subscription.notify()
+
+    def events(
+        self,
+        subscription: Subscription,
+        snapshot: Snapshot,
+        since: int | None,
+    ) -> Iterator[str]:
+        """
+        The body of an event stream. Each event carries the payload
+        returned by `snapshot` for the last sequence number sent, with
+        the sequence number as the event id. A replaced stream ends
+        with a "replaced" event, telling the page not to reconnect.
+
+        Parameters
+        ----------
+        subscription: Subscription
+            The subscription returned by open(), closed when the stream
+            ends.
+        snapshot: Snapshot
+            Returns the payload of the lines after a sequence number,
+            the payload must contain the new sequence number as "seq".
+        since: int | None
+            The sequence number of the last line the client has.
+
+        Yields
+        ------
+        str
+            Server-Sent Events formatted messages.
+        """
+        deadline = time.monotonic() + self.max_age
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            payload = snapshot(since)
+            since = payload["seq"]
+            yield format_event(payload)
+            while time.monotonic() < deadline:
+                woken = subscription.wait(self.heartbeat)
+                if subscription.replaced:
+                    yield "event: replaced\ndata:\n\n"
+                    return
+                if not woken:
+                    yield ": heartbeat\n\n"
+                    continue
+                payload = snapshot(since)
+                if payload["seq"] != since:
+                    since = payload["seq"]
+                    yield format_event(payload)
+        finally:
+            self.close(subscription)
+
+
+def format_event(payload: dict[str, Any]) -> str:
+    """
+    Format a payload as a Server-Sent Events message.
+
+    Parameters
+    ----------
+    payload: dict[str, Any]
+        The payload, its "seq" is used as the event id.
+
+    Returns
+    -------
+    str
+        The message.
+    """
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"id: {payload['seq']}\ndata: {data}\n\n"
@@ -0,0 +1,195 @@
+"""
+The Jinja setup of the website: a `{% cache %}` tag for fragments of
+the templates, a bytecode cache on the filesystem so a new worker
+doesn't compile the templates again, and render times, in the metrics
+and logged in debug mode.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from resource.metrics import metrics
+from resource.tracing import tracer
+from typing import Any
+
+from flask import Flask, before_render_template, template_rendered
+from jinja2 import Environment, FileSystemBytecodeCache, Template, nodes
+from jinja2.ext import Extension
+from jinja2.parser import Parser
+
+# ---------------------------------------------------------------------
+JINJA_BYTECODE_DIR: str = os.getenv("JINJA_BYTECODE_DIR") or os.path.join(
+    tempfile.gettempdir(), "portfolio-website-jinja"
+    )
+FRAGMENT_CACHE_MAX_ENTRIES = 256
+
+RENDER_SECONDS = metrics.histogram(
+    "portfolio_template_render_duration_seconds",
+    "Seconds of render_template(), by template.",
+    ("template",),
+    )
+
+_render_starts = threading.local()
+
+
+class FragmentCache:
+    """
+    Rendered fragments of the templates by their keys, the least
+    recently used are evicted after `max_entries`. Every fragment is
+    dropped when `generation` returns something else, so fragments
+    rendered from the content of the database can be cached too.
+
+    Parameters
+    ----------
+    max_entries: int, by default FRAGMENT_CACHE_MAX_ENTRIES
+        The most fragments to keep.
+    """
+    def __init__(self, max_entries: int = FRAGMENT_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.generation: Callable[[], int] | None = None
+        self.hits = 0
+        self.misses = 0
+
+        self._fragments: OrderedDict[Hashable, str] = OrderedDict()
+        self._generation: int | None = None
+        self._lock = threading.Lock()
+
+    def render(self, key: Hashable, caller: Callable[[], str]) -> str:
+        """
+        Returns the cached fragment for a key, or renders and caches it.
+
+        Parameters
+        ----------
+        key: Hashable
+            The key of the fragment.
+        caller: Callable[[], str]
+            Renders the fragment.
+
+        Returns
+        -------
+        str
+            The fragment.
+        """
+        generation = self.generation() if self.generation else None
+        with self._lock:
+            if generation != self._generation:
+                self._fragments.clear()
+                self._generation = generation
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        fragment = caller()
+        with self._lock:
+            if generation == self._generation:
+                self._fragments[key] = fragment
+                while len(self._fragments) > self.max_entries:
+                    self._fragments.popitem(last=False)
+        return fragment
+
+    def clear(self) -> None:
+        """Drop every cached fragment."""
+        with self._lock:
+            self._fragments.clear()
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Adds ``{% cache key, ... %}...{% endcache %}`` to the templates, the
+    body is rendered once for each key and display language, so it
+    should only depend on those. The cache is `fragment_cache` of the
+    environment.
+    """
+    tags = {"cache"}
+
+    def __init__(self, environment: Environment) -> None:
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache())
+
+    def parse(self, parser: Parser) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+        keys = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            keys.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        keys.append(nodes.Name("language", "load"))
+        call = self.call_method("_render", [nodes.Tuple(keys, "load")])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, key: tuple[Any, ...], caller: Callable[[], str]) -> str:
+        """Render the body of a cache tag, the language is last in key."""
+        key = (*key[:-1], str(key[-1]))
+        cache: FragmentCache = getattr(self.environment, "fragment_cache")
+        return cache.render(key, caller)
+
+
+def setup_jinja(
+    app: Flask, generation: Callable[[], int] | None = None
+) -> None:
+    """
+    Add the fragment cache and the bytecode cache to the Jinja
+    environment of the app, and time the renders. Has to be called
+    before anything uses ``app.jinja_env``.
+
+    Parameters
+    ----------
+    app: Flask
+        The app.
+    generation: Callable[[], int] | None, by default None
+        Returns a number that changes with the content the fragments
+        are rendered from, see FragmentCache.
+    """
+    os.makedirs(JINJA_BYTECODE_DIR, exist_ok=True)
+    options = dict(app.jinja_options)
+    options["bytecode_cache"] = FileSystemBytecodeCache(JINJA_BYTECODE_DIR)
+    options["extensions"] = [
+        *options.get("extensions", ()), FragmentCacheExtension
+        ]
+    app.jinja_options = options
+    cache: FragmentCache = getattr(app.jinja_env, "fragment_cache")
+    cache.generation = generation
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    app.teardown_appcontext(_clear_render_starts)
+
+
+def _render_started(
+    sender: Flask, template: Template, **_: Any
+) -> None:
+    """Note when a template starts rendering."""
+    starts = getattr(_render_starts, "stack", None)
+    if starts is None:
+        starts = _render_starts.stack = []
+    starts.append(time.perf_counter())
+
+
+def _clear_render_starts(_: BaseException | None) -> None:
+    """
+    Forget the starts of renders that raised, Flask only sends
+    template_rendered for the ones that didn't.
+    """
+    starts = getattr(_render_starts, "stack", None)
+    if starts:
+        starts.clear()
+
+
+def _render_finished(
+    sender: Flask, template: Template, **_: Any
+) -> None:
+    """Observe how long a template took to render, logged in debug."""
+    starts = getattr(_render_starts, "stack", None)
+    if not starts:
+        return
+    started = starts.pop()
+    elapsed = time.perf_counter() - started
+    name = template.name or "string"
+    RENDER_SECONDS.observe(elapsed, name)
+    tracer.record(f"render {name}", "template", started, elapsed)
+    if sender.debug:
+        sender.logger.debug(
+            "rendered %s in %.2f ms", template.name, elapsed * 1000
+            )
@@ -0,0 +1,375 @@
+"""
+Traces of the requests, and of the work of the background threads,
+split into spans: the route, set_cookies(), every SQL query,
+every template render and outbound I/O like SMTP and GitHub.
+
+Spans are only kept in memory until the trace ends. A trace slower than
+TRACE_SLOW_MS, or one in TRACE_SAMPLE of the others, is logged as one
+line of JSON with its request id and the time spent in each category,
+and kept for ``/debug/traces``, which downloads the last TRACE_KEEP of
+them in the Chrome trace format, for chrome://tracing or Perfetto. The
+route only exists when METRICS_TOKEN is set, and needs it as a bearer
+token, like ``/metrics``. Set TRACE_FILE to also save them there when
+the server exits.
+
+The request id is the X-Request-ID header of the request when it's
+sane, or a new one, and is sent back in the same header.
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from resource.metrics import METRICS_TOKEN, authorized
+from typing import Any
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ---------------------------------------------------------------------
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS") or 500)
+# 1 in `TRACE_SAMPLE` of the traces that aren't slow, 0 for none
+TRACE_SAMPLE = int(os.getenv("TRACE_SAMPLE") or 100)
+TRACE_KEEP = int(os.getenv("TRACE_KEEP") or 200)
+TRACE_FILE: str = os.getenv("TRACE_FILE") or ""
+# spans of a trace written to the log, the slowest ones
+TRACE_LOG_SPANS = 20
+STATEMENT_MAX_LENGTH = 200
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A timed part of a trace, in perf_counter() seconds."""
+    __slots__ = ("name", "category", "start", "duration", "thread", "args")
+
+    def __init__(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        duration: float,
+        args: dict[str, Any],
+    ) -> None:
+        self.name = name
+        self.category = category
+        self.start = start
+        self.duration = duration
+        self.thread = threading.get_ident()
+        self.args = args
+
+
+class Trace:
+    """A request, or a run of a background thread, and its spans."""
+    __slots__ = (
+        "name", "trace_id", "start", "duration", "thread", "args", "spans"
+        )
+
+    def __init__(
+        self, name: str, trace_id: str, args: dict[str, Any]
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.thread = threading.get_ident()
+        self.args = args
+        # appended from other threads too, list.append() is atomic
+        self.spans: list[Span] = []
+
+    def summary(self) -> dict[str, Any]:
+        """The trace as one line of the log."""
+        categories: dict[str, dict[str, float]] = {}
+        for span in self.spans:
+            total = categories.setdefault(
+                span.category, {"count": 0, "ms": 0.0}
+                )
+            total["count"] += 1
+            total["ms"] += span.duration * 1000
+        slowest = sorted(
+            self.spans, key=lambda span: span.duration, reverse=True
+            )[:TRACE_LOG_SPANS]
+        return {
+            "request_id": self.trace_id,
+            "name": self.name,
+            "ms": round(self.duration * 1000, 3),
+            **self.args,
+            "categories": {
+                name: {"count": total["count"], "ms": round(total["ms"], 3)}
+                for name, total in categories.items()
+                },
+            "spans": [
+                {
+                    "name": span.name,
+                    "category": span.category,
+                    "at_ms": round((span.start - self.start) * 1000, 3),
+                    "ms": round(span.duration * 1000, 3),
+                }
+                for span in slowest
+                ],
+        }
+
+    def events(self, pid: int) -> list[dict[str, Any]]:
+        """The trace and its spans as complete events of a Chrome trace."""
+        args = {"request_id": self.trace_id, **self.args}
+        events = [_event(
+            self.name, "trace", self.start, self.duration, pid, self.thread,
+            args,
+            )]
+        for span in self.spans:
+            events.append(_event(
+                span.name, span.category, span.start, span.duration, pid,
+                span.thread, {"request_id": self.trace_id, **span.args},
+                ))
+        return events
+
+
+class Tracer:
+    """
+    Starts traces, records their spans, and keeps the ones that are
+    slow or sampled.
+
+    Parameters
+    ----------
+    slow_ms: float, by default TRACE_SLOW_MS
+        Traces at least this long are always logged and kept.
+    sample: int, by default TRACE_SAMPLE
+        Also log and keep 1 in `sample` of the other traces, 0 for none.
+    keep: int, by default TRACE_KEEP
+        The most traces to keep for export.
+    """
+    def __init__(
+        self,
+        slow_ms: float = TRACE_SLOW_MS,
+        sample: int = TRACE_SAMPLE,
+        keep: int = TRACE_KEEP,
+    ) -> None:
+        self.slow_ms = slow_ms
+        self.sample = sample
+        self.kept: deque[Trace] = deque(maxlen=keep)
+        self.traces = 0
+        self.slow = 0
+
+        self._local = threading.local()
+
+    def current(self) -> Trace | None:
+        """The trace of the current thread, if there's one."""
+        return getattr(self._local, "trace", None)
+
+    def begin(self, name: str, trace_id: str = "", **args: Any) -> Trace:
+        """Start a trace on the current thread, end it with finish()."""
+        trace = Trace(name, trace_id or uuid.uuid4().hex, args)
+        self._local.trace = trace
+        return trace
+
+    def finish(self, trace: Trace) -> None:
+        """End a trace, log and keep it if it's slow or sampled."""
+        trace.duration = time.perf_counter() - trace.start
+        if self.current() is trace:
+            self._local.trace = None
+        self.traces += 1
+        is_slow = trace.duration * 1000 >= self.slow_ms
+        if is_slow:
+            self.slow += 1
+        elif not (self.sample and random.randrange(self.sample) == 0):
+            return
+        self.kept.append(trace)
+        logger.log(
+            logging.WARNING if is_slow else logging.INFO,
+            "%s trace %s",
+            "slow" if is_slow else "sampled",
+            json.dumps(trace.summary(), separators=(",", ":"), default=str),
+            )
+
+    @contextmanager
+    def trace(self, name: str, **args: Any) -> Iterator[Trace]:
+        """Trace the body of a with statement, like a background job."""
+        outer = self.current()
+        trace = self.begin(name, **args)
+        try:
+            yield trace
+        finally:
+            self.finish(trace)
+            self._local.trace = outer
+
+    def record(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        duration: float,
+        trace: Trace | None = None,
+        **args: Any,
+    ) -> None:
+        """
+        Add a span that was already timed.
+
+        Parameters
+        ----------
+        name: str
+            The name of the span.
+        category: str
+            What the span spent time on, like "db" or "io".
+        start: float
+            The perf_counter() of its start.
+        duration: float
+            Its seconds.
+        trace: Trace | None, by default None
+            The trace to add it to, the one of the current thread if
+            None. Nothing is recorded without a trace.
+        **args: Any
+            Shown with the span.
+        """
+        trace = trace or self.current()
+        if trace is not None:
+            trace.spans.append(Span(name, category, start, duration, args))
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        category: str,
+        trace: Trace | None = None,
+        **args: Any,
+    ) -> Iterator[None]:
+        """Record the body of a with statement as a span."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(
+                name, category, started, time.perf_counter() - started,
+                trace, **args,
+                )
+
+    def export(self) -> dict[str, Any]:
+        """The kept traces in the Chrome trace format."""
+        pid = os.getpid()
+        events: list[dict[str, Any]] = []
+        for trace in list(self.kept):
+            events.extend(trace.events(pid))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str) -> None:
+        """Write the kept traces to a file in the Chrome trace format."""
+        with open(path, mode="w", encoding="UTF-8") as file:
+            json.dump(self.export(), file, default=str)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Trace the requests of the app and their SQL queries, and add
+        ``/debug/traces`` if METRICS_TOKEN is set.
+        """
+        app.before_request(self._request_started)
+        app.after_request(self._request_finished)
+        app.teardown_request(self._request_ended)
+        event.listen(Engine, "before_cursor_execute", _query_started)
+        event.listen(Engine, "after_cursor_execute", self._query_finished)
+        if METRICS_TOKEN:
+            app.add_url_rule("/debug/traces", "traces", self.view)
+        if TRACE_FILE:
+            atexit.register(self.save, TRACE_FILE)
+
+    def view(self) -> Response:
+        """The route of ``/debug/traces``, behind METRICS_TOKEN."""
+        if not authorized():
+            return Response("unauthorized", status=401)
+        response = Response(
+            json.dumps(self.export(), default=str),
+            content_type="application/json",
+            )
+        response.headers["Content-Disposition"] = (
+            'attachment; filename="traces.json"'
+            )
+        response.cache_control.no_store = True
+        return response
+
+    def _request_started(self) -> None:
+        """Start the trace of a request, and the span of its route."""
+        trace_id = request.headers.get(REQUEST_ID_HEADER, "")
+        if not REQUEST_ID_PATTERN.fullmatch(trace_id):
+            trace_id = ""
+        g.trace = self.begin(
+            f"{request.method} {request.path}", trace_id,
+            method=request.method, path=request.path,
+            )
+        g.route_started = time.perf_counter()
+
+    def _request_finished(self, response: Response) -> Response:
+        """Send the request id back."""
+        trace: Trace | None = g.get("trace")
+        if trace is not None:
+            trace.args["status"] = response.status_code
+            trace.args["endpoint"] = request.endpoint
+            response.headers[REQUEST_ID_HEADER] = trace.trace_id
+        return response
+
+    def _request_ended(self, _: BaseException | None) -> None:
+        """
+        End the span of the route and the trace of a request, after its
+        response is built. Every route gets the span, so the spans of
+        its queries, renders and I/O always have a parent.
+        """
+        trace: Trace | None = g.pop("trace", None)
+        started: float | None = g.pop("route_started", None)
+        if trace is None:
+            return
+        if started is not None:
+            self.record(
+                request.endpoint or "none", "route", started,
+                time.perf_counter() - started, trace,
+                )
+        self.finish(trace)
+
+    def _query_finished(
+        self, conn: Any, _: Any, statement: str, *__: Any
+    ) -> None:
+        """Record a SQL query as a span."""
+        started: float | None = conn.info.pop("tracing_query_started", None)
+        if started is None:
+            return
+        kind = (statement.split(None, 1) or ["OTHER"])[0].upper()
+        self.record(
+            f"db {kind}", "db", started, time.perf_counter() - started,
+            statement=statement[:STATEMENT_MAX_LENGTH],
+            )
+
+
+def _query_started(conn: Any, *_: Any) -> None:
+    """Note when a SQL query starts."""
+    conn.info["tracing_query_started"] = time.perf_counter()
+
+
+def _event(
+    name: str,
+    category: str,
+    start: float,
+    duration: float,
+    pid: int,
+    tid: int,
+    args: dict[str, Any],
+) -> dict[str, Any]:
+    """A complete event of a Chrome trace, in microseconds."""
+    return {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": round(start * 1_000_000, 3),
+        "dur": round(duration * 1_000_000, 3),
+        "pid": pid,
+        "tid": tid,
+        "args": args,
+    }
+
+
+tracer = Tracer()
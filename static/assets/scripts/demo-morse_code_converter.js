@@ -1,38 +1,96 @@
+// apply terminal lines received from the server, lines the page already
+// shows are skipped, so late or repeated responses don't duplicate them
+function applyDelta(Output, delta) {
+    const seq = Number(Output.dataset.seq);
+    if (delta.seq < seq || (delta.seq === seq && !delta.reset)) {
+        return;
+    }
+    const lines = delta.reset ? delta.lines : delta.lines.slice(seq - delta.seq);
+    const text = lines.map(line => line + "\n").join("");
+    Output.textContent = delta.reset ? text : Output.textContent + text;
+    Output.dataset.seq = delta.seq;
+}
+
+// a line of the page itself, not of the demo, so the sequence number
+// of the terminal stays the same
+function showNotice(Output, text) {
+    Output.textContent += text + "\n";
+}
+
 $(document).ready(function() {
-    const InputForm = document.getElementById("input-form")
-    const Terminal = document.getElementById("terminal-history")
-    InputForm.onsubmit = function(event) {
+    const Output = document.getElementById("terminal-output")
+
+    // lines written by this or other tabs are pushed over one connection,
+    // if the server has no room for another stream, or keeps no state to
+    // stream from, the replies to the submits below still keep the
+    // terminal up to date
+    if (window.EventSource) {
+        let Stream = null;
+        function openStream() {
+            if (Stream !== null) {
+                return;
+            }
+            Stream = new EventSource(`/demo/morse-code-converter/stream?since=${Output.dataset.seq}`);
+            Stream.onmessage = function(event) {
+                applyDelta(Output, JSON.parse(event.data));
+            }
+            // another tab of this visitor took the stream over
+            Stream.addEventListener("replaced", closeStream);
+        }
+        function closeStream() {
+            if (Stream !== null) {
+                Stream.close();
+                Stream = null;
+            }
+        }
+        // each stream holds a server thread, so hidden tabs give theirs back
+        document.addEventListener("visibilitychange", function() {
+            document.hidden ? closeStream() : openStream();
+        });
+        window.addEventListener("pagehide", closeStream);
+        window.addEventListener("pageshow", openStream);
+        openStream();
+    }
+
+    $('#input-form').submit(function(event) {
         event.preventDefault();
-        fetch("/demo/morse-code-converter", {
-        method: "GET"
-        })
-        .then(() => {
-        fetch("/demo/morse-code-converter/input-recieve", {
-            method: "GET"
+        const data = Object.fromEntries(new FormData(this));
+        // given back when the server didn't take it
+        const Input = this.elements.user_input;
+        data.since = Number(Output.dataset.seq);
+        $('#user_input').val('');
+        fetch("/api/demo/morse", {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify(data)
         })
         .then(response => {
-            return response.text();
-        })
-        .then(html =>{
-            Terminal.innerHTML = html;
-        })
-        .then(InputForm.reset())
+            if (!response.ok && response.status !== 429) {
+                throw new Error(`${response.status} ${response.statusText}`);
+            }
+            return response.json().then(result => [response, result]);
         })
-    }
-});
-
-$(document).ready(function() {
-    $('form').submit(function(event) {
-        event.preventDefault();
-        $.ajax({
-            type: 'POST',
-            url: '/demo/morse-code-converter',
-            data: $('form').serialize(),
-            success: function() {
-            $('user_input').val('');
+        .then(([response, result]) => {
+            if (response.ok) {
+                applyDelta(Output, result);
+            } else {
+                showNotice(Output, `slow down, try again in ${result.retry_after} s.`);
+                Input.value = data.user_input;
             }
+        })
+        .catch(error => {
+            showNotice(Output, `request failed: ${error.message}`);
+            Input.value = data.user_input;
         });
     });
+
+    // keep the label in line with the selected mode without a reload
+    const InputLabel = document.getElementById("input-label")
+    for (const radio of document.getElementsByName("mode")) {
+        radio.onchange = function() {
+            InputLabel.textContent = InputLabel.dataset[radio.value];
+        }
+    }
 });
 
 $("#user_input").keypress(function (e) {
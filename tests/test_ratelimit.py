@@ -0,0 +1,43 @@
+"""
+Tests of the rate limits, run from the repository root with
+``python -m unittest discover tests``.
+"""
+import unittest
+from resource.ratelimit import RateLimiter
+
+from flask import Flask
+
+
+class ClientIPTest(unittest.TestCase):
+    """Visitors behind the load balancer get a bucket each."""
+    def setUp(self) -> None:
+        app = Flask(__name__)
+        app.config["SECRET_KEY"] = "secret"
+        limiter = RateLimiter()
+
+        @app.route("/limited", methods=["POST"])
+        @limiter.limit("test", "1/600")
+        def limited() -> str:
+            return "ok"
+
+        self.client = app.test_client()
+
+    def post(self, forwarded_for: str) -> int:
+        """The status of a POST through the load balancer."""
+        return self.client.post(
+            "/limited", headers={"X-Forwarded-For": forwarded_for}
+            ).status_code
+
+    def test_separate_buckets(self) -> None:
+        self.assertEqual(self.post("203.0.113.1"), 200)
+        self.assertEqual(self.post("203.0.113.2"), 200)
+        self.assertEqual(self.post("203.0.113.1"), 429)
+        self.assertEqual(self.post("203.0.113.2"), 429)
+
+    def test_spoofed_entries_are_ignored(self) -> None:
+        self.assertEqual(self.post("198.51.100.7, 203.0.113.1"), 200)
+        self.assertEqual(self.post("198.51.100.8, 203.0.113.1"), 429)
+
+
+if __name__ == "__main__":
+    unittest.main()